@@ -0,0 +1,428 @@
+# benchmarks.py
+import argparse
+import contextlib
+import os
+import tempfile
+import threading
+import random
+import sys
+import time
+import tracemalloc
+
+import encaminhamento
+from concorrencia import RedeConcorrente
+from conectividade import intermediacao_trocos
+from gerador_rede import gerar_rede_grelha, gerar_trocos_grelha, nome_no
+from local import Local
+from matriz_distancias import calcular_matriz_distancias
+from persistencia import carregar_grafo_compacto, carregar_rede, guardar_rede
+from ranking_trocos import RankingTrocos
+from serie_temporal import janela_dia, janela_intervalo
+from rede_viaria import RedeViaria, insertion_sort_locais
+
+
+def benchmark_rotas(lados=(30, 100, 200), consultas: int = 50, semente: int = 42):
+    """Compara nós expandidos e latência de Dijkstra, A* e Dijkstra
+       bidirecional em redes sintéticas em grelha de lado x lado locais.
+    """
+    print(f"{'locais':>8} {'algoritmo':>13} {'nós expandidos':>15} {'ms/consulta':>12}")
+    for lado in lados:
+        rede = gerar_rede_grelha(lado, lado, semente)
+        aleatorio = random.Random(semente)
+        pares = [(nome_no(aleatorio.randrange(lado), aleatorio.randrange(lado)),
+                  nome_no(aleatorio.randrange(lado), aleatorio.randrange(lado)))
+                 for _ in range(consultas)]
+
+        for algoritmo in encaminhamento.ALGORITMOS:
+            total_expandidos = 0
+            inicio = time.perf_counter()
+            for origem, destino in pares:
+                resultado = rede.calcular_rota(origem, destino, algoritmo=algoritmo)
+                total_expandidos += resultado.nos_expandidos
+            decorrido = time.perf_counter() - inicio
+            print(f"{lado * lado:>8} {algoritmo:>13} {total_expandidos / consultas:>15.1f} "
+                  f"{decorrido * 1000 / consultas:>12.3f}")
+
+
+def benchmark_marcos(lados=(100, 200), consultas: int = 200, semente: int = 42):
+    """Compara A* com heurística Haversine e A* com marcos (ALT), incluindo
+       o tempo de pré-processamento.
+    """
+    print(f"{'locais':>8} {'heurística':>11} {'pré-proc. s':>12} {'nós expandidos':>15} {'ms/consulta':>12}")
+    for lado in lados:
+        rede = gerar_rede_grelha(lado, lado, semente)
+        aleatorio = random.Random(semente)
+        pares = [(nome_no(aleatorio.randrange(lado), aleatorio.randrange(lado)),
+                  nome_no(aleatorio.randrange(lado), aleatorio.randrange(lado)))
+                 for _ in range(consultas)]
+
+        for nome in ('haversine', 'marcos'):
+            inicio = time.perf_counter()
+            if nome == 'marcos':
+                rede.preparar_rotas()
+            pre_processamento = time.perf_counter() - inicio
+
+            total_expandidos = 0
+            inicio = time.perf_counter()
+            for origem, destino in pares:
+                total_expandidos += rede.calcular_rota(origem, destino).nos_expandidos
+            decorrido = time.perf_counter() - inicio
+            print(f"{lado * lado:>8} {nome:>11} {pre_processamento:>12.2f} "
+                  f"{total_expandidos / consultas:>15.1f} {decorrido * 1000 / consultas:>12.3f}")
+
+
+def _tamanho_profundo(obj, vistos=None) -> int:
+    """Memória (bytes) de um objeto e de tudo o que ele contém, contando
+       cada objeto partilhado uma única vez.
+    """
+    if vistos is None:
+        vistos = set()
+    if id(obj) in vistos:
+        return 0
+    vistos.add(id(obj))
+    tamanho = sys.getsizeof(obj)
+    if isinstance(obj, dict):
+        tamanho += sum(_tamanho_profundo(k, vistos) + _tamanho_profundo(v, vistos)
+                       for k, v in obj.items())
+    elif isinstance(obj, (list, tuple, set, frozenset)):
+        tamanho += sum(_tamanho_profundo(item, vistos) for item in obj)
+    return tamanho
+
+
+def benchmark_compacto(lados=(100, 300), semente: int = 42):
+    """Compara memória e tempo de travessia (Dijkstra completo) entre a lista
+       de adjacência em dicionários e o instantâneo CSR.
+    """
+    print(f"{'locais':>8} {'troços':>8} {'formato':>10} {'MiB':>8} {'Dijkstra s':>11}")
+    for lado in lados:
+        rede = gerar_rede_grelha(lado, lado, semente)
+        compacto = rede.compactar()
+        origem = nome_no(0, 0)
+        num_trocos = compacto.num_trocos
+
+        memoria_adj = _tamanho_profundo(rede.adj)
+        inicio = time.perf_counter()
+        encaminhamento.distancias_a_partir(rede.adj, origem)
+        tempo_adj = time.perf_counter() - inicio
+
+        vistos = set()
+        memoria_csr = sum(_tamanho_profundo(coluna, vistos) for coluna in (
+            compacto.nomes, compacto.ids, compacto.deslocamentos, compacto.destinos,
+            compacto.distancias, compacto.veiculos, compacto.latitudes, compacto.longitudes))
+        inicio = time.perf_counter()
+        compacto.distancias_a_partir(compacto.ids[origem])
+        tempo_csr = time.perf_counter() - inicio
+
+        for formato, memoria, tempo in (('dict', memoria_adj, tempo_adj),
+                                        ('csr', memoria_csr, tempo_csr)):
+            print(f"{lado * lado:>8} {num_trocos:>8} {formato:>10} "
+                  f"{memoria / 2**20:>8.1f} {tempo:>11.3f}")
+
+
+class _LocalComDict:
+    """Réplica do formato antigo de Local (com __dict__ e set), só para comparação."""
+
+    def __init__(self, designacao, freguesia, coords_gps, palavras_chave):
+        self.designacao = designacao
+        self.freguesia = freguesia
+        self.coords_gps = coords_gps
+        self.url = None
+        self.palavras_chave = set(pc.lower() for pc in palavras_chave)
+
+    def __hash__(self):
+        return hash(self.designacao.lower())
+
+    def __lt__(self, other):
+        return self.designacao.lower() < other.designacao.lower()
+
+
+def benchmark_locais(quantidade: int = 200_000, semente: int = 42):
+    """Memória para carregar N locais e tempo de ordenação/hashing,
+       comparando Local (__slots__) com o formato antigo.
+    """
+    aleatorio = random.Random(semente)
+    palavras = ["parque", "museu", "centro", "igreja", "praia", "escola", "rio", "mercado"]
+    # Strings novas em cada linha, como se viessem de um ficheiro
+    dados = [(f"Local {aleatorio.random():.12f}", "Freguesia " + str(i % 20),
+              (41 + aleatorio.random(), -8 - aleatorio.random()),
+              [p + "" for p in aleatorio.sample(palavras, 3)])
+             for i in range(quantidade)]
+
+    print(f"{'formato':>10} {'MiB':>8} {'ordenar s':>10} {'hash s':>8}")
+    for nome, classe in (('dict', _LocalComDict), ('slots', Local)):
+        tracemalloc.start()
+        locais = [classe(*linha) for linha in dados]
+        memoria = tracemalloc.get_traced_memory()[0]
+        tracemalloc.stop()
+
+        inicio = time.perf_counter()
+        sorted(locais)
+        tempo_ordenar = time.perf_counter() - inicio
+        inicio = time.perf_counter()
+        set(locais)
+        tempo_hash = time.perf_counter() - inicio
+        print(f"{nome:>10} {memoria / 2**20:>8.1f} {tempo_ordenar:>10.3f} {tempo_hash:>8.3f}")
+        del locais
+
+
+def benchmark_lote(lados=(224, 708), semente: int = 42):
+    """Débito de inserção de troços: adicionar_troco um a um (com as
+       mensagens enviadas para /dev/null) contra adicionar_trocos_em_lote.
+       Uma grelha de 708 x 708 tem cerca de 1M troços.
+    """
+    print(f"{'troços':>9} {'método':>10} {'s':>8} {'troços/s':>10}")
+    for lado in lados:
+        rede = RedeViaria()
+        rede.adicionar_locais_em_lote(
+            Local(nome_no(lin, col), "Freguesia", (41.10 + lin * 0.002, -8.70 + col * 0.002))
+            for lin in range(lado) for col in range(lado))
+        trocos = list(gerar_trocos_grelha(rede, lado, lado, random.Random(semente)))
+
+        metodos = ['lote'] if len(trocos) > 200_000 else ['um_a_um', 'lote']
+        for metodo in metodos:
+            for vizinhos in rede.adj.values():
+                vizinhos.clear()
+            rede.ranking_trocos = RankingTrocos()
+
+            inicio = time.perf_counter()
+            if metodo == 'lote':
+                rede.adicionar_trocos_em_lote(trocos)
+            else:
+                with open(os.devnull, 'w') as nulo, contextlib.redirect_stdout(nulo):
+                    for troco in trocos:
+                        rede.adicionar_troco(*troco)
+            decorrido = time.perf_counter() - inicio
+            print(f"{len(trocos):>9} {metodo:>10} {decorrido:>8.2f} {len(trocos) / decorrido:>10.0f}")
+
+
+def benchmark_persistencia(lados=(100, 300), semente: int = 42):
+    """Tempos de gravação e de carregamento (GrafoCompacto via mmap e
+       RedeViaria completa) do formato binário.
+    """
+    print(f"{'troços':>9} {'MiB':>7} {'guardar s':>10} {'mmap s':>8} {'rede s':>8}")
+    for lado in lados:
+        rede = gerar_rede_grelha(lado, lado, semente)
+        with tempfile.TemporaryDirectory() as pasta:
+            caminho = os.path.join(pasta, 'rede.bin')
+            inicio = time.perf_counter()
+            guardar_rede(rede, caminho)
+            tempo_guardar = time.perf_counter() - inicio
+
+            inicio = time.perf_counter()
+            grafo = carregar_grafo_compacto(caminho)
+            tempo_mmap = time.perf_counter() - inicio
+
+            inicio = time.perf_counter()
+            carregar_rede(caminho)
+            tempo_rede = time.perf_counter() - inicio
+            print(f"{grafo.num_trocos:>9} {os.path.getsize(caminho) / 2**20:>7.1f} "
+                  f"{tempo_guardar:>10.2f} {tempo_mmap:>8.3f} {tempo_rede:>8.2f}")
+            del grafo
+
+
+def benchmark_ordenacao(quantidades=(5_000, 50_000), semente: int = 42):
+    """Pesquisa abrangente (uma freguesia com todos os locais): ordenação
+       completa, página de 20 resultados e, para comparação, insertion_sort_locais.
+    """
+    print(f"{'resultados':>10} {'modo':>16} {'ms':>10}")
+    for quantidade in quantidades:
+        aleatorio = random.Random(semente)
+        rede = RedeViaria()
+        rede.adicionar_locais_em_lote(
+            Local(f"Local {aleatorio.random():.10f}", "Sé", (41 + aleatorio.random(), -8.6))
+            for _ in range(quantidade))
+
+        modos = [('completa', lambda: rede.pesquisar_locais(freguesia="sé")),
+                 ('página (20)', lambda: rede.pesquisar_locais(freguesia="sé", offset=100, limite=20)),
+                 ('por distância', lambda: rede.pesquisar_locais(
+                     ponto_gps=(41.5, -8.6), raio_km=1000, ordenar_por='distancia', limite=20))]
+        if quantidade <= 5_000:
+            modos.append(('insertion sort', lambda: insertion_sort_locais(list(rede.locais.values()))))
+
+        for modo, consulta in modos:
+            inicio = time.perf_counter()
+            consulta()
+            print(f"{quantidade:>10} {modo:>16} {(time.perf_counter() - inicio) * 1000:>10.2f}")
+
+
+def benchmark_varrimento(lado: int = 300, semente: int = 42):
+    """Pico de memória e tempo de um varrimento completo: listas
+       (listar_todos_trocos / pesquisar_locais) contra geradores
+       (iterar_trocos / iterar_locais).
+    """
+    rede = gerar_rede_grelha(lado, lado, semente)
+    varrimentos = [
+        ('listar_todos_trocos', lambda: sum(dados['distancia'] for _, _, dados in rede.listar_todos_trocos())),
+        ('iterar_trocos', lambda: sum(dados['distancia'] for _, _, dados in rede.iterar_trocos())),
+        ('pesquisar_locais', lambda: sum(1 for _ in rede.pesquisar_locais(designacao="L1"))),
+        ('iterar_locais', lambda: sum(1 for _ in rede.iterar_locais(designacao="L1"))),
+    ]
+    print(f"{'varrimento':>20} {'pico MiB':>9} {'s':>7}")
+    for nome, varrimento in varrimentos:
+        tracemalloc.start()
+        inicio = time.perf_counter()
+        varrimento()
+        decorrido = time.perf_counter() - inicio
+        pico = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        print(f"{nome:>20} {pico / 2**20:>9.2f} {decorrido:>7.2f}")
+
+
+def benchmark_concorrencia(lado: int = 100, leitores: int = 4, duracao_s: float = 3.0,
+                           semente: int = 42):
+    """Débito de leituras (pesquisas e listagens sobre instantâneos) com e
+       sem um escritor a publicar transações de 50 alterações em paralelo.
+    """
+    print(f"{'escritor':>9} {'leituras/s':>11} {'publicações':>12}")
+    for com_escritor in (False, True):
+        rede = RedeConcorrente(gerar_rede_grelha(lado, lado, semente))
+        parar = threading.Event()
+        leituras = [0] * leitores
+
+        def ler(indice: int):
+            aleatorio = random.Random(semente + indice)
+            while not parar.is_set():
+                instantaneo = rede.instantaneo()
+                instantaneo.pesquisar_locais(designacao=f"L{aleatorio.randrange(lado)}_", limite=20)
+                instantaneo.top_trocos(10)
+                leituras[indice] += 1
+
+        def escrever():
+            aleatorio = random.Random(semente)
+            trocos = list(rede.instantaneo().iterar_trocos())
+            while not parar.is_set():
+                with rede.transacao() as trabalho:
+                    alteracoes = [(origem, destino, dados['distancia'], aleatorio.randint(0, 30000))
+                                  for origem, destino, dados in aleatorio.sample(trocos, 50)]
+                    trabalho.adicionar_trocos_em_lote(alteracoes)
+
+        threads = [threading.Thread(target=ler, args=(i,)) for i in range(leitores)]
+        if com_escritor:
+            threads.append(threading.Thread(target=escrever))
+        for thread in threads:
+            thread.start()
+        time.sleep(duracao_s)
+        parar.set()
+        for thread in threads:
+            thread.join()
+        print(f"{'sim' if com_escritor else 'não':>9} {sum(leituras) / duracao_s:>11.0f} {rede.versao:>12}")
+
+
+def benchmark_matriz(lado: int = 150, num_origens: int = 64, num_destinos: int = 64,
+                     semente: int = 42):
+    """Tempo da matriz de distâncias origens x destinos com 1..N processos."""
+    rede = gerar_rede_grelha(lado, lado, semente)
+    aleatorio = random.Random(semente)
+    nomes = list(rede.locais)
+    origens = aleatorio.sample(nomes, num_origens)
+    destinos = aleatorio.sample(nomes, num_destinos)
+
+    print(f"{'processos':>10} {'tempo (s)':>10} {'aceleração':>11}")
+    referencia = None
+    processos = 1
+    while processos <= (os.cpu_count() or 1):
+        inicio = time.perf_counter()
+        calcular_matriz_distancias(rede, origens, destinos, processos)
+        tempo = time.perf_counter() - inicio
+        referencia = referencia or tempo
+        print(f"{processos:>10} {tempo:>10.2f} {referencia / tempo:>10.1f}x")
+        processos *= 2
+
+
+def benchmark_trafego(lado: int = 100, num_leituras: int = 1_000_000, semente: int = 42):
+    """Ingestão de leituras de contadores e ranking de circulação por janela
+       (hora, dia, dois dias) com as séries temporais dos troços.
+    """
+    rede = gerar_rede_grelha(lado, lado, semente)
+    aleatorio = random.Random(semente)
+    trocos = [(origem, destino) for origem, destino, _ in rede.iterar_trocos()]
+    fim = 1_700_006_400 # Meia-noite UTC
+    inicio = fim - 2 * 86400
+    leituras = [(*aleatorio.choice(trocos), aleatorio.uniform(inicio, fim), aleatorio.randint(0, 2000))
+                for _ in range(num_leituras)]
+    leituras.sort(key=lambda leitura: leitura[2])
+
+    t = time.perf_counter()
+    rede.registar_leituras(leituras)
+    tempo = time.perf_counter() - t
+    print(f"{len(trocos)} troços, {num_leituras} leituras: {num_leituras / tempo:.0f} leituras/s")
+
+    print(f"{'janela':>10} {'estatística':>12} {'ms (top 10)':>12}")
+    janelas = {'hora': janela_intervalo(fim - 1), 'dia': janela_dia(fim - 1), '2 dias': janela_dia(fim - 1, 2)}
+    for nome, janela in janelas.items():
+        for estatistica in ('media', 'pico'):
+            t = time.perf_counter()
+            rede.trafego.ranking(janela, estatistica, 10)
+            print(f"{nome:>10} {estatistica:>12} {(time.perf_counter() - t) * 1000:>12.1f}")
+
+
+def benchmark_conectividade(lado: int = 200, remocoes: int = 2000, amostras: int = 16,
+                            semente: int = 42):
+    """Remoções de troços com componentes incrementais vs. BFS completa por
+       remoção, cálculo de pontes e intermediação aproximada com 1..N processos.
+    """
+    rede = gerar_rede_grelha(lado, lado, semente)
+    aleatorio = random.Random(semente)
+    trocos = aleatorio.sample([(origem, destino) for origem, destino, _ in rede.iterar_trocos()], remocoes)
+
+    with open(os.devnull, 'w') as nulo, contextlib.redirect_stdout(nulo):
+        inicio = time.perf_counter()
+        for desig1, desig2 in trocos:
+            rede.remover_troco(desig1, desig2)
+        tempo = time.perf_counter() - inicio
+    print(f"{remocoes} remoções: {tempo / remocoes * 1e6:.1f} µs/remoção, "
+          f"{rede.num_componentes()} componentes")
+
+    inicio = time.perf_counter()
+    for _ in range(10):
+        visitados = set()
+        for raiz in rede.adj:
+            if raiz not in visitados:
+                visitados.add(raiz)
+                pilha = [raiz]
+                while pilha:
+                    for vizinho in rede.adj[pilha.pop()]:
+                        if vizinho not in visitados:
+                            visitados.add(vizinho)
+                            pilha.append(vizinho)
+    print(f"BFS completa (referência): {(time.perf_counter() - inicio) / 10 * 1e6:.1f} µs")
+
+    inicio = time.perf_counter()
+    pontes = rede.listar_pontes()
+    print(f"{len(pontes)} pontes em {(time.perf_counter() - inicio) * 1000:.1f} ms")
+
+    print(f"{'processos':>10} {'intermediação (s)':>18}")
+    processos = 1
+    while processos <= (os.cpu_count() or 1):
+        inicio = time.perf_counter()
+        intermediacao_trocos(rede, amostras, processos, semente)
+        print(f"{processos:>10} {time.perf_counter() - inicio:>18.2f}")
+        processos *= 2
+
+
+BENCHMARKS = {
+    'rotas': benchmark_rotas,
+    'marcos': benchmark_marcos,
+    'compacto': benchmark_compacto,
+    'locais': benchmark_locais,
+    'lote': benchmark_lote,
+    'persistencia': benchmark_persistencia,
+    'ordenacao': benchmark_ordenacao,
+    'varrimento': benchmark_varrimento,
+    'concorrencia': benchmark_concorrencia,
+    'matriz': benchmark_matriz,
+    'trafego': benchmark_trafego,
+    'conectividade': benchmark_conectividade,
+}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmarks da rede viária.")
+    parser.add_argument('benchmark', choices=sorted(BENCHMARKS))
+    parser.add_argument('--semente', type=int, default=42)
+    args = parser.parse_args()
+    BENCHMARKS[args.benchmark](semente=args.semente)
+
+
+if __name__ == "__main__":
+    main()
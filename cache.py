@@ -0,0 +1,101 @@
+# cache.py
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Optional, Tuple
+
+_AUSENTE = object()
+
+
+class CacheResultados:
+    """Cache LRU com validade (TTL) para resultados de consultas à rede.
+
+    Cada entrada guarda a geração da rede em que foi calculada. Uma entrada
+    de uma geração anterior nunca é devolvida: a rede incrementa a geração a
+    cada alteração, o que invalida todas as entradas de uma vez, em O(1),
+    sem percorrer a cache. As entradas desatualizadas são descartadas quando
+    são encontradas ou empurradas para o fim pela ordem LRU.
+
+    Os acessos são protegidos por um lock, porque um mesmo instantâneo da
+    rede pode ser consultado por várias threads (ver servidor.py).
+    """
+
+    def __init__(self, capacidade: int = 1024, ttl_s: Optional[float] = 60.0,
+                 relogio: Callable[[], float] = time.monotonic):
+        self.capacidade = capacidade
+        self.ttl_s = ttl_s
+        self.relogio = relogio
+        # {chave: (geracao, instante de expiração, valor)}, do menos para o mais recente
+        self.entradas: 'OrderedDict[Hashable, Tuple[int, float, Any]]' = OrderedDict()
+        self._lock = threading.Lock()
+        self.acertos = 0
+        self.falhas = 0
+        self.despejos = 0      # Retiradas por falta de capacidade
+        self.invalidacoes = 0  # Encontradas com geração antiga
+        self.expiracoes = 0    # Encontradas depois do TTL
+
+    def __len__(self):
+        return len(self.entradas)
+
+    def obter(self, chave: Hashable, geracao: int) -> Any:
+        """Valor guardado para a chave na geração indicada, ou _AUSENTE."""
+        with self._lock:
+            entrada = self.entradas.get(chave)
+            if entrada is None:
+                self.falhas += 1
+                return _AUSENTE
+            geracao_entrada, expira, valor = entrada
+            if geracao_entrada != geracao:
+                self.invalidacoes += 1
+            elif expira < self.relogio():
+                self.expiracoes += 1
+            else:
+                self.entradas.move_to_end(chave)
+                self.acertos += 1
+                return valor
+            del self.entradas[chave]
+            self.falhas += 1
+            return _AUSENTE
+
+    def guardar(self, chave: Hashable, geracao: int, valor: Any):
+        if self.capacidade <= 0:
+            return
+        expira = self.relogio() + self.ttl_s if self.ttl_s is not None else float('inf')
+        with self._lock:
+            self.entradas[chave] = (geracao, expira, valor)
+            self.entradas.move_to_end(chave)
+            while len(self.entradas) > self.capacidade:
+                self.entradas.popitem(last=False)
+                self.despejos += 1
+
+    def obter_ou_calcular(self, chave: Hashable, geracao: int, calcular: Callable[[], Any]) -> Any:
+        """Devolve o valor em cache ou calcula-o (fora do lock) e guarda-o.
+           Se calcular devolver None o resultado não é guardado (erro).
+        """
+        valor = self.obter(chave, geracao)
+        if valor is _AUSENTE:
+            valor = calcular()
+            if valor is not None:
+                self.guardar(chave, geracao, valor)
+        return valor
+
+    def limpar(self):
+        with self._lock:
+            self.entradas.clear()
+
+    def vazia(self) -> 'CacheResultados':
+        """Nova cache vazia com a mesma configuração."""
+        return CacheResultados(self.capacidade, self.ttl_s, self.relogio)
+
+    def estatisticas(self) -> Dict[str, float]:
+        consultas = self.acertos + self.falhas
+        return {
+            'entradas': len(self.entradas),
+            'capacidade': self.capacidade,
+            'acertos': self.acertos,
+            'falhas': self.falhas,
+            'despejos': self.despejos,
+            'invalidacoes': self.invalidacoes,
+            'expiracoes': self.expiracoes,
+            'taxa_acertos': self.acertos / consultas if consultas else 0.0,
+        }
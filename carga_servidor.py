@@ -0,0 +1,114 @@
+# carga_servidor.py
+import argparse
+import asyncio
+import json
+import random
+import time
+from typing import Dict, List, Optional
+
+from concorrencia import RedeConcorrente
+from gerador_rede import gerar_rede_grelha, nome_no
+from servidor import ServidorRede
+
+
+def _gerar_pedido(aleatorio: random.Random, lado: int, identificador: int) -> Dict:
+    """Mistura de consultas: pesquisas, troços, ranking e rotas."""
+    tipo = aleatorio.random()
+    if tipo < 0.4:
+        lin = aleatorio.randrange(lado)
+        return {'id': identificador, 'operacao': 'pesquisar_locais',
+                'parametros': {'designacao': f"L{lin}_", 'limite': 20}}
+    if tipo < 0.7:
+        lin, col = aleatorio.randrange(lado), aleatorio.randrange(lado - 1)
+        return {'id': identificador, 'operacao': 'consultar_troco',
+                'parametros': {'local1': nome_no(lin, col), 'local2': nome_no(lin, col + 1)}}
+    if tipo < 0.9:
+        return {'id': identificador, 'operacao': 'consultar_trocos_mais_circulacao',
+                'parametros': {'limite': 10}}
+    return {'id': identificador, 'operacao': 'calcular_rota',
+            'parametros': {'origem': nome_no(aleatorio.randrange(lado), aleatorio.randrange(lado)),
+                           'destino': nome_no(aleatorio.randrange(lado), aleatorio.randrange(lado))}}
+
+
+async def _cliente(hospedeiro: str, porta: int, lado: int, pedidos: int, lote: int,
+                   semente: int, latencias: List[float]):
+    """Uma ligação keep-alive que envia `pedidos` mensagens (cada uma com
+       `lote` pedidos) e regista a latência de ida e volta de cada mensagem.
+    """
+    aleatorio = random.Random(semente)
+    leitor, escritor = await asyncio.open_connection(hospedeiro, porta, limit=2 ** 22)
+    try:
+        for i in range(pedidos):
+            mensagem = [_gerar_pedido(aleatorio, lado, i * lote + j) for j in range(lote)]
+            dados = json.dumps(mensagem if lote > 1 else mensagem[0]).encode('utf-8') + b'\n'
+            inicio = time.perf_counter()
+            escritor.write(dados)
+            await escritor.drain()
+            await leitor.readline()
+            latencias.append(time.perf_counter() - inicio)
+    finally:
+        escritor.close()
+        await escritor.wait_closed()
+
+
+def percentil(valores: List[float], p: float) -> float:
+    """Percentil p (0-100) pelo método do posto mais próximo."""
+    ordenados = sorted(valores)
+    if not ordenados:
+        return 0.0
+    posto = max(0, min(len(ordenados) - 1, round(p / 100 * len(ordenados)) - 1))
+    return ordenados[posto]
+
+
+async def executar_carga(clientes: int, pedidos: int, lote: int = 1, lado: int = 100,
+                         hospedeiro: Optional[str] = None, porta: int = 0, semente: int = 42) -> Dict:
+    """Lança `clientes` ligações em simultâneo contra o servidor indicado,
+       ou contra um servidor local com uma rede em grelha lado x lado.
+    """
+    servidor = None
+    if hospedeiro is None:
+        servidor = ServidorRede(RedeConcorrente(gerar_rede_grelha(lado, lado, semente)),
+                                '127.0.0.1', porta)
+        await servidor.iniciar()
+        hospedeiro, porta = servidor.hospedeiro, servidor.porta
+
+    latencias: List[float] = []
+    inicio = time.perf_counter()
+    try:
+        await asyncio.gather(*(_cliente(hospedeiro, porta, lado, pedidos, lote, semente + i, latencias)
+                               for i in range(clientes)))
+    finally:
+        if servidor is not None:
+            await servidor.fechar()
+    duracao = time.perf_counter() - inicio
+
+    return {
+        'clientes': clientes,
+        'mensagens': len(latencias),
+        'pedidos_por_s': len(latencias) * lote / duracao,
+        'p50_ms': percentil(latencias, 50) * 1000,
+        'p99_ms': percentil(latencias, 99) * 1000,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Teste de carga do servidor de consultas (latência p50/p99).")
+    parser.add_argument('--clientes', type=int, nargs='+', default=[1, 10, 100, 500])
+    parser.add_argument('--pedidos', type=int, default=50, help="mensagens por cliente")
+    parser.add_argument('--lote', type=int, default=1, help="pedidos por mensagem")
+    parser.add_argument('--lado', type=int, default=100, help="lado da rede em grelha")
+    parser.add_argument('--hospedeiro', default=None, help="servidor já em execução (senão é lançado um)")
+    parser.add_argument('--porta', type=int, default=0)
+    parser.add_argument('--semente', type=int, default=42)
+    args = parser.parse_args()
+
+    print(f"{'clientes':>9} {'mensagens':>10} {'pedidos/s':>10} {'p50 (ms)':>9} {'p99 (ms)':>9}")
+    for clientes in args.clientes:
+        r = asyncio.run(executar_carga(clientes, args.pedidos, args.lote, args.lado,
+                                       args.hospedeiro, args.porta, args.semente))
+        print(f"{r['clientes']:>9} {r['mensagens']:>10} {r['pedidos_por_s']:>10.0f} "
+              f"{r['p50_ms']:>9.2f} {r['p99_ms']:>9.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,62 @@
+# concorrencia.py
+import threading
+from contextlib import contextmanager
+from typing import Iterator
+
+from rede_viaria import RedeViaria
+
+
+class RedeConcorrente:
+    """Acesso concorrente à rede com isolamento por instantâneos.
+
+    Os leitores obtêm com instantaneo() uma RedeViaria que nunca é alterada
+    depois de publicada, pelo que a podem consultar (pesquisas, rotas,
+    listagens) sem locks e sem ver alterações a meio. O instantâneo e os
+    seus Locais rejeitam alterações com ErroSoLeitura.
+
+    Os escritores agrupam as alterações numa transacao(): são aplicadas a uma
+    rede de trabalho privada e, no fim, é publicado um novo instantâneo com
+    RedeViaria.publicar(). O instantâneo partilha com a rede de trabalho
+    tudo o que a transação não tocou (linhas de adjacência, locais, baldes
+    dos índices, nós da trie, blocos das séries de tráfego), e a rede de
+    trabalho copia cada parte antes de a alterar, pelo que publicar não
+    duplica a rede; ver RedeViaria.publicar para o que ainda é copiado.
+    Os Locais alteram-se com trabalho.local_para_alterar(designacao). A
+    troca do instantâneo é uma única atribuição de referência, logo atómica.
+    """
+
+    def __init__(self, rede: RedeViaria = None):
+        self._lock_escrita = threading.Lock()
+        self._trabalho = rede if rede is not None else RedeViaria()
+        self._publicada = self._trabalho.publicar()
+        self.versao = 0
+
+    def instantaneo(self) -> RedeViaria:
+        """Versão publicada mais recente. Tratar como só de leitura."""
+        return self._publicada
+
+    @contextmanager
+    def transacao(self) -> Iterator[RedeViaria]:
+        """Dá acesso exclusivo à cópia de trabalho e publica-a no fim.
+           Se ocorrer uma exceção nada é publicado e a cópia de trabalho
+           volta ao estado do último instantâneo (uma cópia completa, só
+           neste caso). Com um registo de
+           alterações associado, as alterações da transação são escritas
+           em disco de uma só vez antes da publicação (ou descartadas).
+        """
+        with self._lock_escrita:
+            registo = self._trabalho.registo
+            if registo is not None:
+                registo.iniciar_transacao()
+            try:
+                yield self._trabalho
+            except BaseException:
+                self._trabalho = self._publicada.copiar()
+                if registo is not None:
+                    registo.anular_transacao()
+                    registo.associar(self._trabalho)
+                raise
+            if registo is not None:
+                registo.confirmar_transacao() # Durável antes de ser publicada
+            self._publicada = self._trabalho.publicar()
+            self.versao += 1
@@ -0,0 +1,403 @@
+# conectividade.py
+import heapq
+import os
+import random
+from array import array
+from collections import deque
+from typing import Dict, List, Optional, Set, Tuple
+
+from grafo_compacto import INFINITO, GrafoCompacto
+from matriz_distancias import colunas_partilhadas, executor_csr_partilhado
+
+
+class ConectividadeIncremental:
+    """Componentes ligadas da rede, mantidas a cada alteração.
+
+    Inserções: union-find (compressão de caminhos e união por tamanho),
+    quase O(1) por troço.
+
+    Remoções: o union-find não sabe separar conjuntos, por isso cada local
+    aponta para um elemento do union-find. Ao remover um troço faz-se uma
+    pesquisa em largura alternada a partir dos dois extremos, que pára
+    quando as duas pesquisas se encontram (continuam ligados) ou quando uma
+    delas se esgota. Nesse caso a pesquisa esgotada percorreu exatamente o
+    lado separado, que é o mais pequeno: os seus locais recebem elementos
+    novos, unidos entre si, e os antigos ficam órfãos na floresta sem
+    afetar o resto. O custo é proporcional ao lado menor. Quando os órfãos
+    ultrapassam o número de locais, o union-find é reconstruído.
+
+    Se as pontes (troços cuja remoção separa a rede) tiverem sido calculadas
+    e nada tiver sido removido desde então, a remoção de um troço que não é
+    ponte nem foi adicionado depois dispensa a pesquisa.
+
+    Uma cópia obtida com partilhar() é só de leitura: as consultas não
+    comprimem caminhos nem guardam as pontes calculadas, pelo que várias
+    threads a podem consultar sem locks. Partilha o union-find com o
+    original, que o copia por inteiro na primeira alteração seguinte.
+    """
+
+    def __init__(self):
+        self.elemento: Dict[str, int] = {} # Local -> elemento do union-find
+        self.pai = array('q')
+        self.tamanho = array('q')          # Locais vivos no conjunto (válido nas raízes)
+        self.orfaos = 0
+        self.num_componentes = 0
+        # Últimas pontes e pontos de articulação calculados
+        self._pontes: Optional[Set[Tuple[str, str]]] = None
+        self._articulacoes: Optional[Set[str]] = None
+        self._pontes_atuais = False
+        # Adicionar troços não torna pontes os que não eram: até à próxima
+        # remoção, um troço fora de _pontes e de _trocos_novos não é ponte
+        self._nao_pontes_validas = False
+        self._trocos_novos: Set[Tuple[str, str]] = set()
+        self.so_leitura = False
+        # Estruturas partilhadas com uma cópia só de leitura (ver partilhar)
+        self._partilhada = False
+
+    def copiar(self) -> 'ConectividadeIncremental':
+        copia = ConectividadeIncremental()
+        copia.elemento = dict(self.elemento)
+        copia.pai = array('q', self.pai)
+        copia.tamanho = array('q', self.tamanho)
+        copia.orfaos = self.orfaos
+        copia.num_componentes = self.num_componentes
+        copia._pontes = set(self._pontes) if self._pontes is not None else None
+        copia._articulacoes = set(self._articulacoes) if self._articulacoes is not None else None
+        copia._pontes_atuais = self._pontes_atuais
+        copia._nao_pontes_validas = self._nao_pontes_validas
+        copia._trocos_novos = set(self._trocos_novos)
+        return copia
+
+    def partilhar(self) -> 'ConectividadeIncremental':
+        """Cópia só de leitura para um instantâneo publicado, sem copiar
+           nada: as estruturas passam a ser copiadas na escrita.
+        """
+        copia = ConectividadeIncremental()
+        copia.elemento, copia.pai, copia.tamanho = self.elemento, self.pai, self.tamanho
+        copia.orfaos = self.orfaos
+        copia.num_componentes = self.num_componentes
+        copia._pontes, copia._articulacoes = self._pontes, self._articulacoes
+        copia._pontes_atuais = self._pontes_atuais
+        copia._nao_pontes_validas = self._nao_pontes_validas
+        copia._trocos_novos = self._trocos_novos
+        copia.so_leitura = True
+        self._partilhada = True
+        return copia
+
+    def _tornar_propria(self):
+        """Copia as estruturas partilhadas antes da primeira alteração."""
+        if self._partilhada:
+            self.elemento = dict(self.elemento)
+            self.pai = array('q', self.pai)
+            self.tamanho = array('q', self.tamanho)
+            self._trocos_novos = set(self._trocos_novos)
+            self._partilhada = False
+
+    # --- Union-find ---
+
+    def _novo_elemento(self) -> int:
+        self.pai.append(len(self.pai))
+        self.tamanho.append(1)
+        return len(self.pai) - 1
+
+    def _raiz(self, x: int) -> int:
+        pai = self.pai
+        raiz = x
+        while pai[raiz] != raiz:
+            raiz = pai[raiz]
+        if self.so_leitura or self._partilhada: # União por tamanho: profundidade O(log n) sem compressão
+            return raiz
+        while pai[x] != raiz: # Compressão de caminhos
+            pai[x], x = raiz, pai[x]
+        return raiz
+
+    def _unir(self, x: int, y: int) -> bool:
+        x, y = self._raiz(x), self._raiz(y)
+        if x == y:
+            return False
+        if self.tamanho[x] < self.tamanho[y]:
+            x, y = y, x
+        self.pai[y] = x
+        self.tamanho[x] += self.tamanho[y]
+        self.num_componentes -= 1
+        return True
+
+    # --- Consultas ---
+
+    def componente(self, designacao: str) -> int:
+        """Identificador da componente do local (igual para locais ligados;
+           pode mudar depois de alterações à rede).
+        """
+        return self._raiz(self.elemento[designacao])
+
+    def ligados(self, desig1: str, desig2: str) -> bool:
+        return self.componente(desig1) == self.componente(desig2)
+
+    def tamanho_componente(self, designacao: str) -> int:
+        return self.tamanho[self.componente(designacao)]
+
+    def componentes(self) -> List[Set[str]]:
+        """Todas as componentes, da maior para a menor. Complexidade: O(V)."""
+        grupos: Dict[int, Set[str]] = {}
+        for designacao, elemento in self.elemento.items():
+            grupos.setdefault(self._raiz(elemento), set()).add(designacao)
+        return sorted(grupos.values(), key=len, reverse=True)
+
+    # --- Alterações (chamadas pela RedeViaria) ---
+
+    def local_adicionado(self, designacao: str):
+        if designacao not in self.elemento:
+            self._tornar_propria()
+            self.elemento[designacao] = self._novo_elemento()
+            self.num_componentes += 1
+
+    def troco_adicionado(self, desig1: str, desig2: str):
+        self._tornar_propria()
+        self._unir(self.elemento[desig1], self.elemento[desig2])
+        # O troço novo pode ser ponte e deixar de o ser outro: recalcular quando pedido
+        self._pontes_atuais = False
+        if self._nao_pontes_validas:
+            self._trocos_novos.add(_par(desig1, desig2))
+
+    def troco_removido(self, desig1: str, desig2: str, adj: Dict[str, Dict[str, Dict]]):
+        """Atualiza as componentes depois de o troço ter sido retirado de adj."""
+        self._tornar_propria()
+        par = _par(desig1, desig2)
+        sem_pesquisa = (self._nao_pontes_validas and par not in self._pontes
+                        and par not in self._trocos_novos)
+        self._pontes_atuais = self._nao_pontes_validas = False
+        self._trocos_novos.clear()
+        if sem_pesquisa:
+            return
+        lado_separado = _lado_menor_se_separados(adj, desig1, desig2)
+        if lado_separado is not None:
+            self._separar(lado_separado, adj)
+
+    def local_removido(self, designacao: str):
+        """O local já não tem troços: fica órfão o seu elemento."""
+        if designacao not in self.elemento:
+            return
+        self._tornar_propria()
+        elemento = self.elemento.pop(designacao)
+        raiz = self._raiz(elemento)
+        self.tamanho[raiz] -= 1
+        if self.tamanho[raiz] == 0:
+            self.num_componentes -= 1
+        self.orfaos += 1
+
+    def _separar(self, lado: Set[str], adj: Dict[str, Dict[str, Dict]]):
+        """Move os locais de um lado separado para um conjunto novo."""
+        antigo = self._raiz(self.elemento[next(iter(lado))])
+        self.tamanho[antigo] -= len(lado)
+        novo = self._novo_elemento()
+        self.tamanho[novo] = len(lado)
+        for designacao in lado:
+            elemento = self._novo_elemento()
+            self.pai[elemento] = novo
+            self.elemento[designacao] = elemento
+        self.num_componentes += 1
+        self.orfaos += len(lado)
+        if self.orfaos > len(self.elemento):
+            self.reconstruir(adj)
+
+    def reconstruir(self, adj: Dict[str, Dict[str, Dict]]):
+        """Reconstrói o union-find a partir de adj (descarta os órfãos)."""
+        self._tornar_propria()
+        self.pai, self.tamanho = array('q'), array('q')
+        self.elemento = {designacao: self._novo_elemento() for designacao in adj}
+        self.num_componentes = len(self.elemento)
+        self.orfaos = 0
+        for origem, vizinhos in adj.items():
+            for destino in vizinhos:
+                if origem < destino:
+                    self._unir(self.elemento[origem], self.elemento[destino])
+
+    # --- Pontes e pontos de articulação ---
+
+    def pontes(self, adj: Dict[str, Dict[str, Dict]]) -> Set[Tuple[str, str]]:
+        """Troços cuja remoção separa a rede (recalculados só se a rede mudou)."""
+        return self._calcular_pontes(adj)[0]
+
+    def articulacoes(self, adj: Dict[str, Dict[str, Dict]]) -> Set[str]:
+        """Locais cuja remoção separa a rede."""
+        return self._calcular_pontes(adj)[1]
+
+    def _calcular_pontes(self, adj: Dict[str, Dict[str, Dict]]) -> Tuple[Set[Tuple[str, str]], Set[str]]:
+        if self._pontes_atuais:
+            return self._pontes, self._articulacoes
+        pontes, articulacoes = pontes_e_articulacoes(adj)
+        pontes = set(pontes)
+        if not self.so_leitura: # Num instantâneo a memorização fica na cache da rede
+            self._pontes = pontes
+            self._articulacoes = articulacoes
+            self._pontes_atuais = self._nao_pontes_validas = True
+            self._trocos_novos = set() # Pode estar partilhado: substituir em vez de limpar
+        return pontes, articulacoes
+
+
+def _par(desig1: str, desig2: str) -> Tuple[str, str]:
+    return (desig1, desig2) if desig1 <= desig2 else (desig2, desig1)
+
+
+def _lado_menor_se_separados(adj: Dict[str, Dict[str, Dict]], desig1: str, desig2: str) -> Optional[Set[str]]:
+    """Pesquisa em largura alternada a partir dos dois locais.
+       Retorna None se continuarem ligados, ou o conjunto de locais do lado
+       que se esgotou primeiro (o menor, a menos de um nível da pesquisa).
+    """
+    visitados = ({desig1}, {desig2})
+    fronteiras = (deque([desig1]), deque([desig2]))
+    while True:
+        for lado in (0, 1):
+            if not fronteiras[lado]:
+                return visitados[lado]
+            proprios, outros = visitados[lado], visitados[1 - lado]
+            no = fronteiras[lado].popleft()
+            for vizinho in adj[no]:
+                if vizinho in outros:
+                    return None
+                if vizinho not in proprios:
+                    proprios.add(vizinho)
+                    fronteiras[lado].append(vizinho)
+
+
+def pontes_e_articulacoes(adj: Dict[str, Dict[str, Dict]]) -> Tuple[List[Tuple[str, str]], Set[str]]:
+    """Pontes e pontos de articulação (algoritmo de Tarjan, em versão
+       iterativa para não esgotar a pilha em redes grandes). O(V + E).
+    """
+    ordem: Dict[str, int] = {}
+    minimo: Dict[str, int] = {}
+    pontes: List[Tuple[str, str]] = []
+    articulacoes: Set[str] = set()
+    contador = 0
+
+    for raiz in adj:
+        if raiz in ordem:
+            continue
+        ordem[raiz] = minimo[raiz] = contador
+        contador += 1
+        filhos_raiz = 0
+        # Pilha de (local, pai, iterador dos vizinhos)
+        pilha = [(raiz, None, iter(adj[raiz]))]
+        while pilha:
+            no, pai, vizinhos = pilha[-1]
+            avancou = False
+            for vizinho in vizinhos:
+                if vizinho == pai:
+                    continue
+                if vizinho in ordem:
+                    if ordem[vizinho] < minimo[no]:
+                        minimo[no] = ordem[vizinho]
+                else:
+                    ordem[vizinho] = minimo[vizinho] = contador
+                    contador += 1
+                    pilha.append((vizinho, no, iter(adj[vizinho])))
+                    avancou = True
+                    break
+            if avancou:
+                continue
+            pilha.pop()
+            if pai is None:
+                continue
+            if minimo[no] < minimo[pai]:
+                minimo[pai] = minimo[no]
+            if minimo[no] > ordem[pai]:
+                pontes.append(_par(pai, no))
+            if pai == raiz:
+                filhos_raiz += 1
+            elif minimo[no] >= ordem[pai]:
+                articulacoes.add(pai)
+        if filhos_raiz > 1:
+            articulacoes.add(raiz)
+    return pontes, articulacoes
+
+
+# --- Centralidade de intermediação aproximada ---
+
+def _intermediacao_origens(origens: List[int]) -> array:
+    """Soma das contribuições de Brandes (por posição CSR) para as origens
+       dadas, com caminhos mais curtos por distância. Executado nos processos.
+    """
+    deslocamentos, destinos, distancias = colunas_partilhadas()
+    return _intermediacao_csr(deslocamentos, destinos, distancias, origens)
+
+
+def _intermediacao_csr(deslocamentos, destinos, distancias, origens: List[int]) -> array:
+    num_locais = len(deslocamentos) - 1
+    pontuacao = array('d', [0.0]) * len(destinos)
+    heappush, heappop = heapq.heappush, heapq.heappop
+    for origem in origens:
+        dist = [INFINITO] * num_locais
+        caminhos = [0] * num_locais
+        # Antecessores nos caminhos mais curtos: [(local, posição CSR do troço)]
+        anteriores: List[Optional[List[Tuple[int, int]]]] = [None] * num_locais
+        fechado = bytearray(num_locais)
+        dist[origem], caminhos[origem] = 0.0, 1
+        fila = [(0.0, origem)]
+        ordem = []
+        while fila:
+            d_no, no = heappop(fila)
+            if fechado[no]:
+                continue
+            fechado[no] = 1
+            ordem.append(no)
+            caminhos_no = caminhos[no]
+            for p in range(deslocamentos[no], deslocamentos[no + 1]):
+                vizinho = destinos[p]
+                novo = d_no + distancias[p]
+                atual = dist[vizinho]
+                if novo < atual - 1e-12:
+                    dist[vizinho] = novo
+                    caminhos[vizinho] = caminhos_no
+                    anteriores[vizinho] = [(no, p)]
+                    heappush(fila, (novo, vizinho))
+                elif novo <= atual + 1e-12 and not fechado[vizinho]:
+                    caminhos[vizinho] += caminhos_no
+                    anteriores[vizinho].append((no, p))
+
+        dependencia = [0.0] * num_locais
+        for no in reversed(ordem):
+            fator = (1.0 + dependencia[no]) / caminhos[no]
+            for anterior, p in anteriores[no] or ():
+                contribuicao = caminhos[anterior] * fator
+                pontuacao[p] += contribuicao
+                dependencia[anterior] += contribuicao
+    return pontuacao
+
+
+def intermediacao_trocos(rede, amostras: int = 64, processos: Optional[int] = None,
+                         semente: int = 0) -> List[Tuple[str, str, float]]:
+    """Centralidade de intermediação aproximada de cada troço, por ordem decrescente.
+
+       Em vez de caminhos mais curtos a partir de todos os locais (Brandes,
+       O(V E log V)) usa `amostras` origens aleatórias e escala o resultado
+       por V / amostras. As origens são repartidas por processos que leem o
+       grafo CSR de memória partilhada (ver matriz_distancias).
+       Valores altos indicam troços por onde passam muitos caminhos mais curtos.
+    """
+    grafo = GrafoCompacto.de_rede(rede)
+    num_locais = grafo.num_locais
+    if num_locais == 0:
+        return []
+    origens = random.Random(semente).sample(range(num_locais), min(amostras, num_locais))
+    processos = processos or os.cpu_count() or 1
+
+    if processos == 1 or len(origens) == 1:
+        pontuacao = _intermediacao_csr(grafo.deslocamentos, grafo.destinos, grafo.distancias, origens)
+    else:
+        lotes = [origens[i::processos * 2] for i in range(processos * 2)]
+        pontuacao = array('d', [0.0]) * len(grafo.destinos)
+        with executor_csr_partilhado(grafo, processos) as executor:
+            for parcial in executor.map(_intermediacao_origens, [lote for lote in lotes if lote]):
+                for p, valor in enumerate(parcial):
+                    pontuacao[p] += valor
+
+    # Cada troço está nos dois sentidos; um caminho usa um deles
+    escala = num_locais / len(origens) / 2
+    totais: Dict[Tuple[str, str], float] = {}
+    nomes, deslocamentos, destinos = grafo.nomes, grafo.deslocamentos, grafo.destinos
+    for origem in range(num_locais):
+        for p in range(deslocamentos[origem], deslocamentos[origem + 1]):
+            par = _par(nomes[origem], nomes[destinos[p]])
+            totais[par] = totais.get(par, 0.0) + pontuacao[p] * escala
+    return sorted(((d1, d2, valor) for (d1, d2), valor in totais.items()),
+                  key=lambda troco: (-troco[2], troco[0], troco[1]))
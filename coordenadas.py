@@ -0,0 +1,92 @@
+# coordenadas.py
+from array import array
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from local import distancias_geograficas_de_ponto
+
+
+class TabelaCoordenadas:
+    """Coordenadas de todos os locais em dois array('d') contíguos
+       (latitudes e longitudes), para cálculos de distância em lote.
+
+    Cada local ocupa uma posição fixa; as posições de locais removidos são
+    reutilizadas por inserções seguintes.
+
+    partilhar() não copia nada: a tabela partilhada com um instantâneo é
+    copiada por inteiro na primeira alteração seguinte.
+    """
+
+    def __init__(self):
+        self.latitudes = array('d')
+        self.longitudes = array('d')
+        # {designacao: posição nos arrays} e o inverso (None = posição livre)
+        self.posicoes: Dict[str, int] = {}
+        self.designacoes: List[Optional[str]] = []
+        self.livres: List[int] = []
+        self._partilhada = False
+
+    def __len__(self):
+        return len(self.posicoes)
+
+    def copiar(self) -> 'TabelaCoordenadas':
+        copia = TabelaCoordenadas()
+        copia.latitudes = array('d', self.latitudes)
+        copia.longitudes = array('d', self.longitudes)
+        copia.posicoes = dict(self.posicoes)
+        copia.designacoes = list(self.designacoes)
+        copia.livres = list(self.livres)
+        return copia
+
+    def partilhar(self) -> 'TabelaCoordenadas':
+        """Cópia só de leitura que partilha os arrays com esta tabela."""
+        copia = TabelaCoordenadas()
+        copia.latitudes, copia.longitudes = self.latitudes, self.longitudes
+        copia.posicoes, copia.designacoes, copia.livres = self.posicoes, self.designacoes, self.livres
+        self._partilhada = True
+        return copia
+
+    def _tornar_propria(self):
+        if self._partilhada:
+            propria = self.copiar()
+            self.latitudes, self.longitudes = propria.latitudes, propria.longitudes
+            self.posicoes, self.designacoes, self.livres = propria.posicoes, propria.designacoes, propria.livres
+            self._partilhada = False
+
+    def inserir(self, designacao: str, coords: Tuple[float, float]):
+        self._tornar_propria()
+        posicao = self.posicoes.get(designacao)
+        if posicao is None:
+            if self.livres:
+                posicao = self.livres.pop()
+                self.designacoes[posicao] = designacao
+            else:
+                posicao = len(self.designacoes)
+                self.designacoes.append(designacao)
+                self.latitudes.append(0.0)
+                self.longitudes.append(0.0)
+            self.posicoes[designacao] = posicao
+        self.latitudes[posicao], self.longitudes[posicao] = coords
+
+    def remover(self, designacao: str) -> bool:
+        if designacao not in self.posicoes:
+            return False
+        self._tornar_propria()
+        posicao = self.posicoes.pop(designacao)
+        self.designacoes[posicao] = None
+        self.livres.append(posicao)
+        return True
+
+    def distancias_de(self, ponto: Tuple[float, float],
+                      designacoes: Optional[Iterable[str]] = None) -> List[Tuple[str, float]]:
+        """[(designacao, distancia_km)] do ponto a cada local (a todos, ou só aos indicados)."""
+        if designacoes is None:
+            distancias = distancias_geograficas_de_ponto(ponto, self.latitudes, self.longitudes)
+            return [(desig, dist) for desig, dist in zip(self.designacoes, distancias)
+                    if desig is not None]
+
+        designacoes = list(designacoes)
+        posicoes = [self.posicoes[desig] for desig in designacoes]
+        latitudes, longitudes = self.latitudes, self.longitudes
+        distancias = distancias_geograficas_de_ponto(
+            ponto, [latitudes[p] for p in posicoes], [longitudes[p] for p in posicoes])
+        return list(zip(designacoes, distancias))
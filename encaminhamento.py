@@ -0,0 +1,195 @@
+# encaminhamento.py
+import heapq
+from typing import Callable, Dict, List, Optional, Tuple
+
+from local import calcular_distancia_geografica
+
+# Função de custo de um troço: (origem, destino, dados_troco) -> custo
+FuncaoCusto = Callable[[str, str, Dict], float]
+
+# Média diária de veículos a partir da qual o custo de um troço duplica
+VEICULOS_REFERENCIA = 20000
+
+
+def custo_distancia(origem: str, destino: str, dados: Dict) -> float:
+    """Custo = comprimento do troço em km."""
+    return dados['distancia']
+
+
+def custo_trafego(origem: str, destino: str, dados: Dict) -> float:
+    """Custo = comprimento do troço penalizado pela circulação média.
+       Nunca é inferior à distância, pelo que a heurística Haversine
+       continua admissível.
+    """
+    return dados['distancia'] * (1.0 + dados['media_veiculos'] / VEICULOS_REFERENCIA)
+
+
+FUNCOES_CUSTO: Dict[str, FuncaoCusto] = {
+    'distancia': custo_distancia,
+    'trafego': custo_trafego,
+}
+
+
+class ResultadoRota:
+    """Resultado de um cálculo de caminho mais curto."""
+
+    def __init__(self, caminho: List[str], custo: float, nos_expandidos: int):
+        self.caminho = caminho
+        self.custo = custo
+        self.nos_expandidos = nos_expandidos
+
+    def __str__(self):
+        return (f"Rota: {' -> '.join(self.caminho)}\n"
+                f"  Custo: {self.custo:.2f}\n"
+                f"  Nós expandidos: {self.nos_expandidos}")
+
+    def __repr__(self):
+        return f"ResultadoRota(caminho={self.caminho!r}, custo={self.custo:.3f})"
+
+
+def _reconstruir_caminho(anteriores: Dict[str, Optional[str]], destino: str) -> List[str]:
+    caminho = []
+    no = destino
+    while no is not None:
+        caminho.append(no)
+        no = anteriores[no]
+    caminho.reverse()
+    return caminho
+
+
+def dijkstra(adj: Dict[str, Dict[str, Dict]], origem: str, destino: str,
+             funcao_custo: FuncaoCusto = custo_distancia) -> Optional[ResultadoRota]:
+    """Caminho mais curto com Dijkstra sobre heap binário.
+       Complexidade: O((V + E) log V).
+    """
+    return a_estrela(adj, origem, destino, funcao_custo, heuristica=None)
+
+
+def a_estrela(adj: Dict[str, Dict[str, Dict]], origem: str, destino: str,
+              funcao_custo: FuncaoCusto = custo_distancia,
+              heuristica: Optional[Callable[[str], float]] = None) -> Optional[ResultadoRota]:
+    """Caminho mais curto com A*. A heurística tem de ser um minorante do
+       custo até ao destino; sem heurística o algoritmo é Dijkstra.
+    """
+    if origem not in adj or destino not in adj:
+        return None
+
+    custos = {origem: 0.0}
+    anteriores: Dict[str, Optional[str]] = {origem: None}
+    estimativas: Dict[str, float] = {}
+    fechados = set()
+    h_origem = heuristica(origem) if heuristica else 0.0
+    fila: List[Tuple[float, float, str]] = [(h_origem, 0.0, origem)]
+    nos_expandidos = 0
+
+    while fila:
+        _, custo_atual, no = heapq.heappop(fila)
+        if no in fechados or custo_atual > custos[no]:
+            continue # Entrada obsoleta
+        if no == destino:
+            return ResultadoRota(_reconstruir_caminho(anteriores, destino), custo_atual, nos_expandidos)
+        fechados.add(no)
+        nos_expandidos += 1
+
+        for vizinho, dados in adj[no].items():
+            if vizinho in fechados:
+                continue
+            novo_custo = custo_atual + funcao_custo(no, vizinho, dados)
+            if novo_custo < custos.get(vizinho, float('inf')):
+                custos[vizinho] = novo_custo
+                anteriores[vizinho] = no
+                if heuristica:
+                    h = estimativas.get(vizinho)
+                    if h is None:
+                        h = estimativas[vizinho] = heuristica(vizinho)
+                else:
+                    h = 0.0
+                heapq.heappush(fila, (novo_custo + h, novo_custo, vizinho))
+    return None
+
+
+def distancias_a_partir(adj: Dict[str, Dict[str, Dict]], origem: str,
+                        funcao_custo: FuncaoCusto = custo_distancia) -> Dict[str, float]:
+    """Custo mínimo da origem a todos os nós alcançáveis (Dijkstra completo)."""
+    custos = {origem: 0.0}
+    fechados = set()
+    fila = [(0.0, origem)]
+    while fila:
+        custo_atual, no = heapq.heappop(fila)
+        if no in fechados:
+            continue
+        fechados.add(no)
+        for vizinho, dados in adj[no].items():
+            novo_custo = custo_atual + funcao_custo(no, vizinho, dados)
+            if novo_custo < custos.get(vizinho, float('inf')):
+                custos[vizinho] = novo_custo
+                heapq.heappush(fila, (novo_custo, vizinho))
+    return custos
+
+
+def heuristica_haversine(locais: Dict, destino: str) -> Callable[[str], float]:
+    """Heurística A*: distância Haversine (em km) de cada nó ao destino.
+       É admissível porque adicionar_troco rejeita troços mais curtos do que
+       a distância geográfica entre os extremos.
+    """
+    coords_destino = locais[destino].coords_gps
+    return lambda no: calcular_distancia_geografica(locais[no].coords_gps, coords_destino)
+
+
+def dijkstra_bidirecional(adj: Dict[str, Dict[str, Dict]], origem: str, destino: str,
+                          funcao_custo: FuncaoCusto = custo_distancia) -> Optional[ResultadoRota]:
+    """Dijkstra bidirecional: pesquisa simultânea a partir da origem e do
+       destino, terminando quando as duas fronteiras garantem o ótimo.
+    """
+    if origem not in adj or destino not in adj:
+        return None
+    if origem == destino:
+        return ResultadoRota([origem], 0.0, 0)
+
+    custos = ({origem: 0.0}, {destino: 0.0})
+    anteriores = ({origem: None}, {destino: None})
+    fechados = (set(), set())
+    filas = ([(0.0, origem)], [(0.0, destino)])
+    melhor_custo = float('inf')
+    encontro = None
+    nos_expandidos = 0
+
+    while filas[0] and filas[1]:
+        if filas[0][0][0] + filas[1][0][0] >= melhor_custo:
+            break
+        # Expande o lado com a fronteira mais pequena
+        lado = 0 if len(filas[0]) <= len(filas[1]) else 1
+        custo_atual, no = heapq.heappop(filas[lado])
+        if no in fechados[lado] or custo_atual > custos[lado][no]:
+            continue
+        fechados[lado].add(no)
+        nos_expandidos += 1
+        custos_lado, custos_outro = custos[lado], custos[1 - lado]
+
+        for vizinho, dados in adj[no].items():
+            # No sentido inverso o troço é percorrido de vizinho para no
+            if lado == 0:
+                novo_custo = custo_atual + funcao_custo(no, vizinho, dados)
+            else:
+                novo_custo = custo_atual + funcao_custo(vizinho, no, dados)
+            if novo_custo < custos_lado.get(vizinho, float('inf')):
+                custos_lado[vizinho] = novo_custo
+                anteriores[lado][vizinho] = no
+                heapq.heappush(filas[lado], (novo_custo, vizinho))
+            if vizinho in custos_outro:
+                total = custos_lado[vizinho] + custos_outro[vizinho]
+                if total < melhor_custo:
+                    melhor_custo = total
+                    encontro = vizinho
+
+    if encontro is None:
+        return None
+    caminho = _reconstruir_caminho(anteriores[0], encontro)
+    no = anteriores[1][encontro]
+    while no is not None:
+        caminho.append(no)
+        no = anteriores[1][no]
+    return ResultadoRota(caminho, melhor_custo, nos_expandidos)
+
+
+ALGORITMOS = ('dijkstra', 'a_estrela', 'bidirecional')
@@ -0,0 +1,87 @@
+# gerador_rede.py
+import math
+import random
+from typing import Tuple
+
+from local import Local, calcular_distancia_geografica
+from rede_viaria import RedeViaria
+
+# Vocabulário das palavras-chave sintéticas, das mais para as menos frequentes
+PALAVRAS_CHAVE = ('cafe', 'restaurante', 'escola', 'farmacia', 'jardim', 'igreja', 'mercado',
+                  'paragem', 'ginasio', 'biblioteca', 'museu', 'hospital', 'estadio', 'teatro',
+                  'hotel', 'praia', 'miradouro', 'universidade', 'cinema', 'bombeiros')
+
+
+def gerar_rede_grelha(linhas: int, colunas: int, semente: int = 42,
+                      origem_gps: Tuple[float, float] = (41.10, -8.70),
+                      espacamento_graus: float = 0.002, desvio: float = 0.0,
+                      prob_diagonal: float = 0.0, palavras_chave: bool = False) -> RedeViaria:
+    """Gera uma rede sintética em grelha (linhas x colunas locais).
+
+       Cada local liga-se aos vizinhos a leste e a sul. As distâncias dos
+       troços são a distância Haversine multiplicada por um fator >= 1,
+       para respeitar a validação de adicionar_troco.
+
+       desvio: deslocação aleatória de cada local, em fração do espaçamento
+       (abaixo de 0.5 a grelha continua sem cruzamentos de troços).
+       prob_diagonal: probabilidade de cada quarteirão ter uma diagonal
+       (sempre a mesma, para a rede continuar planar).
+       palavras_chave: atribui 0 a 3 palavras-chave de PALAVRAS_CHAVE a cada
+       local, com frequências decrescentes (lei de Zipf).
+    """
+    aleatorio = random.Random(semente)
+    rede = RedeViaria()
+    pesos = [1 / (i + 1) for i in range(len(PALAVRAS_CHAVE))]
+
+    def criar_local(lin: int, col: int) -> Local:
+        lat = origem_gps[0] + lin * espacamento_graus
+        lon = origem_gps[1] + col * espacamento_graus
+        if desvio: # Só consome números aleatórios se pedido (mantém as redes já geradas)
+            lat += aleatorio.uniform(-desvio, desvio) * espacamento_graus
+            lon += aleatorio.uniform(-desvio, desvio) * espacamento_graus
+        palavras = (set(aleatorio.choices(PALAVRAS_CHAVE, pesos, k=aleatorio.randint(0, 3)))
+                    if palavras_chave else ())
+        return Local(nome_no(lin, col), f"Freguesia {lin * 4 // linhas}-{col * 4 // colunas}",
+                     (lat, lon), palavras)
+
+    rede.adicionar_locais_em_lote(criar_local(lin, col) for lin in range(linhas) for col in range(colunas))
+    rede.adicionar_trocos_em_lote(gerar_trocos_grelha(rede, linhas, colunas, aleatorio, prob_diagonal))
+    return rede
+
+
+def gerar_trocos_grelha(rede: RedeViaria, linhas: int, colunas: int, aleatorio: random.Random,
+                        prob_diagonal: float = 0.0):
+    """Gera (desig1, desig2, distancia, media_veiculos) para os troços da grelha."""
+    for lin in range(linhas):
+        for col in range(colunas):
+            vizinhos = [(lin, col + 1), (lin + 1, col)]
+            if prob_diagonal and aleatorio.random() < prob_diagonal:
+                vizinhos.append((lin + 1, col + 1))
+            for lin2, col2 in vizinhos:
+                if lin2 < linhas and col2 < colunas:
+                    desig1, desig2 = nome_no(lin, col), nome_no(lin2, col2)
+                    distancia_geo = calcular_distancia_geografica(
+                        rede.locais[desig1].coords_gps, rede.locais[desig2].coords_gps)
+                    yield (desig1, desig2, distancia_geo * aleatorio.uniform(1.0, 1.5),
+                           aleatorio.randint(100, 30000))
+
+
+def gerar_rede_municipal(num_locais: int, semente: int = 42) -> RedeViaria:
+    """Rede com cerca de num_locais locais parecida com uma rede municipal:
+       grelha quase quadrada com coordenadas desviadas até 30% do
+       espaçamento, 20% de quarteirões com diagonal e palavras-chave.
+    """
+    linhas, colunas = dimensoes_grelha(num_locais)
+    return gerar_rede_grelha(linhas, colunas, semente, desvio=0.3, prob_diagonal=0.2,
+                             palavras_chave=True)
+
+
+def dimensoes_grelha(num_locais: int) -> Tuple[int, int]:
+    """(linhas, colunas) da grelha mais quadrada com pelo menos num_locais locais."""
+    linhas = max(1, math.isqrt(num_locais))
+    return linhas, max(1, -(-num_locais // linhas))
+
+
+def nome_no(lin: int, col: int) -> str:
+    """Designação do local na posição (lin, col) da grelha."""
+    return f"L{lin}_{col}"
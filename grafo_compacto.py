@@ -0,0 +1,144 @@
+# grafo_compacto.py
+import heapq
+from array import array
+from typing import Dict, List, Optional, Set, Tuple
+
+from encaminhamento import ResultadoRota
+
+INFINITO = float('inf')
+
+
+class GrafoCompacto:
+    """Instantâneo só de leitura da rede em formato CSR (compressed sparse row).
+
+    Os locais passam a ser identificados por inteiros 0..V-1. Os vizinhos do
+    local i são destinos[deslocamentos[i]:deslocamentos[i + 1]], com a
+    distância e a média de veículos de cada troço nas mesmas posições de
+    distancias/veiculos. Cada troço não direcionado aparece nos dois sentidos.
+    Todas as colunas são array.array contíguos (ou memoryview de um ficheiro
+    mapeado em memória, ver persistencia.py), sem um dicionário por troço.
+    """
+
+    def __init__(self, nomes: List[str], latitudes: array, longitudes: array,
+                 deslocamentos: array, destinos: array, distancias: array, veiculos: array):
+        self.nomes = nomes
+        self.ids: Dict[str, int] = {nome: i for i, nome in enumerate(nomes)}
+        self.latitudes = latitudes
+        self.longitudes = longitudes
+        self.deslocamentos = deslocamentos
+        self.destinos = destinos
+        self.distancias = distancias
+        self.veiculos = veiculos
+        # Ficheiro mapeado em memória de onde as colunas foram lidas, se for o caso
+        self.mapa = None
+
+    @classmethod
+    def de_rede(cls, rede) -> 'GrafoCompacto':
+        """Constrói o instantâneo CSR a partir de uma RedeViaria."""
+        nomes = list(rede.locais)
+        ids = {nome: i for i, nome in enumerate(nomes)}
+        latitudes, longitudes = array('d'), array('d')
+        deslocamentos = array('q', [0])
+        destinos, distancias, veiculos = array('q'), array('d'), array('q')
+
+        for nome in nomes:
+            lat, lon = rede.locais[nome].coords_gps
+            latitudes.append(lat)
+            longitudes.append(lon)
+            for vizinho, dados in rede.adj[nome].items():
+                destinos.append(ids[vizinho])
+                distancias.append(dados['distancia'])
+                veiculos.append(dados['media_veiculos'])
+            deslocamentos.append(len(destinos))
+        return cls(nomes, latitudes, longitudes, deslocamentos, destinos, distancias, veiculos)
+
+    @property
+    def num_locais(self) -> int:
+        return len(self.nomes)
+
+    @property
+    def num_trocos(self) -> int:
+        return len(self.destinos) // 2
+
+    def vizinhos(self, designacao: str) -> List[Tuple[str, float, int]]:
+        """[(vizinho, distancia, media_veiculos)] de um local."""
+        i = self.ids[designacao]
+        return [(self.nomes[self.destinos[p]], self.distancias[p], self.veiculos[p])
+                for p in range(self.deslocamentos[i], self.deslocamentos[i + 1])]
+
+    def consultar_troco(self, desig1: str, desig2: str) -> Optional[Dict]:
+        """Dados do troço no mesmo formato de RedeViaria.consultar_troco (sem mensagens)."""
+        i, j = self.ids.get(desig1), self.ids.get(desig2)
+        if i is None or j is None:
+            return None
+        for p in range(self.deslocamentos[i], self.deslocamentos[i + 1]):
+            if self.destinos[p] == j:
+                return {'distancia': self.distancias[p], 'media_veiculos': self.veiculos[p]}
+        return None
+
+    def distancias_a_partir(self, origem: int) -> array:
+        """Distância mínima (km) do local origem a todos os locais (Dijkstra).
+           Locais inalcançáveis ficam com infinito.
+        """
+        return dijkstra_csr(self.deslocamentos, self.destinos, self.distancias, origem)
+
+    def caminho_mais_curto(self, origem: str, destino: str) -> Optional[ResultadoRota]:
+        """Caminho mais curto por distância (Dijkstra sobre CSR)."""
+        if origem not in self.ids or destino not in self.ids:
+            return None
+        deslocamentos, destinos, distancias = self.deslocamentos, self.destinos, self.distancias
+        alvo = self.ids[destino]
+        dist = array('d', [INFINITO]) * len(self.nomes)
+        anteriores = array('q', [-1]) * len(self.nomes)
+        inicio = self.ids[origem]
+        dist[inicio] = 0.0
+        fila = [(0.0, inicio)]
+        nos_expandidos = 0
+
+        while fila:
+            d_no, no = heapq.heappop(fila)
+            if d_no > dist[no]:
+                continue
+            if no == alvo:
+                caminho = []
+                while no != -1:
+                    caminho.append(self.nomes[no])
+                    no = anteriores[no]
+                caminho.reverse()
+                return ResultadoRota(caminho, d_no, nos_expandidos)
+            nos_expandidos += 1
+            for p in range(deslocamentos[no], deslocamentos[no + 1]):
+                novo = d_no + distancias[p]
+                vizinho = destinos[p]
+                if novo < dist[vizinho]:
+                    dist[vizinho] = novo
+                    anteriores[vizinho] = no
+                    heapq.heappush(fila, (novo, vizinho))
+        return None
+
+
+def dijkstra_csr(deslocamentos, destinos, distancias, origem: int,
+                 alvos: Optional[Set[int]] = None) -> array:
+    """Dijkstra sobre colunas CSR (array, memoryview ou memória partilhada).
+       Com alvos, termina assim que todos esses nós tiverem distância final.
+       Retorna as distâncias (infinito = inalcançável ou não calculado).
+    """
+    dist = array('d', [INFINITO]) * (len(deslocamentos) - 1)
+    dist[origem] = 0.0
+    fila = [(0.0, origem)]
+    por_fixar = set(alvos) if alvos is not None else None
+    while fila:
+        d_no, no = heapq.heappop(fila)
+        if d_no > dist[no]:
+            continue
+        if por_fixar is not None:
+            por_fixar.discard(no)
+            if not por_fixar:
+                break
+        for p in range(deslocamentos[no], deslocamentos[no + 1]):
+            novo = d_no + distancias[p]
+            vizinho = destinos[p]
+            if novo < dist[vizinho]:
+                dist[vizinho] = novo
+                heapq.heappush(fila, (novo, vizinho))
+    return dist
@@ -0,0 +1,200 @@
+# indice_espacial.py
+import heapq
+import math
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from local import calcular_distancia_geografica, distancias_geograficas_de_ponto
+
+KM_POR_GRAU_LATITUDE = 111.195  # 2 * pi * 6371 / 360
+
+
+class GrelhaEspacial:
+    """Índice espacial em grelha regular (células de lado fixo em graus).
+
+    Cada célula guarda as designações dos locais cujas coordenadas caem nela.
+    As pesquisas por raio percorrem apenas as células que intersetam a
+    caixa envolvente do círculo e só calculam Haversine para os candidatos
+    dentro dessa caixa.
+    """
+
+    def __init__(self, tamanho_celula: float = 0.01):
+        if tamanho_celula <= 0:
+            raise ValueError("Tamanho da célula tem de ser positivo.")
+        self.tamanho_celula = tamanho_celula
+        # {(linha, coluna): {designacao: (latitude, longitude)}}
+        self.celulas: Dict[Tuple[int, int], Dict[str, Tuple[float, float]]] = {}
+        # {designacao: (linha, coluna)} para remoção em O(1)
+        self.posicoes: Dict[str, Tuple[int, int]] = {}
+        # Células não partilhadas com instantâneos (None = todas)
+        self._proprias: Optional[set] = None
+
+    def __len__(self):
+        return len(self.posicoes)
+
+    def copiar(self) -> 'GrelhaEspacial':
+        copia = GrelhaEspacial(self.tamanho_celula)
+        copia.celulas = {celula: dict(conteudo) for celula, conteudo in self.celulas.items()}
+        copia.posicoes = dict(self.posicoes)
+        return copia
+
+    def partilhar(self) -> 'GrelhaEspacial':
+        """Cópia só de leitura que partilha o conteúdo das células com este
+           índice. A partir daqui este índice copia cada célula antes de a alterar.
+        """
+        copia = GrelhaEspacial(self.tamanho_celula)
+        copia.celulas = dict(self.celulas)
+        copia.posicoes = dict(self.posicoes)
+        self._proprias = set()
+        return copia
+
+    def _conteudo_proprio(self, celula: Tuple[int, int]) -> Dict[str, Tuple[float, float]]:
+        conteudo = self.celulas.get(celula)
+        if conteudo is None:
+            conteudo = self.celulas[celula] = {}
+        elif self._proprias is None or celula in self._proprias:
+            return conteudo
+        else:
+            conteudo = self.celulas[celula] = dict(conteudo)
+        if self._proprias is not None:
+            self._proprias.add(celula)
+        return conteudo
+
+    def _celula(self, coords: Tuple[float, float]) -> Tuple[int, int]:
+        return (math.floor(coords[0] / self.tamanho_celula),
+                math.floor(coords[1] / self.tamanho_celula))
+
+    def inserir(self, designacao: str, coords: Tuple[float, float]):
+        """Insere (ou reposiciona) um local no índice."""
+        if designacao in self.posicoes:
+            self.remover(designacao)
+        celula = self._celula(coords)
+        self._conteudo_proprio(celula)[designacao] = coords
+        self.posicoes[designacao] = celula
+
+    def remover(self, designacao: str) -> bool:
+        """Remove um local do índice. Retorna False se não existir."""
+        celula = self.posicoes.pop(designacao, None)
+        if celula is None:
+            return False
+        conteudo = self._conteudo_proprio(celula)
+        del conteudo[designacao]
+        if not conteudo:
+            del self.celulas[celula]
+            if self._proprias is not None:
+                self._proprias.discard(celula)
+        return True
+
+    def _candidatos_caixa(self, lat_min: float, lat_max: float,
+                          intervalos_lon: Optional[List[Tuple[float, float]]]):
+        """Gera (designacao, coords) dentro da caixa envolvente dada.
+           intervalos_lon: intervalos [lon_min, lon_max] dentro de [-180, 180]
+           (dois quando a caixa cruza o antimeridiano), ou None para todas
+           as longitudes.
+        """
+        t = self.tamanho_celula
+        lat_min, lat_max = max(lat_min, -90.0), min(lat_max, 90.0)
+        lin_min, lin_max = math.floor(lat_min / t), math.floor(lat_max / t)
+
+        if intervalos_lon is None:
+            # Todas as longitudes: percorrer as células ocupadas das linhas da caixa
+            for (lin, _), conteudo in self.celulas.items():
+                if lin_min <= lin <= lin_max:
+                    for designacao, coords in conteudo.items():
+                        if lat_min <= coords[0] <= lat_max:
+                            yield designacao, coords
+            return
+
+        for lon_min, lon_max in intervalos_lon:
+            col_min, col_max = math.floor(lon_min / t), math.floor(lon_max / t)
+            num_celulas_caixa = (lin_max - lin_min + 1) * (col_max - col_min + 1)
+
+            if num_celulas_caixa <= len(self.celulas):
+                # Caixa pequena: visitar apenas as células da caixa
+                celulas = (self.celulas.get((lin, col))
+                           for lin in range(lin_min, lin_max + 1)
+                           for col in range(col_min, col_max + 1))
+            else:
+                # Caixa maior que a rede ocupada: percorrer só as células não vazias
+                celulas = (conteudo for (lin, col), conteudo in self.celulas.items()
+                           if lin_min <= lin <= lin_max and col_min <= col <= col_max)
+
+            for conteudo in celulas:
+                if not conteudo:
+                    continue
+                for designacao, coords in conteudo.items():
+                    if lat_min <= coords[0] <= lat_max and lon_min <= coords[1] <= lon_max:
+                        yield designacao, coords
+
+    def _candidatos_raio(self, ponto_gps: Tuple[float, float], raio_km: float):
+        """Gera (designacao, coords) dentro da caixa envolvente do círculo."""
+        lat = ponto_gps[0]
+        lon = (ponto_gps[1] + 180.0) % 360.0 - 180.0 # Longitude em [-180, 180)
+        # Pequena margem para não perder pontos na fronteira por arredondamento
+        delta_lat = raio_km / KM_POR_GRAU_LATITUDE * (1 + 1e-9) + 1e-12
+        lat_min, lat_max = lat - delta_lat, lat + delta_lat
+        cos_lat = math.cos(math.radians(min(max(abs(lat_min), abs(lat_max)), 90.0)))
+
+        if lat_min <= -90 or lat_max >= 90 or cos_lat <= 1e-12:
+            # Círculo contém um pólo: a caixa abrange todas as longitudes
+            return self._candidatos_caixa(lat_min, lat_max, None)
+        delta_lon = delta_lat / cos_lat
+        if delta_lon >= 180:
+            # Dá a volta ao globo: só a latitude poda
+            return self._candidatos_caixa(lat_min, lat_max, None)
+        lon_min, lon_max = lon - delta_lon, lon + delta_lon
+        if lon_min < -180:
+            # Cruza o antimeridiano: dois intervalos, um de cada lado
+            intervalos = [(-180.0, lon_max), (lon_min + 360.0, 180.0)]
+        elif lon_max > 180:
+            intervalos = [(lon_min, 180.0), (-180.0, lon_max - 360.0)]
+        else:
+            intervalos = [(lon_min, lon_max)]
+        return self._candidatos_caixa(lat_min, lat_max, intervalos)
+
+    def iterar_raio(self, ponto_gps: Tuple[float, float], raio_km: float) -> Iterator[Tuple[str, float]]:
+        """Versão preguiçosa de pesquisar_raio: gera (designacao, distancia_km)
+           à medida que percorre as células, sem construir listas.
+        """
+        if raio_km < 0:
+            return
+        for designacao, coords in self._candidatos_raio(ponto_gps, raio_km):
+            distancia = calcular_distancia_geografica(ponto_gps, coords)
+            if distancia <= raio_km:
+                yield designacao, distancia
+
+    def pesquisar_raio(self, ponto_gps: Tuple[float, float],
+                       raio_km: float) -> List[Tuple[str, float]]:
+        """Retorna [(designacao, distancia_km)] dos locais a até raio_km do ponto."""
+        if raio_km < 0 or not self.posicoes:
+            return []
+        candidatos = self._candidatos_raio(ponto_gps, raio_km)
+
+        # Haversine em lote só para os candidatos dentro da caixa
+        designacoes, latitudes, longitudes = [], [], []
+        for designacao, (lat_c, lon_c) in candidatos:
+            designacoes.append(designacao)
+            latitudes.append(lat_c)
+            longitudes.append(lon_c)
+        distancias = distancias_geograficas_de_ponto(ponto_gps, latitudes, longitudes)
+        return [(designacao, distancia) for designacao, distancia in zip(designacoes, distancias)
+                if distancia <= raio_km]
+
+    def mais_proximos(self, ponto_gps: Tuple[float, float], k: int,
+                      raio_inicial_km: Optional[float] = None) -> List[Tuple[str, float]]:
+        """Retorna os k locais mais próximos do ponto, [(designacao, distancia_km)],
+           ordenados por distância crescente.
+
+           Pesquisa por raios sucessivamente maiores: assim que um raio contém
+           pelo menos k locais, os k mais próximos estão garantidamente nele.
+        """
+        if k <= 0 or not self.posicoes:
+            return []
+        k = min(k, len(self.posicoes))
+        raio = raio_inicial_km or self.tamanho_celula * KM_POR_GRAU_LATITUDE
+        meia_circunferencia_km = math.pi * 6371.0
+
+        while True:
+            encontrados = self.pesquisar_raio(ponto_gps, raio)
+            if len(encontrados) >= k or raio >= meia_circunferencia_km:
+                return heapq.nsmallest(k, encontrados, key=lambda par: (par[1], par[0]))
+            raio *= 2
@@ -0,0 +1,136 @@
+# indice_invertido.py
+from typing import Dict, Iterable, List, Optional, Set
+
+VAZIO: frozenset = frozenset()
+
+
+class IndiceInvertido:
+    """Índice invertido: termo -> conjunto de designações de locais."""
+
+    def __init__(self):
+        self.entradas: Dict[str, Set[str]] = {}
+        # Termos cujos conjuntos não são partilhados com instantâneos (None = todos)
+        self._proprios: Optional[Set[str]] = None
+
+    def copiar(self) -> 'IndiceInvertido':
+        copia = IndiceInvertido()
+        copia.entradas = {termo: set(conjunto) for termo, conjunto in self.entradas.items()}
+        return copia
+
+    def partilhar(self) -> 'IndiceInvertido':
+        """Cópia só de leitura que partilha os conjuntos com este índice.
+           A partir daqui este índice copia cada conjunto antes de o alterar.
+        """
+        copia = IndiceInvertido()
+        copia.entradas = dict(self.entradas)
+        self._proprios = set()
+        return copia
+
+    def _conjunto_proprio(self, termo: str) -> Optional[Set[str]]:
+        conjunto = self.entradas.get(termo)
+        if conjunto is not None and self._proprios is not None and termo not in self._proprios:
+            conjunto = self.entradas[termo] = set(conjunto)
+            self._proprios.add(termo)
+        return conjunto
+
+    def adicionar(self, termo: str, designacao: str):
+        conjunto = self._conjunto_proprio(termo)
+        if conjunto is None:
+            conjunto = self.entradas[termo] = set()
+            if self._proprios is not None:
+                self._proprios.add(termo)
+        conjunto.add(designacao)
+
+    def remover(self, termo: str, designacao: str):
+        if designacao not in self.entradas.get(termo, VAZIO):
+            return
+        conjunto = self._conjunto_proprio(termo)
+        conjunto.discard(designacao)
+        if not conjunto:
+            del self.entradas[termo]
+            if self._proprios is not None:
+                self._proprios.discard(termo)
+
+    def obter(self, termo: str) -> Set[str]:
+        """Retorna o conjunto de designações do termo (não modificar)."""
+        return self.entradas.get(termo, VAZIO)
+
+
+def trigramas(texto: str) -> Set[str]:
+    """Conjunto de trigramas (substrings de 3 caracteres) do texto."""
+    return {texto[i:i + 3] for i in range(len(texto) - 2)}
+
+
+class IndiceTrigramas:
+    """Índice de trigramas sobre designações normalizadas (minúsculas),
+       para pesquisa por substring sem percorrer todos os locais.
+    """
+
+    def __init__(self):
+        self.trigramas = IndiceInvertido()
+        # {designacao: designacao.lower()} calculado uma única vez
+        self.normalizadas: Dict[str, str] = {}
+
+    def copiar(self) -> 'IndiceTrigramas':
+        copia = IndiceTrigramas()
+        copia.trigramas = self.trigramas.copiar()
+        copia.normalizadas = dict(self.normalizadas)
+        return copia
+
+    def partilhar(self) -> 'IndiceTrigramas':
+        """Cópia só de leitura que partilha os conjuntos de cada trigrama (ver IndiceInvertido)."""
+        copia = IndiceTrigramas()
+        copia.trigramas = self.trigramas.partilhar()
+        copia.normalizadas = dict(self.normalizadas)
+        return copia
+
+    def adicionar(self, designacao: str, normalizada: Optional[str] = None):
+        if normalizada is None:
+            normalizada = designacao.lower()
+        self.normalizadas[designacao] = normalizada
+        for trigrama in trigramas(normalizada):
+            self.trigramas.adicionar(trigrama, designacao)
+
+    def remover(self, designacao: str):
+        normalizada = self.normalizadas.pop(designacao, None)
+        if normalizada is None:
+            return
+        for trigrama in trigramas(normalizada):
+            self.trigramas.remover(trigrama, designacao)
+
+    def candidatos(self, subcadeia: str) -> Optional[Set[str]]:
+        """Menor conjunto de trigramas da subcadeia: contém todas as designações
+           que a incluem (e outras, a confirmar). None se a subcadeia for curta
+           demais para ter trigramas.
+        """
+        subcadeia = subcadeia.lower()
+        if len(subcadeia) < 3:
+            return None
+        return min((self.trigramas.obter(t) for t in trigramas(subcadeia)), key=len)
+
+    def pesquisar(self, subcadeia: str) -> Set[str]:
+        """Designações que contêm a subcadeia (sem distinguir maiúsculas)."""
+        subcadeia = subcadeia.lower()
+        normalizadas = self.normalizadas
+        if len(subcadeia) < 3:
+            # Consultas muito curtas não têm trigramas: percorre as designações
+            return {desig for desig, norm in normalizadas.items() if subcadeia in norm}
+
+        candidatos = intersetar([self.trigramas.obter(t) for t in trigramas(subcadeia)])
+        # Os trigramas só filtram: confirmar que a subcadeia aparece mesmo
+        return {desig for desig in candidatos if subcadeia in normalizadas[desig]}
+
+
+def intersetar(conjuntos: Iterable[Set[str]]) -> Set[str]:
+    """Interseção de conjuntos, começando pelo mais pequeno.
+       O custo é proporcional ao tamanho do menor conjunto.
+    """
+    ordenados: List[Set[str]] = sorted(conjuntos, key=len)
+    if not ordenados:
+        return set()
+    resultado = set(ordenados[0])
+    for conjunto in ordenados[1:]:
+        if not resultado:
+            break
+        resultado.intersection_update(conjunto)
+    return resultado
@@ -0,0 +1,291 @@
+# instrumentacao.py
+import cProfile
+import functools
+import io
+import pstats
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+import coordenadas
+import encaminhamento
+import indice_espacial
+import rede_viaria as modulo_rede
+import serie_temporal
+from rede_viaria import RedeViaria
+
+# Pontos de chamada do Haversine na rede: (módulo, nome importado, em lote)
+_PONTOS_HAVERSINE = (
+    (modulo_rede, 'calcular_distancia_geografica', False),
+    (modulo_rede, 'distancias_geograficas_pares', True),
+    (encaminhamento, 'calcular_distancia_geografica', False),
+    (indice_espacial, 'calcular_distancia_geografica', False),
+    (indice_espacial, 'distancias_geograficas_de_ponto', True),
+    (coordenadas, 'distancias_geograficas_de_ponto', True),
+    (serie_temporal, 'calcular_distancia_geografica', False),
+)
+# Ordenações usadas pela rede: ordenar_designacoes (pesquisas, componentes,
+# articulações) e RankingTrocos.top (ver ativar)
+_PONTOS_ORDENACAO = ((modulo_rede, 'ordenar_designacoes'),)
+
+
+class Histograma:
+    """Latências em classes de potências de 2 microssegundos (classe i: < 2^i µs)."""
+
+    def __init__(self):
+        self.classes: List[int] = []
+        self.chamadas = 0
+        self.total_s = 0.0
+        self.maximo_s = 0.0
+
+    def registar(self, segundos: float):
+        classe = int(segundos * 1e6).bit_length()
+        if classe >= len(self.classes):
+            self.classes.extend([0] * (classe + 1 - len(self.classes)))
+        self.classes[classe] += 1
+        self.chamadas += 1
+        self.total_s += segundos
+        if segundos > self.maximo_s:
+            self.maximo_s = segundos
+
+    def percentil_ms(self, p: float) -> float:
+        """Limite superior (ms) da classe que contém o percentil p (0-100)."""
+        alvo = p / 100 * self.chamadas
+        acumulado = 0
+        for classe, contagem in enumerate(self.classes):
+            acumulado += contagem
+            if contagem and acumulado >= alvo:
+                return (1 << classe) / 1000
+        return 0.0
+
+    def resumo(self) -> Dict[str, Any]:
+        return {
+            'chamadas': self.chamadas,
+            'total_ms': self.total_s * 1000,
+            'media_ms': self.total_s * 1000 / self.chamadas if self.chamadas else 0.0,
+            'maximo_ms': self.maximo_s * 1000,
+            'p50_ms': self.percentil_ms(50),
+            'p99_ms': self.percentil_ms(99),
+            # {limite superior em µs: chamadas}
+            'histograma_us': {1 << classe: contagem for classe, contagem in enumerate(self.classes) if contagem},
+        }
+
+
+class Instrumentacao:
+    """Contadores e latências recolhidos numa rede instrumentada (ver ativar)."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.operacoes: Dict[str, Histograma] = {}
+        # {etapa de pesquisar_locais: [execuções, candidatos somados, máximo]}
+        self.etapas: Dict[str, List[int]] = {}
+        self.ordenacoes: Dict[str, Histograma] = {}
+        self.haversine = 0
+
+    def registar_operacao(self, nome: str, segundos: float):
+        with self._lock:
+            histograma = self.operacoes.get(nome)
+            if histograma is None:
+                histograma = self.operacoes[nome] = Histograma()
+            histograma.registar(segundos)
+
+    def registar_etapa(self, etapa: str, candidatos: int, segundos: Optional[float] = None):
+        with self._lock:
+            contagem = self.etapas.setdefault(etapa, [0, 0, 0])
+            contagem[0] += 1
+            contagem[1] += candidatos
+            contagem[2] = max(contagem[2], candidatos)
+        if segundos is not None:
+            self.registar_ordenacao(f"pesquisar_locais.{etapa}", segundos)
+
+    def registar_ordenacao(self, nome: str, segundos: float):
+        with self._lock:
+            histograma = self.ordenacoes.get(nome)
+            if histograma is None:
+                histograma = self.ordenacoes[nome] = Histograma()
+            histograma.registar(segundos)
+
+    def registar_haversine(self, calculos: int):
+        with self._lock:
+            self.haversine += calculos
+
+    def limpar(self):
+        with self._lock:
+            self.operacoes.clear()
+            self.etapas.clear()
+            self.ordenacoes.clear()
+            self.haversine = 0
+
+    def estatisticas(self) -> Dict[str, Any]:
+        """Instantâneo (cópia) de todos os contadores."""
+        with self._lock:
+            return {
+                'operacoes': {nome: h.resumo() for nome, h in sorted(self.operacoes.items())},
+                'etapas_pesquisa': {
+                    etapa: {'execucoes': n, 'candidatos_media': total / n if n else 0.0, 'candidatos_maximo': maximo}
+                    for etapa, (n, total, maximo) in self.etapas.items()},
+                'ordenacoes': {nome: h.resumo() for nome, h in sorted(self.ordenacoes.items())},
+                'haversine': self.haversine,
+            }
+
+
+# --- Ativação ---
+#
+# Os métodos públicos da rede são substituídos por versões medidas como
+# atributos da instância, que se sobrepõem aos da classe. Desativar apaga
+# esses atributos: uma rede não instrumentada executa o código original,
+# sem qualquer verificação extra (exceto a sonda de pesquisar_locais, que
+# é um teste a None por etapa).
+#
+# A contagem de Haversine e os tempos de ordenar_designacoes são medidos
+# substituindo essas funções nos pontos de chamada listados acima (não em
+# todos os módulos), enquanto houver redes instrumentadas. Cada chamada conta
+# só para a rede instrumentada cujo método está a executar nessa thread
+# (_atual); fora desses métodos as funções substitutas limitam-se a chamar
+# as originais. RankingTrocos.top é medido no ranking da própria rede.
+
+_lock_ativas = threading.Lock()
+_ativas = 0
+_originais: List[Tuple[Any, str, Callable]] = []
+_atual = threading.local()
+
+
+def ativar(rede: RedeViaria) -> Instrumentacao:
+    """Instrumenta a rede (se ainda não estiver) e devolve os seus contadores."""
+    instrumentacao = rede.__dict__.get('instrumentacao')
+    if instrumentacao is not None:
+        return instrumentacao
+    instrumentacao = Instrumentacao()
+
+    for nome in _metodos_publicos():
+        setattr(rede, nome, _medir_metodo(getattr(rede, nome), nome, instrumentacao))
+    rede.sonda_pesquisa = instrumentacao.registar_etapa
+    rede.ranking_trocos.top = _medir_ordenacao(rede.ranking_trocos.top, 'RankingTrocos.top', instrumentacao)
+    rede.instrumentacao = instrumentacao
+
+    global _ativas
+    with _lock_ativas:
+        if not _ativas:
+            _substituir_funcoes_globais()
+        _ativas += 1
+    return instrumentacao
+
+
+def desativar(rede: RedeViaria) -> Optional[Instrumentacao]:
+    """Repõe os métodos originais. Devolve os contadores recolhidos."""
+    instrumentacao = rede.__dict__.pop('instrumentacao', None)
+    if instrumentacao is None:
+        return None
+    for nome in _metodos_publicos():
+        rede.__dict__.pop(nome, None)
+    rede.sonda_pesquisa = None
+    rede.ranking_trocos.__dict__.pop('top', None)
+
+    global _ativas
+    with _lock_ativas:
+        _ativas -= 1
+        if not _ativas:
+            _repor_funcoes_globais()
+    return instrumentacao
+
+
+def _metodos_publicos() -> List[str]:
+    return [nome for nome in dir(RedeViaria)
+            if not nome.startswith('_') and callable(getattr(RedeViaria, nome))]
+
+
+def _medir_metodo(metodo: Callable, nome: str, instrumentacao: Instrumentacao) -> Callable:
+    """Versão do método que regista a latência de cada chamada e que, durante
+       a chamada, é a rede a quem contam o Haversine e as ordenações nesta
+       thread. Para métodos que devolvem geradores mede só a criação do gerador.
+    """
+    registar = instrumentacao.registar_operacao
+    relogio = time.perf_counter
+
+    @functools.wraps(metodo)
+    def medido(*args, **kwargs):
+        anterior = getattr(_atual, 'instrumentacao', None)
+        _atual.instrumentacao = instrumentacao
+        inicio = relogio()
+        try:
+            return metodo(*args, **kwargs)
+        finally:
+            registar(nome, relogio() - inicio)
+            _atual.instrumentacao = anterior
+    return medido
+
+
+def _contar_haversine(funcao: Callable, em_lote: bool) -> Callable:
+    @functools.wraps(funcao)
+    def contada(*args, **kwargs):
+        resultado = funcao(*args, **kwargs)
+        instrumentacao = getattr(_atual, 'instrumentacao', None)
+        if instrumentacao is not None:
+            # Versões em lote: um cálculo por distância devolvida
+            instrumentacao.registar_haversine(len(resultado) if em_lote else 1)
+        return resultado
+    return contada
+
+
+def _medir_ordenacao(funcao: Callable, nome: str,
+                     instrumentacao: Optional[Instrumentacao] = None) -> Callable:
+    """Versão medida de uma ordenação. Sem instrumentacao fixa, conta para a
+       rede instrumentada em execução nesta thread (se houver).
+    """
+    @functools.wraps(funcao)
+    def medida(*args, **kwargs):
+        destino = instrumentacao or getattr(_atual, 'instrumentacao', None)
+        if destino is None:
+            return funcao(*args, **kwargs)
+        inicio = time.perf_counter()
+        try:
+            return funcao(*args, **kwargs)
+        finally:
+            destino.registar_ordenacao(nome, time.perf_counter() - inicio)
+    return medida
+
+
+def _substituir_funcoes_globais():
+    for modulo, nome, em_lote in _PONTOS_HAVERSINE:
+        original = getattr(modulo, nome)
+        _originais.append((modulo, nome, original))
+        setattr(modulo, nome, _contar_haversine(original, em_lote))
+    for modulo, nome in _PONTOS_ORDENACAO:
+        original = getattr(modulo, nome)
+        _originais.append((modulo, nome, original))
+        setattr(modulo, nome, _medir_ordenacao(original, nome))
+
+
+def _repor_funcoes_globais():
+    while _originais:
+        modulo, nome, original = _originais.pop()
+        setattr(modulo, nome, original)
+
+
+@contextmanager
+def instrumentada(rede: RedeViaria) -> Iterator[Instrumentacao]:
+    """Instrumenta a rede apenas dentro do bloco with."""
+    instrumentacao = ativar(rede)
+    try:
+        yield instrumentacao
+    finally:
+        desativar(rede)
+
+
+# --- Perfis (cProfile) ---
+
+def perfilar(funcao: Callable, *args, ordenar_por: str = 'cumulative', linhas: int = 25,
+             ficheiro: Optional[str] = None, **kwargs) -> Tuple[Any, str]:
+    """Executa funcao(*args, **kwargs) sob cProfile.
+       Retorna (resultado, relatório em texto com as `linhas` funções mais
+       pesadas). Com ficheiro, guarda também o perfil em formato pstats
+       (para snakeviz, gprof2dot, etc.).
+    """
+    perfil = cProfile.Profile()
+    resultado = perfil.runcall(funcao, *args, **kwargs)
+    if ficheiro:
+        perfil.dump_stats(ficheiro)
+    texto = io.StringIO()
+    pstats.Stats(perfil, stream=texto).strip_dirs().sort_stats(ordenar_por).print_stats(linhas)
+    return resultado, texto.getvalue()
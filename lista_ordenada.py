@@ -0,0 +1,110 @@
+# lista_ordenada.py
+import bisect
+from itertools import chain, islice
+from typing import Any, Iterable, Iterator, List, Optional, Set
+
+TAMANHO_BLOCO = 1024
+
+
+class ListaOrdenada:
+    """Lista ordenada guardada em blocos de no máximo TAMANHO_BLOCO elementos
+       (uma árvore B com um só nível), com o último elemento de cada bloco
+       em maximos para escolher o bloco por pesquisa binária.
+
+       Inserir ou remover custa O(log N) comparações mais o deslocamento de
+       memória dentro de um bloco (O(TAMANHO_BLOCO)), em vez de O(N) numa
+       lista única; percorrer por ordem continua a ser O(N).
+    """
+
+    def __init__(self, elementos: Iterable[Any] = ()):
+        self.blocos: List[List[Any]] = []
+        self.maximos: List[Any] = []
+        self.tamanho = 0
+        # ids dos blocos não partilhados com instantâneos (None = todos)
+        self._proprios: Optional[Set[int]] = None
+        ordenados = sorted(elementos)
+        metade = TAMANHO_BLOCO // 2
+        for inicio in range(0, len(ordenados), metade):
+            bloco = ordenados[inicio:inicio + metade]
+            self.blocos.append(bloco)
+            self.maximos.append(bloco[-1])
+        self.tamanho = len(ordenados)
+
+    def __len__(self):
+        return self.tamanho
+
+    def __iter__(self) -> Iterator[Any]:
+        return chain.from_iterable(self.blocos)
+
+    def primeiros(self, k: int) -> List[Any]:
+        """Os k menores elementos, por ordem."""
+        return list(islice(self, max(k, 0)))
+
+    def copiar(self) -> 'ListaOrdenada':
+        copia = ListaOrdenada()
+        copia.blocos = [list(bloco) for bloco in self.blocos]
+        copia.maximos = list(self.maximos)
+        copia.tamanho = self.tamanho
+        return copia
+
+    def partilhar(self) -> 'ListaOrdenada':
+        """Cópia só de leitura que partilha os blocos com esta lista, em
+           O(N / TAMANHO_BLOCO). A partir daqui esta lista copia cada bloco
+           antes de o alterar.
+        """
+        copia = ListaOrdenada()
+        copia.blocos = list(self.blocos)
+        copia.maximos = list(self.maximos)
+        copia.tamanho = self.tamanho
+        self._proprios = set()
+        return copia
+
+    def _bloco_proprio(self, indice: int) -> List[Any]:
+        bloco = self.blocos[indice]
+        if self._proprios is None or id(bloco) in self._proprios:
+            return bloco
+        bloco = self.blocos[indice] = list(bloco)
+        self._proprios.add(id(bloco))
+        return bloco
+
+    def adicionar(self, elemento: Any):
+        if not self.blocos:
+            self.blocos.append([elemento])
+            self.maximos.append(elemento)
+            if self._proprios is not None:
+                self._proprios.add(id(self.blocos[0]))
+            self.tamanho = 1
+            return
+        indice = min(bisect.bisect_left(self.maximos, elemento), len(self.blocos) - 1)
+        bloco = self._bloco_proprio(indice)
+        bisect.insort(bloco, elemento)
+        self.tamanho += 1
+        if len(bloco) > TAMANHO_BLOCO:
+            # Bloco cheio: parte-se ao meio
+            novo = bloco[TAMANHO_BLOCO // 2:]
+            del bloco[TAMANHO_BLOCO // 2:]
+            self.blocos.insert(indice + 1, novo)
+            self.maximos.insert(indice + 1, novo[-1])
+            if self._proprios is not None:
+                self._proprios.add(id(novo))
+        self.maximos[indice] = bloco[-1]
+
+    def remover(self, elemento: Any) -> bool:
+        """Remove uma ocorrência do elemento. Retorna False se não existir."""
+        indice = bisect.bisect_left(self.maximos, elemento)
+        if indice == len(self.blocos):
+            return False
+        posicao = bisect.bisect_left(self.blocos[indice], elemento)
+        if self.blocos[indice][posicao] != elemento:
+            return False
+        bloco = self._bloco_proprio(indice)
+        del bloco[posicao]
+        self.tamanho -= 1
+        if bloco:
+            self.maximos[indice] = bloco[-1]
+        else:
+            del self.blocos[indice]
+            del self.maximos[indice]
+            if self._proprios is not None:
+                self._proprios.discard(id(bloco))
+        return True
@@ -1,9 +1,46 @@
 # local.py
 import math
+import sys
+from array import array
+
+try:
+    import numpy as np
+except ImportError: # NumPy é opcional: sem ele os cálculos em lote usam Python puro
+    np = None
+
+# Abaixo deste número de pontos o custo de converter para NumPy não compensa
+LIMIAR_NUMPY = 64
+
+# Conjuntos de palavras-chave partilhados: locais com as mesmas palavras-chave
+# usam o mesmo frozenset em vez de um conjunto por instância
+_CONJUNTOS_PALAVRAS: dict = {}
+
+
+def _internar_palavras(palavras) -> frozenset:
+    conjunto = frozenset(palavras)
+    return _CONJUNTOS_PALAVRAS.setdefault(conjunto, conjunto)
+
+
+class ErroSoLeitura(RuntimeError):
+    """Tentativa de alterar um instantâneo publicado (ver RedeViaria.publicar)."""
+
 
 class Local:
-    """Representa um local na rede viária municipal."""
+    """Representa um local na rede viária municipal.
+
+    Usa __slots__ (sem __dict__ por instância), guarda a freguesia e as
+    palavras-chave como strings internadas, partilha o frozenset de
+    palavras-chave entre locais iguais, e mantém em cache a designação
+    normalizada usada em __hash__, __eq__ e __lt__.
+
+    Um local publicado num instantâneo só de leitura (ver
+    RedeViaria.publicar) é partilhado com a rede de trabalho e não pode ser
+    alterado (ErroSoLeitura): para o alterar, obter a cópia privada com
+    RedeViaria.local_para_alterar dentro de uma transação.
+    """
     MAX_PALAVRAS_CHAVE = 6
+    __slots__ = ('_designacao', 'designacao_normalizada', '_freguesia', 'coords_gps',
+                 'url', 'palavras_chave', '_observadores', '_publicado')
 
     def __init__(self, designacao: str, freguesia: str, coords_gps: tuple[float, float],
                  palavras_chave: list[str] | None = None, url: str | None = None):
@@ -19,26 +56,82 @@ class Local:
         self.freguesia = freguesia
         self.coords_gps = coords_gps # (latitude, longitude)
         self.url = url
+        # Redes onde o local está registado, avisadas quando as palavras-chave mudam
+        # (tuplo vazio partilhado enquanto não houver nenhuma)
+        self._observadores = ()
+        self._publicado = False
 
         if palavras_chave is None:
-            self.palavras_chave = set()
+            self.palavras_chave = _internar_palavras(())
         else:
             if len(palavras_chave) > self.MAX_PALAVRAS_CHAVE:
                 raise ValueError(f"Número máximo de palavras-chave é {self.MAX_PALAVRAS_CHAVE}.")
-            # Usar set para garantir unicidade e facilitar pesquisa
-            self.palavras_chave = set(pc.lower() for pc in palavras_chave if pc)
+            # Conjunto imutável para garantir unicidade e facilitar pesquisa
+            self.palavras_chave = _internar_palavras(sys.intern(pc.lower()) for pc in palavras_chave if pc)
+
+    @property
+    def designacao(self) -> str:
+        return self._designacao
+
+    @designacao.setter
+    def designacao(self, valor: str):
+        self._designacao = valor
+        self.designacao_normalizada = valor.lower()
+
+    @property
+    def freguesia(self) -> str:
+        return self._freguesia
+
+    @freguesia.setter
+    def freguesia(self, valor: str):
+        self._freguesia = sys.intern(valor)
+
+    def _verificar_escrita(self):
+        if self._publicado:
+            raise ErroSoLeitura(f"O local '{self.designacao}' está publicado num instantâneo: "
+                                "use RedeViaria.local_para_alterar numa transação.")
 
     def adicionar_palavra_chave(self, palavra: str):
+        self._verificar_escrita()
         if len(self.palavras_chave) < self.MAX_PALAVRAS_CHAVE:
             if palavra and isinstance(palavra, str):
-                self.palavras_chave.add(palavra.lower())
+                palavra = sys.intern(palavra.lower())
+                if palavra not in self.palavras_chave:
+                    self.palavras_chave = _internar_palavras(self.palavras_chave | {palavra})
+                    for observador in self._observadores:
+                        observador._palavra_chave_alterada(self, palavra, True)
             else:
                 print("Aviso: Palavra-chave inválida ignorada.")
         else:
             print(f"Aviso: Limite de {self.MAX_PALAVRAS_CHAVE} palavras-chave atingido.")
 
     def remover_palavra_chave(self, palavra: str):
-        self.palavras_chave.discard(palavra.lower())
+        self._verificar_escrita()
+        palavra = palavra.lower()
+        if palavra in self.palavras_chave:
+            self.palavras_chave = _internar_palavras(self.palavras_chave - {palavra})
+            for observador in self._observadores:
+                observador._palavra_chave_alterada(self, palavra, False)
+
+    def copiar(self) -> 'Local':
+        """Cópia independente do local (sem observadores registados)."""
+        copia = Local.__new__(Local)
+        copia._designacao = self._designacao
+        copia.designacao_normalizada = self.designacao_normalizada
+        copia._freguesia = self._freguesia
+        copia.coords_gps = self.coords_gps
+        copia.url = self.url
+        copia.palavras_chave = self.palavras_chave # frozenset: pode ser partilhado
+        copia._observadores = ()
+        copia._publicado = False
+        return copia
+
+    def _registar_observador(self, observador):
+        if observador not in self._observadores:
+            self._observadores = self._observadores + (observador,)
+
+    def _remover_observador(self, observador):
+        self._observadores = tuple(obs for obs in self._observadores if obs is not observador)
 
     def __str__(self):
         palavras = ', '.join(sorted(list(self.palavras_chave))) if self.palavras_chave else "Nenhuma"
@@ -55,18 +148,18 @@ class Local:
     def __lt__(self, other):
         # Para permitir ordenação por designação
         if isinstance(other, Local):
-            return self.designacao.lower() < other.designacao.lower()
+            return self.designacao_normalizada < other.designacao_normalizada
         return NotImplemented
 
     def __eq__(self, other):
          # Para permitir comparação por designação (útil em sets/dicts)
         if isinstance(other, Local):
-            return self.designacao.lower() == other.designacao.lower()
+            return self.designacao_normalizada == other.designacao_normalizada
         return NotImplemented
 
     def __hash__(self):
         # Necessário se usar Local como chave de dicionário ou em sets
-        return hash(self.designacao.lower())
+        return hash(self.designacao_normalizada)
 
 # --- Funções Auxiliares ---
 def calcular_distancia_geografica(coords1: tuple[float, float], coords2: tuple[float, float]) -> float:
@@ -83,4 +176,59 @@ def calcular_distancia_geografica(coords1: tuple[float, float], coords2: tuple[f
     c = 2 * math.atan2(math.sqrt(a), math.sqrt(1 - a))
 
     distancia = R * c
-    return distancia
\ No newline at end of file
+    return distancia
+
+
+def distancias_geograficas_pares(coords1: list[tuple[float, float]],
+                                 coords2: list[tuple[float, float]]) -> list[float]:
+    """Calcula em lote a distância Haversine (km) entre coords1[i] e coords2[i]."""
+    if np is not None and len(coords1) >= LIMIAR_NUMPY:
+        pontos1 = np.asarray(coords1, dtype=np.float64).reshape(-1, 2)
+        pontos2 = np.asarray(coords2, dtype=np.float64).reshape(-1, 2)
+        return _haversine_numpy(pontos1[:, 0], pontos1[:, 1], pontos2[:, 0], pontos2[:, 1]).tolist()
+
+    R = 6371.0
+    radians, sin, cos, atan2, sqrt = math.radians, math.sin, math.cos, math.atan2, math.sqrt
+    distancias = []
+    for (lat1, lon1), (lat2, lon2) in zip(coords1, coords2):
+        lat1, lat2 = radians(lat1), radians(lat2)
+        dlat = lat2 - lat1
+        dlon = radians(lon2) - radians(lon1)
+        a = sin(dlat / 2)**2 + cos(lat1) * cos(lat2) * sin(dlon / 2)**2
+        distancias.append(R * 2 * atan2(sqrt(a), sqrt(1 - a)))
+    return distancias
+
+
+def distancias_geograficas_de_ponto(ponto: tuple[float, float], latitudes, longitudes) -> list[float]:
+    """Distância Haversine (km) de um ponto a vários pontos, dados como duas
+       sequências de latitudes e longitudes (listas ou array('d')).
+    """
+    if np is not None and len(latitudes) >= LIMIAR_NUMPY:
+        return _haversine_numpy(ponto[0], ponto[1], _para_numpy(latitudes),
+                                _para_numpy(longitudes)).tolist()
+
+    R = 6371.0
+    radians, sin, cos, atan2, sqrt = math.radians, math.sin, math.cos, math.atan2, math.sqrt
+    lat1, lon1 = radians(ponto[0]), radians(ponto[1])
+    cos_lat1 = cos(lat1)
+    distancias = []
+    for lat2, lon2 in zip(latitudes, longitudes):
+        lat2 = radians(lat2)
+        dlat = lat2 - lat1
+        dlon = radians(lon2) - lon1
+        a = sin(dlat / 2)**2 + cos_lat1 * cos(lat2) * sin(dlon / 2)**2
+        distancias.append(R * 2 * atan2(sqrt(a), sqrt(1 - a)))
+    return distancias
+
+
+def _para_numpy(valores):
+    if isinstance(valores, array):
+        return np.frombuffer(valores, dtype=np.float64) # Sem cópia
+    return np.asarray(valores, dtype=np.float64)
+
+
+def _haversine_numpy(lat1, lon1, lat2, lon2):
+    """Mesma fórmula de calcular_distancia_geografica, aplicada a vetores NumPy."""
+    lat1, lon1, lat2, lon2 = np.radians(lat1), np.radians(lon1), np.radians(lat2), np.radians(lon2)
+    a = np.sin((lat2 - lat1) / 2)**2 + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2)**2
+    return 6371.0 * 2 * np.arctan2(np.sqrt(a), np.sqrt(1 - a))
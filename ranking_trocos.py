@@ -0,0 +1,87 @@
+# ranking_trocos.py
+from itertools import islice
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from lista_ordenada import ListaOrdenada
+
+
+def par_canonico(desig1: str, desig2: str) -> Tuple[str, str]:
+    """Identifica um troço não direcionado de forma única (extremos ordenados)."""
+    return (desig1, desig2) if desig1 <= desig2 else (desig2, desig1)
+
+
+class RankingTrocos:
+    """Ranking de troços por média de veículos, mantido incrementalmente.
+
+    Guarda as chaves (-veiculos, desig1, desig2) numa ListaOrdenada, pelo
+    que inserir/atualizar/remover custa O(log N) mais o deslocamento dentro
+    de um bloco, e obter os k troços com mais circulação custa O(k).
+    """
+
+    def __init__(self):
+        self.chaves = ListaOrdenada()
+        # {par_canonico: media_veiculos} para localizar a chave atual
+        self.veiculos: Dict[Tuple[str, str], int] = {}
+        # veiculos é partilhado com um instantâneo: copiar antes de alterar
+        self._veiculos_partilhados = False
+
+    def __len__(self):
+        return len(self.chaves)
+
+    def copiar(self) -> 'RankingTrocos':
+        copia = RankingTrocos()
+        copia.chaves = self.chaves.copiar()
+        copia.veiculos = dict(self.veiculos)
+        return copia
+
+    def partilhar(self) -> 'RankingTrocos':
+        """Cópia só de leitura que partilha os blocos do ranking e o
+           dicionário de veículos com este (copiado na primeira alteração).
+        """
+        copia = RankingTrocos()
+        copia.chaves = self.chaves.partilhar()
+        copia.veiculos = self.veiculos
+        self._veiculos_partilhados = True
+        return copia
+
+    def _veiculos_para_alterar(self) -> Dict[Tuple[str, str], int]:
+        if self._veiculos_partilhados:
+            self.veiculos = dict(self.veiculos)
+            self._veiculos_partilhados = False
+        return self.veiculos
+
+    def atualizar(self, desig1: str, desig2: str, media_veiculos: int):
+        """Insere um troço ou atualiza a sua média de veículos."""
+        par = par_canonico(desig1, desig2)
+        anterior = self.veiculos.get(par)
+        if anterior == media_veiculos:
+            return
+        if anterior is not None:
+            self.chaves.remover((-anterior,) + par)
+        self._veiculos_para_alterar()[par] = media_veiculos
+        self.chaves.adicionar((-media_veiculos,) + par)
+
+    def atualizar_em_lote(self, trocos: Iterable[Tuple[str, str, int]]):
+        """Insere/atualiza vários troços e reordena uma única vez.
+           Complexidade: O((N + M) log(N + M)), melhor que M inserções quando M é grande.
+        """
+        por_par = self._veiculos_para_alterar()
+        for desig1, desig2, media_veiculos in trocos:
+            por_par[par_canonico(desig1, desig2)] = media_veiculos
+        self.chaves = ListaOrdenada((-veiculos,) + par for par, veiculos in self.veiculos.items())
+
+    def remover(self, desig1: str, desig2: str) -> bool:
+        """Remove um troço do ranking. Retorna False se não existir."""
+        par = par_canonico(desig1, desig2)
+        if par not in self.veiculos:
+            return False
+        anterior = self._veiculos_para_alterar().pop(par)
+        self.chaves.remover((-anterior,) + par)
+        return True
+
+    def top(self, k: Optional[int] = None) -> List[Tuple[str, str, int]]:
+        """Os k troços com mais circulação (todos se k for None), por ordem
+           decrescente de média de veículos.
+        """
+        chaves = self.chaves if k is None else islice(self.chaves, max(k, 0))
+        return [(desig1, desig2, -negativo) for negativo, desig1, desig2 in chaves]
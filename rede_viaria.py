@@ -1,6 +1,24 @@
 # rede_viaria.py
-from local import Local, calcular_distancia_geografica
-from typing import Optional, List, Tuple, Dict
+from local import ErroSoLeitura, Local, calcular_distancia_geografica, distancias_geograficas_pares
+from indice_espacial import GrelhaEspacial
+from indice_invertido import IndiceInvertido, IndiceTrigramas, intersetar
+import encaminhamento
+from encaminhamento import ResultadoRota
+from marcos import IndiceMarcos
+from ranking_trocos import RankingTrocos
+from grafo_compacto import GrafoCompacto
+from coordenadas import TabelaCoordenadas
+from ordenacao import IndiceOrdenado, ordenar_designacoes
+from pesquisa_aproximada import TrieDesignacoes
+from cache import CacheResultados
+import serie_temporal
+from serie_temporal import SerieTrafego
+import conectividade
+from conectividade import ConectividadeIncremental
+from typing import Callable, Optional, List, Set, Tuple, Dict, Iterable, Iterator
+from itertools import islice
+import numbers
+import time
 
 # --- Algoritmos de Ordenação ---
 
@@ -12,8 +30,8 @@ def insertion_sort_locais(lista_locais: List[Local]) -> List[Local]:
     for i in range(1, len(locais_ordenados)):
         chave = locais_ordenados[i]
         j = i - 1
-        # Compara designações ignorando maiúsculas/minúsculas
-        while j >= 0 and chave.designacao.lower() < locais_ordenados[j].designacao.lower():
+        # Compara designações ignorando maiúsculas/minúsculas (normalização em cache)
+        while j >= 0 and chave.designacao_normalizada < locais_ordenados[j].designacao_normalizada:
             locais_ordenados[j + 1] = locais_ordenados[j]
             j -= 1
         locais_ordenados[j + 1] = chave
@@ -53,8 +71,30 @@ def merge_trocos(esquerda: List[Tuple[str, str, int]], direita: List[Tuple[str,
     return resultado
 
 
+def validar_media_veiculos(media_veiculos) -> Optional[str]:
+    """Retorna a mensagem de erro se a média de veículos não for um inteiro
+       não negativo. A média tem de ser inteira (o grafo compacto e o formato
+       binário guardam-na em array('q')); 120.0 é aceite.
+    """
+    if isinstance(media_veiculos, bool) or not (
+            isinstance(media_veiculos, numbers.Integral)
+            or isinstance(media_veiculos, float) and media_veiculos.is_integer()):
+        return "Média de veículos tem de ser um número inteiro."
+    if media_veiculos < 0:
+        return "Média de veículos não pode ser negativa."
+    return None
+
+
+def _sem_mensagem(texto: str):
+    """Substitui print quando as mensagens para a consola estão desligadas."""
+
+
 # --- Classe Principal ---
 
+# Abaixo deste número de candidatos é mais barato filtrar por distância
+# diretamente do que consultar a grelha espacial
+LIMIAR_FILTRO_DIRETO = 64
+
 class RedeViaria:
     """Gere a rede viária municipal como um grafo."""
 
@@ -63,21 +103,174 @@ class RedeViaria:
         self.locais: Dict[str, Local] = {}
         # Lista de Adjacência: {designacao_origem: {designacao_destino: {'distancia': float, 'media_veiculos': int}}}
         self.adj: Dict[str, Dict[str, Dict]] = {}
+        # Coordenadas de todos os locais em arrays contíguos (distâncias em lote)
+        self.coordenadas = TabelaCoordenadas()
+        # Índice espacial em grelha para pesquisas por proximidade
+        self.indice_espacial = GrelhaEspacial()
+        # Índices invertidos: freguesia (minúsculas) / palavra-chave -> designações
+        self.indice_freguesias = IndiceInvertido()
+        self.indice_palavras_chave = IndiceInvertido()
+        # Índice de trigramas para pesquisa por parte da designação
+        self.indice_designacoes = IndiceTrigramas()
+        # Trie das designações sem acentos nem maiúsculas (autocompletar e erros de escrita)
+        self.trie_designacoes = TrieDesignacoes()
+        # Designações por ordem alfabética, para resultados já ordenados
+        self.ordem_designacoes = IndiceOrdenado()
+        # Troços ordenados por média de veículos, mantido a cada alteração
+        self.ranking_trocos = RankingTrocos()
+        # Pré-processamento opcional de rotas (ALT); ver preparar_rotas
+        self.indice_marcos: Optional[IndiceMarcos] = None
+        self.custo_marcos: Optional[str] = None
+        # Séries temporais de contagens de veículos por troço
+        self.trafego = SerieTrafego()
+        # Componentes ligadas, pontes e pontos de articulação
+        self.conectividade = ConectividadeIncremental()
+        # Incrementada a cada alteração; invalida os resultados em cache
+        self.geracao = 0
+        # Cache de pesquisas e rankings (None = sem cache)
+        self.cache: Optional[CacheResultados] = CacheResultados()
+        # Sonda opcional das etapas de pesquisar_locais: (etapa, num_candidatos, segundos).
+        # None = sem instrumentação (ver instrumentacao.py); não passa para as cópias
+        self.sonda_pesquisa: Optional[Callable[[str, int, Optional[float]], None]] = None
+        # Registo de alterações em disco (ver registo_alteracoes.py); não passa para as cópias
+        self.registo = None
+        # Cópia na escrita depois de publicar (ver publicar): linhas de adj que
+        # esta rede pode alterar e locais ainda não publicados (None = todos)
+        self._linhas_proprias: Optional[Set[str]] = None
+        self._locais_por_publicar: Optional[List[Local]] = None
+        # Instantâneo publicado: qualquer alteração lança ErroSoLeitura
+        self.so_leitura = False
+
+    def copiar(self) -> 'RedeViaria':
+        """Cópia independente da rede, com todos os índices.
+           Os locais são copiados; os dicionários de dados dos troços são
+           partilhados, porque adicionar_troco substitui-os em vez de os alterar.
+        """
+        copia = RedeViaria()
+        copia.locais = {desig: local.copiar() for desig, local in self.locais.items()}
+        copia.adj = {desig: dict(vizinhos) for desig, vizinhos in self.adj.items()}
+        copia.coordenadas = self.coordenadas.copiar()
+        copia.indice_espacial = self.indice_espacial.copiar()
+        copia.indice_freguesias = self.indice_freguesias.copiar()
+        copia.indice_palavras_chave = self.indice_palavras_chave.copiar()
+        copia.indice_designacoes = self.indice_designacoes.copiar()
+        copia.trie_designacoes = self.trie_designacoes.copiar()
+        copia.ordem_designacoes = self.ordem_designacoes.copiar()
+        copia.ranking_trocos = self.ranking_trocos.copiar()
+        copia.indice_marcos = self.indice_marcos.copiar(copia.adj) if self.indice_marcos else None
+        copia.custo_marcos = self.custo_marcos
+        copia.trafego = self.trafego.copiar()
+        copia.conectividade = self.conectividade.copiar()
+        copia.geracao = self.geracao
+        # Os resultados em cache referem-se aos Locais originais: a cópia começa vazia
+        copia.cache = self.cache.vazia() if self.cache is not None else None
+        for local in copia.locais.values():
+            local._registar_observador(copia)
+        return copia
+
+    def publicar(self) -> 'RedeViaria':
+        """Instantâneo só de leitura da rede que partilha a estrutura com ela
+           em vez de a copiar: as linhas de adj, os Locais, os conjuntos dos
+           índices invertidos, as células da grelha, os nós da trie, as
+           distâncias dos marcos, os blocos das listas ordenadas e das séries
+           de tráfego, e (inteiros) a tabela de coordenadas, o union-find da
+           conectividade e o dicionário do ranking. A partir daqui esta rede
+           copia cada uma dessas partes antes de a alterar (cópia na escrita),
+           pelo que publicar custa apenas os dicionários de topo (designação
+           -> linha, célula, posição) e cada alteração seguinte paga só o que
+           toca (uma cópia inteira da conectividade, das coordenadas ou do
+           ranking só na primeira alteração de cada um).
+
+           O instantâneo não pode ser alterado: os métodos que alteram a rede
+           e os seus Locais lançam ErroSoLeitura.
+
+           O estado calculado de forma preguiçosa é resolvido antes: os marcos
+           desatualizados são reconstruídos aqui, e a conectividade do
+           instantâneo não comprime caminhos nem guarda as pontes (ficam na
+           cache da rede, que tem lock). Assim as consultas ao instantâneo
+           nunca o alteram e podem correr em várias threads.
+        """
+        if self.indice_marcos and self.indice_marcos.desatualizado():
+            self.indice_marcos.reconstruir()
+        por_publicar = self.locais.values() if self._locais_por_publicar is None else self._locais_por_publicar
+        for local in por_publicar:
+            local._publicado = True
+        self._locais_por_publicar = []
+        self._linhas_proprias = set()
+
+        instantaneo = RedeViaria()
+        instantaneo.so_leitura = True
+        instantaneo.locais = dict(self.locais)
+        instantaneo.adj = dict(self.adj)
+        instantaneo.coordenadas = self.coordenadas.partilhar()
+        instantaneo.indice_espacial = self.indice_espacial.partilhar()
+        instantaneo.indice_freguesias = self.indice_freguesias.partilhar()
+        instantaneo.indice_palavras_chave = self.indice_palavras_chave.partilhar()
+        instantaneo.indice_designacoes = self.indice_designacoes.partilhar()
+        instantaneo.trie_designacoes = self.trie_designacoes.partilhar()
+        instantaneo.ordem_designacoes = self.ordem_designacoes.partilhar()
+        instantaneo.ranking_trocos = self.ranking_trocos.partilhar()
+        instantaneo.indice_marcos = (self.indice_marcos.partilhar(instantaneo.adj)
+                                     if self.indice_marcos else None)
+        instantaneo.custo_marcos = self.custo_marcos
+        instantaneo.trafego = self.trafego.partilhar()
+        instantaneo.conectividade = self.conectividade.partilhar()
+        instantaneo.geracao = self.geracao
+        instantaneo.cache = self.cache.vazia() if self.cache is not None else None
+        return instantaneo
+
+    def _linha_adj(self, designacao: str) -> Dict[str, Dict]:
+        """Vizinhos do local para alteração (copiados se partilhados com um instantâneo)."""
+        linha = self.adj[designacao]
+        if self._linhas_proprias is not None and designacao not in self._linhas_proprias:
+            linha = self.adj[designacao] = dict(linha)
+            self._linhas_proprias.add(designacao)
+        return linha
+
+    def _verificar_escrita(self):
+        if self.so_leitura:
+            raise ErroSoLeitura("Instantâneo publicado só de leitura: altere a rede numa transação.")
+
+    def local_para_alterar(self, designacao: str) -> Optional[Local]:
+        """Local da rede pronto a ser alterado (p. ex. as palavras-chave).
+           Se estiver publicado num instantâneo, passa a ser usada nesta rede
+           uma cópia privada, criada aqui; o instantâneo fica com o original.
+        """
+        self._verificar_escrita()
+        designacao = self.resolver_designacao(designacao) or designacao
+        local = self.locais.get(designacao)
+        if local is None:
+            print(f"Erro: Local '{designacao}' não encontrado.")
+            return None
+        if local._publicado:
+            local._remover_observador(self)
+            local = self.locais[designacao] = local.copiar()
+            local._registar_observador(self)
+            self._locais_por_publicar.append(local)
+        return local
 
     # --- RF01: Gerir Rede ---
 
     def adicionar_local(self, local: Local) -> bool:
         """Adiciona um novo local à rede."""
+        self._verificar_escrita()
         if local.designacao in self.locais:
             print(f"Erro: Local com designação '{local.designacao}' já existe.")
             return False
         self.locais[local.designacao] = local
         self.adj[local.designacao] = {} # Adiciona entrada na lista de adjacência
+        self._marcar_proprio(local)
+        self._indexar_local(local)
+        self.conectividade.local_adicionado(local.designacao)
+        self.geracao += 1
+        if self.registo is not None:
+            self.registo.local_adicionado(local)
         print(f"Local '{local.designacao}' adicionado com sucesso.")
         return True
 
     def remover_local(self, designacao: str) -> bool:
         """Remove um local e todos os troços ligados a ele."""
+        self._verificar_escrita()
         if designacao not in self.locais:
             print(f"Erro: Local '{designacao}' não encontrado.")
             return False
@@ -86,22 +279,117 @@ class RedeViaria:
         vizinhos_a_remover = list(self.adj.get(designacao, {}).keys()) # Cópia das chaves
         for vizinho in vizinhos_a_remover:
             if vizinho in self.adj and designacao in self.adj[vizinho]:
-                del self.adj[vizinho][designacao]
+                del self._linha_adj(vizinho)[designacao]
+            self._linha_adj(designacao).pop(vizinho, None)
+            self.ranking_trocos.remover(designacao, vizinho)
+            self.trafego.remover(designacao, vizinho)
+            self.conectividade.troco_removido(designacao, vizinho, self.adj)
 
         # Remover o local da lista de adjacência e do dicionário de locais
         if designacao in self.adj:
             del self.adj[designacao]
-        del self.locais[designacao]
+            if self._linhas_proprias is not None:
+                self._linhas_proprias.discard(designacao)
+        self._desindexar_local(self.locais.pop(designacao))
+        self.conectividade.local_removido(designacao)
+        if self.indice_marcos:
+            self.indice_marcos.local_removido(designacao, len(vizinhos_a_remover))
+        self.geracao += 1
+        if self.registo is not None:
+            self.registo.local_removido(designacao)
 
         print(f"Local '{designacao}' e troços associados removidos com sucesso.")
         return True
 
+    def _marcar_proprio(self, local: Local):
+        """Um local novo e a sua linha de adj pertencem só a esta rede."""
+        if self._linhas_proprias is not None:
+            self._linhas_proprias.add(local.designacao)
+            self._locais_por_publicar.append(local)
+
+    def _indexar_local(self, local: Local, ordenar: bool = True):
+        """Regista o local em todos os índices de pesquisa.
+           Com ordenar=False o índice alfabético fica a cargo de quem chama
+           (o carregamento em lote insere todos de uma vez).
+        """
+        desig = local.designacao
+        if ordenar:
+            self.ordem_designacoes.inserir(local)
+        self.coordenadas.inserir(desig, local.coords_gps)
+        self.indice_espacial.inserir(desig, local.coords_gps)
+        self.indice_freguesias.adicionar(local.freguesia.lower(), desig)
+        for palavra in local.palavras_chave:
+            self.indice_palavras_chave.adicionar(palavra, desig)
+        self.indice_designacoes.adicionar(desig, local.designacao_normalizada)
+        self.trie_designacoes.adicionar(desig)
+        local._registar_observador(self)
+
+    def _desindexar_local(self, local: Local):
+        """Retira o local de todos os índices de pesquisa."""
+        desig = local.designacao
+        self.ordem_designacoes.remover(local)
+        self.coordenadas.remover(desig)
+        self.indice_espacial.remover(desig)
+        self.indice_freguesias.remover(local.freguesia.lower(), desig)
+        for palavra in local.palavras_chave:
+            self.indice_palavras_chave.remover(palavra, desig)
+        self.indice_designacoes.remover(desig)
+        self.trie_designacoes.remover(desig)
+        local._remover_observador(self)
+
+    def _palavra_chave_alterada(self, local: Local, palavra: str, adicionada: bool):
+        """Chamado pelo Local quando uma palavra-chave é adicionada/removida."""
+        if self.locais.get(local.designacao) is not local:
+            return
+        if adicionada:
+            self.indice_palavras_chave.adicionar(palavra, local.designacao)
+        else:
+            self.indice_palavras_chave.remover(palavra, local.designacao)
+        self.geracao += 1
+        if self.registo is not None:
+            self.registo.palavra_chave_alterada(local.designacao, palavra, adicionada)
+
     def consultar_local(self, designacao: str) -> Optional[Local]:
-        """Consulta os detalhes de um local pela designação."""
-        local = self.locais.get(designacao)
-        if not local:
-            print(f"Local '{designacao}' não encontrado.")
-        return local
+        """Consulta os detalhes de um local pela designação (sem distinguir
+           acentos nem maiúsculas, se não houver ambiguidade). Se não
+           existir, sugere as designações mais parecidas.
+        """
+        resolvida = self.resolver_designacao(designacao)
+        if resolvida is None:
+            # Só na falha: aqui vale a pena a distância 2, mais lenta que a predefinida
+            sugestoes = [desig for desig, _ in self.trie_designacoes.aproximadas(designacao, 2, 3)]
+            if sugestoes:
+                print(f"Local '{designacao}' não encontrado. Quis dizer: {', '.join(sugestoes)}?")
+            else:
+                print(f"Local '{designacao}' não encontrado.")
+            return None
+        return self.locais[resolvida]
+
+    def resolver_designacao(self, texto: str) -> Optional[str]:
+        """Designação exata do local: o próprio texto se existir, ou o único
+           local com a mesma forma sem acentos nem maiúsculas ("camara
+           municipal" -> "Câmara Municipal"). None se não houver ou for ambíguo.
+        """
+        if texto in self.locais:
+            return texto
+        iguais = self.trie_designacoes.exatas(texto)
+        return iguais.pop() if len(iguais) == 1 else None
+
+    def sugerir_designacoes(self, prefixo: str, limite: int = 10) -> List[str]:
+        """Autocompletar: designações que começam pelo prefixo (sem distinguir
+           acentos nem maiúsculas), por ordem alfabética.
+           Complexidade: O(|prefixo| + limite).
+        """
+        return self.trie_designacoes.com_prefixo(prefixo, limite)
+
+    def pesquisar_designacao_aproximada(self, texto: str, distancia_maxima: int = 1,
+                                        limite: int = 10) -> List[Tuple[Local, int]]:
+        """Locais cuja designação difere do texto em no máximo distancia_maxima
+           edições (carácteres inseridos, apagados, trocados ou adjacentes
+           invertidos), como [(local, distancia)] do mais parecido para o menos.
+        """
+        return [(self.locais[desig], distancia)
+                for desig, distancia in self.trie_designacoes.aproximadas(texto, distancia_maxima, limite)]
 
     def listar_todos_locais(self) -> List[Local]:
         """Retorna uma lista de todos os locais na rede."""
@@ -109,44 +397,176 @@ class RedeViaria:
 
     def adicionar_troco(self, desig1: str, desig2: str, distancia: float, media_veiculos: int) -> bool:
         """Adiciona um troço (ligação) entre dois locais."""
-        if desig1 not in self.locais or desig2 not in self.locais:
-            print("Erro: Um ou ambos os locais não existem na rede.")
-            return False
-        if desig1 == desig2:
-            print("Erro: Não pode adicionar um troço de um local para ele mesmo.")
-            return False
-        if media_veiculos < 0:
-             print("Erro: Média de veículos não pode ser negativa.")
-             return False
-
-        local1 = self.locais[desig1]
-        local2 = self.locais[desig2]
-        distancia_geo = calcular_distancia_geografica(local1.coords_gps, local2.coords_gps)
-
-        if distancia < distancia_geo:
-            print(f"Erro: Distância do troço ({distancia:.2f} km) não pode ser inferior "
-                  f"à distância geográfica ({distancia_geo:.2f} km).")
+        self._verificar_escrita()
+        desig1 = self.resolver_designacao(desig1) or desig1
+        desig2 = self.resolver_designacao(desig2) or desig2
+        erro = self._validar_troco(desig1, desig2, media_veiculos)
+        if erro is None:
+            local1 = self.locais[desig1]
+            local2 = self.locais[desig2]
+            distancia_geo = calcular_distancia_geografica(local1.coords_gps, local2.coords_gps)
+            erro = self._validar_distancia_troco(distancia, distancia_geo)
+        if erro:
+            print(f"Erro: {erro}")
             return False
+        media_veiculos = int(media_veiculos)
 
         # Adiciona ligação nos dois sentidos (grafo não direcionado)
         dados_troco = {'distancia': distancia, 'media_veiculos': media_veiculos}
-        self.adj.setdefault(desig1, {})[desig2] = dados_troco
-        self.adj.setdefault(desig2, {})[desig1] = dados_troco
+        self._linha_adj(desig1)[desig2] = dados_troco
+        self._linha_adj(desig2)[desig1] = dados_troco
+        self.ranking_trocos.atualizar(desig1, desig2, media_veiculos)
+        self.conectividade.troco_adicionado(desig1, desig2)
+        if self.indice_marcos:
+            self.indice_marcos.troco_adicionado(desig1, desig2, dados_troco)
+        self.geracao += 1
+        if self.registo is not None:
+            self.registo.troco_adicionado(desig1, desig2, distancia, media_veiculos)
 
         print(f"Troço entre '{desig1}' e '{desig2}' adicionado/atualizado com sucesso.")
         return True
 
+    def _validar_troco(self, desig1: str, desig2: str, media_veiculos: int) -> Optional[str]:
+        """Validações de um troço que não dependem da distância. Retorna a mensagem de erro.
+           A média de veículos é convertida para int por quem chama.
+        """
+        if desig1 not in self.locais or desig2 not in self.locais:
+            return "Um ou ambos os locais não existem na rede."
+        if desig1 == desig2:
+            return "Não pode adicionar um troço de um local para ele mesmo."
+        return validar_media_veiculos(media_veiculos)
+
+    @staticmethod
+    def _validar_distancia_troco(distancia: float, distancia_geo: float) -> Optional[str]:
+        if not distancia >= distancia_geo: # Também rejeita NaN
+            return (f"Distância do troço ({distancia:.2f} km) não pode ser inferior "
+                    f"à distância geográfica ({distancia_geo:.2f} km).")
+        return None
+
+    # --- Carregamento em Lote ---
+
+    def adicionar_locais_em_lote(self, locais: Iterable[Local]) -> List[Tuple[int, str]]:
+        """Adiciona vários locais de uma vez, sem mensagens por local.
+           O lote é lido e validado por inteiro antes de a rede ser alterada:
+           se o iterável lançar uma exceção a meio (p. ex. uma linha inválida
+           num CSV), nenhum local é inserido. Cada local aceite fica nos
+           índices de pesquisa e na conectividade ao mesmo tempo que entra na
+           rede; o índice alfabético é atualizado numa única passagem no fim.
+           Retorna os erros como [(posição no lote, mensagem)].
+        """
+        self._verificar_escrita()
+        erros = []
+        novos = []
+        designacoes = set()
+        for posicao, local in enumerate(locais):
+            if not isinstance(local, Local):
+                erros.append((posicao, f"Esperado um Local, recebido {type(local).__name__}."))
+            elif local.designacao in self.locais or local.designacao in designacoes:
+                erros.append((posicao, f"Local com designação '{local.designacao}' já existe."))
+            else:
+                designacoes.add(local.designacao)
+                novos.append(local)
+
+        for local in novos:
+            self.locais[local.designacao] = local
+            self.adj[local.designacao] = {}
+            self._marcar_proprio(local)
+            self._indexar_local(local, ordenar=False)
+            self.conectividade.local_adicionado(local.designacao)
+        self.ordem_designacoes.inserir_em_lote(novos)
+        if self.registo is not None and novos:
+            self.registo.locais_adicionados(novos)
+        if novos:
+            self.geracao += 1
+        return erros
+
+    def adicionar_trocos_em_lote(self, trocos: Iterable[Tuple[str, str, float, int]],
+                                 adiar_indices: bool = True,
+                                 validar_distancias: bool = True) -> List[Tuple[int, str]]:
+        """Adiciona (ou atualiza) vários troços (desig1, desig2, distancia, media_veiculos)
+           de uma vez, sem mensagens por troço.
+
+           As distâncias geográficas são calculadas em lote; com
+           validar_distancias=False (dados já validados, p. ex. lidos de um
+           ficheiro guardado) só se exige que a distância não seja negativa.
+           Com adiar_indices,
+           o ranking de circulação é reordenado uma só vez e o pré-processamento
+           de rotas é reconstruído no fim, em vez de atualizados troço a troço.
+           Retorna os erros como [(posição no lote, mensagem)].
+        """
+        self._verificar_escrita()
+        erros = []
+        validos = []
+        for posicao, (desig1, desig2, distancia, media_veiculos) in enumerate(trocos):
+            erro = self._validar_troco(desig1, desig2, media_veiculos)
+            if erro:
+                erros.append((posicao, erro))
+            else:
+                validos.append((posicao, desig1, desig2, distancia, int(media_veiculos)))
+
+        locais = self.locais
+        if validar_distancias:
+            distancias_geo = distancias_geograficas_pares(
+                [locais[troco[1]].coords_gps for troco in validos],
+                [locais[troco[2]].coords_gps for troco in validos])
+        else:
+            distancias_geo = [0.0] * len(validos)
+
+        linha_adj = self._linha_adj
+        aceites = []
+        for (posicao, desig1, desig2, distancia, media_veiculos), distancia_geo in zip(validos, distancias_geo):
+            erro = self._validar_distancia_troco(distancia, distancia_geo)
+            if erro:
+                erros.append((posicao, erro))
+                continue
+            dados_troco = {'distancia': distancia, 'media_veiculos': media_veiculos}
+            linha_adj(desig1)[desig2] = dados_troco
+            linha_adj(desig2)[desig1] = dados_troco
+            aceites.append((desig1, desig2, dados_troco))
+            self.conectividade.troco_adicionado(desig1, desig2)
+
+        if adiar_indices:
+            self.ranking_trocos.atualizar_em_lote(
+                (desig1, desig2, dados['media_veiculos']) for desig1, desig2, dados in aceites)
+            if self.indice_marcos and aceites:
+                self.indice_marcos.reconstruir()
+        else:
+            for desig1, desig2, dados in aceites:
+                self.ranking_trocos.atualizar(desig1, desig2, dados['media_veiculos'])
+                if self.indice_marcos:
+                    self.indice_marcos.troco_adicionado(desig1, desig2, dados)
+        if aceites:
+            self.geracao += 1
+            if self.registo is not None:
+                self.registo.trocos_adicionados(
+                    (desig1, desig2, dados['distancia'], dados['media_veiculos'])
+                    for desig1, desig2, dados in aceites)
+
+        erros.sort()
+        return erros
+
     def remover_troco(self, desig1: str, desig2: str) -> bool:
         """Remove um troço entre dois locais."""
+        self._verificar_escrita()
+        desig1 = self.resolver_designacao(desig1) or desig1
+        desig2 = self.resolver_designacao(desig2) or desig2
         removido = False
         if desig1 in self.adj and desig2 in self.adj[desig1]:
-            del self.adj[desig1][desig2]
+            del self._linha_adj(desig1)[desig2]
             removido = True
         if desig2 in self.adj and desig1 in self.adj[desig2]:
-            del self.adj[desig2][desig1]
+            del self._linha_adj(desig2)[desig1]
             removido = True
 
         if removido:
+            self.ranking_trocos.remover(desig1, desig2)
+            self.trafego.remover(desig1, desig2)
+            self.conectividade.troco_removido(desig1, desig2, self.adj)
+            if self.indice_marcos:
+                self.indice_marcos.troco_removido(desig1, desig2)
+            self.geracao += 1
+            if self.registo is not None:
+                self.registo.troco_removido(desig1, desig2)
             print(f"Troço entre '{desig1}' e '{desig2}' removido com sucesso.")
             return True
         else:
@@ -155,6 +575,8 @@ class RedeViaria:
 
     def consultar_troco(self, desig1: str, desig2: str) -> Optional[Dict]:
         """Consulta os detalhes de um troço entre dois locais."""
+        desig1 = self.resolver_designacao(desig1) or desig1
+        desig2 = self.resolver_designacao(desig2) or desig2
         if desig1 in self.adj and desig2 in self.adj[desig1]:
             return self.adj[desig1][desig2]
         elif desig2 in self.adj and desig1 in self.adj[desig2]:
@@ -165,16 +587,21 @@ class RedeViaria:
 
     def listar_todos_trocos(self) -> List[Tuple[str, str, Dict]]:
         """Retorna uma lista de todos os troços únicos na rede."""
-        trocos = []
-        visitados = set() # Para evitar duplicados (A->B e B->A)
+        return list(self.iterar_trocos())
+
+    def iterar_trocos(self) -> Iterator[Tuple[str, str, Dict]]:
+        """Gera cada troço uma única vez, como (origem, destino, dados).
+           Cada troço está nos dois sentidos da lista de adjacência; só o
+           sentido com origem < destino é gerado, sem conjunto de visitados.
+        """
         for origem, vizinhos in self.adj.items():
             for destino, dados in vizinhos.items():
-                # Adiciona apenas uma vez (ex: A-B e não B-A também)
-                par = tuple(sorted((origem, destino)))
-                if par not in visitados:
-                    trocos.append((origem, destino, dados))
-                    visitados.add(par)
-        return trocos
+                if origem < destino:
+                    yield origem, destino, dados
+
+    def compactar(self) -> GrafoCompacto:
+        """Instantâneo só de leitura da rede em formato CSR (ver GrafoCompacto)."""
+        return GrafoCompacto.de_rede(self)
 
     # --- RF02: Pesquisar Locais ---
 
@@ -182,44 +609,348 @@ class RedeViaria:
                          freguesia: Optional[str] = None,
                          palavra_chave: Optional[str] = None,
                          ponto_gps: Optional[Tuple[float, float]] = None,
-                         raio_km: float = 5.0) -> List[Local]:
+                         raio_km: float = 5.0, ordenar_por: str = 'designacao',
+                         offset: int = 0, limite: Optional[int] = None) -> List[Local]:
         """Pesquisa locais por múltiplos critérios."""
-        resultados = list(self.locais.values()) # Começa com todos
+        return [local for local, _ in self.pesquisar_locais_com_distancias(
+            designacao, freguesia, palavra_chave, ponto_gps, raio_km, ordenar_por, offset, limite)]
+
+    def pesquisar_locais_com_distancias(self, designacao: Optional[str] = None,
+                                        freguesia: Optional[str] = None,
+                                        palavra_chave: Optional[str] = None,
+                                        ponto_gps: Optional[Tuple[float, float]] = None,
+                                        raio_km: float = 5.0, ordenar_por: str = 'designacao',
+                                        offset: int = 0, limite: Optional[int] = None,
+                                        mensagens: bool = True) -> List[Tuple[Local, Optional[float]]]:
+        """Como pesquisar_locais, mas retorna [(local, distancia_km)], com a
+           distância ao ponto_gps já calculada pela pesquisa (None sem ponto_gps).
+           Cada critério é resolvido num índice e os conjuntos obtidos são
+           intersetados do mais pequeno para o maior.
+
+           ordenar_por: 'designacao', 'distancia' (requer ponto_gps) ou 'freguesia'.
+           offset/limite: devolve só essa página dos resultados ordenados.
+
+           Os resultados ficam em cache até à próxima alteração da rede.
+           mensagens=False não escreve os erros na consola (p.ex. num servidor).
+        """
+        avisar = print if mensagens else _sem_mensagem
+        if self.cache is None:
+            resultados = self._pesquisar_locais(designacao, freguesia, palavra_chave, ponto_gps,
+                                                raio_km, ordenar_por, offset, limite, avisar)
+        else:
+            chave = ('pesquisar_locais',
+                     designacao.lower() if designacao else None,
+                     freguesia.lower() if freguesia else None,
+                     palavra_chave.lower() if palavra_chave else None,
+                     tuple(ponto_gps) if ponto_gps else None,
+                     raio_km if ponto_gps else None,
+                     ordenar_por, max(offset, 0), limite)
+            resultados = self.cache.obter_ou_calcular(
+                chave, self.geracao,
+                lambda: self._pesquisar_locais(designacao, freguesia, palavra_chave, ponto_gps,
+                                               raio_km, ordenar_por, offset, limite, avisar))
+        return list(resultados) if resultados is not None else []
+
+    def _pesquisar_locais(self, designacao, freguesia, palavra_chave, ponto_gps, raio_km,
+                          ordenar_por, offset, limite,
+                          avisar: Callable[[str], None] = print) -> Optional[List[Tuple[Local, Optional[float]]]]:
+        """Executa a pesquisa (sem cache). Retorna None em caso de erro (escrito com avisar)."""
+        if ordenar_por == 'distancia' and not ponto_gps:
+            avisar("Erro: Ordenação por distância requer um ponto GPS.")
+            return None
 
-        if designacao:
-            resultados = [loc for loc in resultados if designacao.lower() in loc.designacao.lower()]
+        criterios = []
         if freguesia:
-            resultados = [loc for loc in resultados if freguesia.lower() == loc.freguesia.lower()]
+            criterios.append(('freguesia', self.indice_freguesias.obter(freguesia.lower())))
         if palavra_chave:
-            resultados = [loc for loc in resultados if palavra_chave.lower() in loc.palavras_chave]
+            criterios.append(('palavra_chave', self.indice_palavras_chave.obter(palavra_chave.lower())))
+        if designacao:
+            criterios.append(('designacao', self.indice_designacoes.pesquisar(designacao)))
+        conjuntos = [conjunto for _, conjunto in criterios]
+        sonda = self.sonda_pesquisa
+        if sonda is not None:
+            for etapa, conjunto in criterios:
+                sonda(etapa, len(conjunto), None)
+
+        distancias: Dict[str, float] = {}
         if ponto_gps:
             try:
-                resultados = [loc for loc in resultados
-                              if calcular_distancia_geografica(ponto_gps, loc.coords_gps) <= raio_km]
+                if not conjuntos or min(len(c) for c in conjuntos) > LIMIAR_FILTRO_DIRETO:
+                    # Poucos critérios seletivos: usar a grelha espacial
+                    distancias = dict(self.indice_espacial.pesquisar_raio(ponto_gps, raio_km))
+                    if sonda is not None:
+                        sonda('grelha_espacial', len(distancias), None)
+                    conjuntos.append(set(distancias))
+                    candidatos = intersetar(conjuntos)
+                else:
+                    # Poucos candidatos: calcular a distância (em lote) só para eles
+                    distancias = {desig: dist for desig, dist in
+                                  self.coordenadas.distancias_de(ponto_gps, intersetar(conjuntos))
+                                  if dist <= raio_km}
+                    if sonda is not None:
+                        sonda('filtro_raio', len(distancias), None)
+                    candidatos = distancias
             except Exception as e:
-                print(f"Erro ao calcular proximidade: {e}")
-                # Pode retornar lista vazia ou a filtrada até agora
-                return []
+                avisar(f"Erro ao calcular proximidade: {e}")
+                return None
+        elif conjuntos:
+            candidatos = intersetar(conjuntos)
+        else:
+            candidatos = self.locais # Sem critérios: todos
+
+        if sonda is not None:
+            sonda('candidatos', len(candidatos), None)
+            inicio = time.perf_counter()
+        try:
+            pagina = ordenar_designacoes(candidatos, self.locais, ordenar_por,
+                                         distancias if ponto_gps else None,
+                                         offset, limite, self.ordem_designacoes)
+        except ValueError as e:
+            avisar(f"Erro: {e}")
+            return None
+        if sonda is not None:
+            sonda('ordenacao', len(pagina), time.perf_counter() - inicio)
+        return [(self.locais[desig], distancias.get(desig)) for desig in pagina]
+
+    def iterar_locais(self, designacao: Optional[str] = None,
+                      freguesia: Optional[str] = None,
+                      palavra_chave: Optional[str] = None,
+                      ponto_gps: Optional[Tuple[float, float]] = None,
+                      raio_km: float = 5.0, limite: Optional[int] = None) -> Iterator[Local]:
+        """Pesquisa preguiçosa: gera os locais que cumprem todos os critérios,
+           sem construir listas intermédias nem ordenar.
+
+           A origem dos candidatos é o critério mais seletivo (o menor conjunto
+           dos índices); os restantes critérios são filtros encadeados e a
+           pesquisa pára assim que atingir o limite. Sem critérios seletivos
+           os locais saem por ordem alfabética.
+        """
+        fontes = []
+        filtros = []
+        if freguesia:
+            fontes.append(self.indice_freguesias.obter(freguesia.lower()))
+        if palavra_chave:
+            fontes.append(self.indice_palavras_chave.obter(palavra_chave.lower()))
+        if designacao:
+            subcadeia = designacao.lower()
+            normalizadas = self.indice_designacoes.normalizadas
+            candidatos_designacao = self.indice_designacoes.candidatos(subcadeia)
+            if candidatos_designacao is not None:
+                fontes.append(candidatos_designacao)
+            filtros.append(lambda desig: subcadeia in normalizadas[desig])
+
+        if fontes:
+            fontes.sort(key=len)
+            candidatos = iter(fontes[0])
+            for conjunto in fontes[1:]:
+                filtros.append(conjunto.__contains__)
+            if ponto_gps:
+                locais = self.locais
+                filtros.append(lambda desig: calcular_distancia_geografica(
+                    ponto_gps, locais[desig].coords_gps) <= raio_km)
+        elif ponto_gps:
+            candidatos = (desig for desig, _ in self.indice_espacial.iterar_raio(ponto_gps, raio_km))
+        else:
+            candidatos = self.ordem_designacoes.percorrer()
+
+        for filtro in filtros:
+            candidatos = filter(filtro, candidatos)
+        resultados = (self.locais[desig] for desig in candidatos)
+        return resultados if limite is None else islice(resultados, max(limite, 0))
+
+    def pesquisar_locais_mais_proximos(self, ponto_gps: Tuple[float, float],
+                                       k: int = 5) -> List[Tuple[Local, float]]:
+        """Retorna os k locais mais próximos do ponto GPS como [(local, distancia_km)],
+           ordenados por distância crescente.
+        """
+        try:
+            proximos = self.indice_espacial.mais_proximos(ponto_gps, k)
+        except Exception as e:
+            print(f"Erro ao calcular proximidade: {e}")
+            return []
+        return [(self.locais[desig], distancia) for desig, distancia in proximos]
 
-        # Ordenar resultados por designação usando Insertion Sort (O(N) melhor caso)
-        resultados_ordenados = insertion_sort_locais(resultados)
+    # --- RF03: Consultar Troços por Circulação ---
 
-        return resultados_ordenados
+    def consultar_trocos_mais_circulacao(self, janela: Optional[Tuple[float, float]] = None,
+                                         estatistica: str = 'media') -> List[Tuple[str, str, float]]:
+        """Consulta os troços ordenados por maior circulação de veículos.
+           Sem janela usa media_veiculos: o ranking é mantido a cada alteração
+           da rede, pelo que não há ordenação aqui. Com uma janela
+           (inicio_s, fim_s) usa as leituras registadas nesse período
+           ('media', 'pico' ou 'total' por intervalo; ver SerieTrafego).
+        """
+        return self.top_trocos(None, janela, estatistica)
+
+    def top_trocos(self, k: Optional[int], janela: Optional[Tuple[float, float]] = None,
+                   estatistica: str = 'media') -> List[Tuple[str, str, float]]:
+        """Os k troços com maior circulação de veículos (todos com k=None).
+           Complexidade: O(k), ou O(1) para um ranking já em cache.
+        """
+        if janela is None:
+            chave, calcular = ('ranking', k), lambda: self.ranking_trocos.top(k)
+        else:
+            if estatistica not in serie_temporal.ESTATISTICAS:
+                print(f"Erro: Estatística '{estatistica}' desconhecida.")
+                return []
+            janela = tuple(janela)
+            # O número de leituras na chave invalida o resultado quando chegam leituras novas
+            chave = ('ranking', k, janela, estatistica, self.trafego.leituras)
+            calcular = lambda: self.trafego.ranking(janela, estatistica, k)
+        if self.cache is None:
+            return calcular()
+        return list(self.cache.obter_ou_calcular(chave, self.geracao, calcular))
+
+    def consultar_trocos_criticos(self, k: Optional[int] = None, amostras: int = 64,
+                                  processos: Optional[int] = None) -> List[Tuple[str, str, float]]:
+        """Troços ordenados por centralidade de intermediação aproximada
+           (quantos caminhos mais curtos passam por cada um), calculada a
+           partir de `amostras` origens em vários processos. Complementa
+           consultar_trocos_mais_circulacao com a importância estrutural.
+        """
+        calcular = lambda: conectividade.intermediacao_trocos(self, amostras, processos)[:k]
+        if self.cache is None:
+            return calcular()
+        return list(self.cache.obter_ou_calcular(('intermediacao', k, amostras), self.geracao, calcular))
+
+    # --- Conectividade ---
+
+    def locais_ligados(self, desig1: str, desig2: str) -> bool:
+        """Indica se existe algum caminho entre os dois locais. Complexidade: ~O(1)."""
+        if desig1 not in self.locais or desig2 not in self.locais:
+            print("Erro: Um ou ambos os locais não existem na rede.")
+            return False
+        return self.conectividade.ligados(desig1, desig2)
+
+    def num_componentes(self) -> int:
+        """Número de componentes ligadas (grupos de locais sem caminho entre si)."""
+        return self.conectividade.num_componentes
+
+    def listar_componentes(self) -> List[List[str]]:
+        """Designações de cada componente ligada, da maior para a menor."""
+        return [ordenar_designacoes(componente, self.locais) for componente in self.conectividade.componentes()]
+
+    def listar_pontes(self) -> List[Tuple[str, str]]:
+        """Troços cuja remoção separa a rede. Complexidade: O(V + E), só
+           quando a rede mudou desde o último cálculo.
+        """
+        calcular = lambda: sorted(self.conectividade.pontes(self.adj))
+        if self.cache is None:
+            return calcular()
+        return list(self.cache.obter_ou_calcular(('pontes',), self.geracao, calcular))
+
+    def listar_pontos_articulacao(self) -> List[str]:
+        """Locais cuja remoção separa a rede."""
+        calcular = lambda: ordenar_designacoes(self.conectividade.articulacoes(self.adj), self.locais)
+        if self.cache is None:
+            return calcular()
+        return list(self.cache.obter_ou_calcular(('articulacoes',), self.geracao, calcular))
+
+    # --- Séries Temporais de Tráfego ---
+
+    def registar_leitura(self, desig1: str, desig2: str, instante_s: float, veiculos: float) -> bool:
+        """Regista a contagem de veículos de um troço num instante (segundos Unix)."""
+        self._verificar_escrita()
+        erro = self._validar_leitura(desig1, desig2, veiculos)
+        if erro is None and not self.trafego.registar(desig1, desig2, instante_s, veiculos):
+            erro = "Leitura mais antiga do que o período guardado."
+        if erro:
+            print(f"Erro: {erro}")
+            return False
+        return True
 
-    # --- RF03: Consultar Troços por Circulação ---
+    def registar_leituras(self, leituras: Iterable[Tuple[str, str, float, float]]) -> List[Tuple[int, str]]:
+        """Ingestão em fluxo de leituras (desig1, desig2, instante_s, veiculos),
+           sem mensagens por leitura. Retorna os erros como [(posição, mensagem)].
+        """
+        self._verificar_escrita()
+        erros = []
+        registar = self.trafego.registar
+        for posicao, (desig1, desig2, instante_s, veiculos) in enumerate(leituras):
+            erro = self._validar_leitura(desig1, desig2, veiculos)
+            if erro is None and not registar(desig1, desig2, instante_s, veiculos):
+                erro = "Leitura mais antiga do que o período guardado."
+            if erro:
+                erros.append((posicao, erro))
+        return erros
+
+    def _validar_leitura(self, desig1: str, desig2: str, veiculos: float) -> Optional[str]:
+        if desig2 not in self.adj.get(desig1, {}):
+            return f"Troço entre '{desig1}' e '{desig2}' não encontrado."
+        if not veiculos >= 0: # Também rejeita NaN
+            return "Número de veículos não pode ser negativo."
+        return None
+
+    def estatisticas_cache(self) -> Dict[str, float]:
+        """Acertos, falhas, despejos e invalidações da cache de resultados."""
+        return self.cache.estatisticas() if self.cache is not None else {}
+
+    # --- Cálculo de Rotas ---
+
+    def preparar_rotas(self, num_marcos: int = 8, custo: str = 'distancia') -> bool:
+        """Pré-processa a rede para consultas de rotas repetidas (ALT).
+           A partir daqui calcular_rota com A* usa os marcos em vez de Haversine.
+           O índice é reparado automaticamente quando a rede muda.
+        """
+        self._verificar_escrita()
+        funcao_custo = encaminhamento.FUNCOES_CUSTO.get(custo)
+        if funcao_custo is None:
+            print(f"Erro: Custo '{custo}' desconhecido.")
+            return False
+        self.indice_marcos = IndiceMarcos(self.adj, num_marcos, funcao_custo)
+        self.custo_marcos = custo
+        return True
 
-    def consultar_trocos_mais_circulacao(self) -> List[Tuple[str, str, int]]:
-        """Consulta os troços ordenados por maior circulação de veículos."""
-        trocos_unicos_com_veiculos = []
-        visitados = set()
-        for origem, vizinhos in self.adj.items():
-            for destino, dados in vizinhos.items():
-                par = tuple(sorted((origem, destino)))
-                if par not in visitados:
-                    trocos_unicos_com_veiculos.append((origem, destino, dados['media_veiculos']))
-                    visitados.add(par)
+    def descartar_preparacao_rotas(self):
+        """Descarta o pré-processamento de rotas."""
+        self._verificar_escrita()
+        self.indice_marcos = None
+        self.custo_marcos = None
+
+    def calcular_rota(self, origem: str, destino: str, algoritmo: str = 'a_estrela',
+                      custo: str = 'distancia', partida_s: Optional[float] = None,
+                      mensagens: bool = True) -> Optional[ResultadoRota]:
+        """Calcula o caminho mais curto entre dois locais.
+           algoritmo: 'dijkstra', 'a_estrela' (heurística Haversine) ou 'bidirecional'.
+           custo: 'distancia' (km), 'trafego' (km penalizados pela média de veículos)
+           ou 'tempo' (minutos, com o trânsito registado à hora de passagem em
+           cada troço, partindo em partida_s ou agora; usa sempre A*).
+           mensagens=False não escreve os erros nem a falta de caminho na consola.
+        """
+        avisar = print if mensagens else _sem_mensagem
+        origem = self.resolver_designacao(origem) or origem
+        destino = self.resolver_designacao(destino) or destino
+        if origem not in self.locais or destino not in self.locais:
+            avisar("Erro: Um ou ambos os locais não existem na rede.")
+            return None
+        if custo == 'tempo':
+            resultado = serie_temporal.rota_dependente_tempo(
+                self.adj, self.locais, origem, destino,
+                time.time() if partida_s is None else partida_s, self.trafego)
+            if resultado is None:
+                avisar(f"Não existe caminho entre '{origem}' e '{destino}'.")
+            return resultado
+        funcao_custo = encaminhamento.FUNCOES_CUSTO.get(custo)
+        if funcao_custo is None:
+            avisar(f"Erro: Custo '{custo}' desconhecido.")
+            return None
 
-        # Ordenar por 'media_veiculos' decrescente usando Merge Sort (O(N log N))
-        trocos_ordenados = merge_sort_trocos(trocos_unicos_com_veiculos, descending=True)
+        if algoritmo == 'dijkstra':
+            resultado = encaminhamento.dijkstra(self.adj, origem, destino, funcao_custo)
+        elif algoritmo == 'a_estrela':
+            if self.indice_marcos and self.custo_marcos == custo:
+                if self.indice_marcos.desatualizado():
+                    self.indice_marcos.reconstruir()
+                heuristica = self.indice_marcos.heuristica(destino)
+            else:
+                heuristica = encaminhamento.heuristica_haversine(self.locais, destino)
+            resultado = encaminhamento.a_estrela(self.adj, origem, destino, funcao_custo, heuristica)
+        elif algoritmo == 'bidirecional':
+            resultado = encaminhamento.dijkstra_bidirecional(self.adj, origem, destino, funcao_custo)
+        else:
+            avisar(f"Erro: Algoritmo '{algoritmo}' desconhecido.")
+            return None
 
-        return trocos_ordenados
\ No newline at end of file
+        if resultado is None:
+            avisar(f"Não existe caminho entre '{origem}' e '{destino}'.")
+        return resultado
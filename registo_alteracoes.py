@@ -0,0 +1,372 @@
+# registo_alteracoes.py
+import contextlib
+import json
+import os
+import threading
+import time
+from typing import Callable, Iterable, List, Optional, Tuple
+
+from local import Local
+from persistencia import carregar_rede, guardar_rede
+from rede_viaria import RedeViaria
+
+# --- Formato ---
+#
+# Um diretório com instantâneos e segmentos do registo:
+#     instantaneo.<N>.rvia   rede com as N primeiras alterações (formato de persistencia.py)
+#     registo.<B>.jsonl      alterações B, B + 1, ... (uma lista JSON por linha)
+# Os números têm 12 dígitos, para a ordem alfabética ser a numérica.
+#
+# Linhas do registo:
+#     ["adicionar_local", designacao, freguesia, latitude, longitude, [palavras], url]
+#     ["remover_local", designacao]
+#     ["adicionar_troco", desig1, desig2, distancia, media_veiculos]
+#     ["remover_troco", desig1, desig2]
+#     ["palavra_chave", designacao, palavra, adicionada]
+#
+# Só ficam registadas alterações que foram aceites pela rede, pelo que
+# repeti-las pela mesma ordem reconstrói exatamente o mesmo estado.
+# Uma última linha incompleta (escrita interrompida) é descartada.
+
+EXTENSAO_INSTANTANEO = '.rvia'
+EXTENSAO_REGISTO = '.jsonl'
+
+# Reutilizado: json.dumps com opções não predefinidas cria um codificador por chamada
+_codificar = json.JSONEncoder(ensure_ascii=False, separators=(',', ':')).encode
+
+
+def _nome(prefixo: str, numero: int, extensao: str) -> str:
+    return f"{prefixo}.{numero:012d}{extensao}"
+
+
+def _ficheiros(diretorio: str, prefixo: str, extensao: str) -> List[Tuple[int, str]]:
+    """[(número, caminho)] dos ficheiros prefixo.<número>.extensao, por ordem."""
+    encontrados = []
+    for nome in os.listdir(diretorio):
+        partes = nome.split('.')
+        if len(partes) == 3 and partes[0] == prefixo and '.' + partes[2] == extensao and partes[1].isdigit():
+            encontrados.append((int(partes[1]), os.path.join(diretorio, nome)))
+    return sorted(encontrados)
+
+
+def _sincronizar_diretorio(diretorio: str):
+    """fsync do diretório, para que criações e renomeações sobrevivam a uma falha."""
+    try:
+        descritor = os.open(diretorio, os.O_RDONLY)
+    except OSError: # Sistemas sem open() de diretórios (Windows)
+        return
+    try:
+        os.fsync(descritor)
+    finally:
+        os.close(descritor)
+
+
+class RegistoAlteracoes:
+    """Registo de escrita antecipada (write-ahead log) das alterações de uma rede.
+
+    Cada alteração aceite é codificada numa linha JSON e acumulada em
+    memória. As linhas pendentes são escritas e sincronizadas (fsync) em
+    grupo: quando há max_pendentes, ao fim de intervalo_s (numa thread de
+    fundo), em sincronizar(), ou no fim de uma transação. Um fsync por grupo
+    em vez de um por alteração; em caso de falha perdem-se no máximo as
+    alterações dos últimos intervalo_s segundos.
+
+    A cada alteracoes_por_instantaneo alterações é guardado um instantâneo
+    completo e começa um segmento novo; os segmentos e instantâneos
+    anteriores são apagados. A recuperação carrega o último instantâneo e
+    repete só as alterações posteriores (ver recuperar_rede).
+    """
+
+    def __init__(self, diretorio: str, max_pendentes: int = 1024, intervalo_s: float = 0.05,
+                 alteracoes_por_instantaneo: Optional[int] = 1_000_000):
+        self.diretorio = diretorio
+        self.max_pendentes = max_pendentes
+        self.intervalo_s = intervalo_s
+        self.alteracoes_por_instantaneo = alteracoes_por_instantaneo
+        self.rede: Optional[RedeViaria] = None
+        self._lock = threading.Lock()       # Protege _pendentes e os contadores
+        self._lock_escrita = threading.Lock() # Uma escrita/fsync de cada vez
+        self._pendentes: List[str] = []
+        self._em_transacao: Optional[List[str]] = None
+        self.alteracoes = 0                 # Número total de alterações registadas
+        self.escritas = 0                   # fsyncs efetuados (grupos)
+        self._ultimo_instantaneo = 0
+        self._ficheiro = None
+        self._fechado = False
+
+        os.makedirs(diretorio, exist_ok=True)
+        self._abrir_segmento()
+        self._parar = threading.Event()
+        self._fundo = None
+        if intervalo_s:
+            self._fundo = threading.Thread(target=self._sincronizar_periodicamente, daemon=True,
+                                           name="registo-alteracoes")
+            self._fundo.start()
+
+    def _abrir_segmento(self):
+        """Continua o último segmento, ou cria um novo a seguir ao último instantâneo."""
+        instantaneos = _ficheiros(self.diretorio, 'instantaneo', EXTENSAO_INSTANTANEO)
+        segmentos = _ficheiros(self.diretorio, 'registo', EXTENSAO_REGISTO)
+        self._ultimo_instantaneo = instantaneos[-1][0] if instantaneos else 0
+        if segmentos:
+            base, caminho = segmentos[-1]
+            linhas, tamanho_valido = _linhas_completas(caminho)
+            self.alteracoes = base + len(linhas)
+            self._ficheiro = open(caminho, 'r+b')
+            self._ficheiro.truncate(tamanho_valido) # Descarta uma linha final incompleta
+            self._ficheiro.seek(tamanho_valido)
+        else:
+            self.alteracoes = self._ultimo_instantaneo
+            self._ficheiro = open(os.path.join(self.diretorio, _nome(
+                'registo', self.alteracoes, EXTENSAO_REGISTO)), 'ab')
+            _sincronizar_diretorio(self.diretorio)
+
+    def associar(self, rede: RedeViaria):
+        """Passa a registar as alterações da rede (que deve corresponder ao
+           estado já registado, p.ex. a devolvida por recuperar_rede).
+        """
+        if self.rede is not None and self.rede is not rede:
+            self.rede.registo = None
+        self.rede = rede
+        rede.registo = self
+
+    # --- Alterações (chamadas pela RedeViaria) ---
+
+    def local_adicionado(self, local: Local):
+        self._registar([_linha_local(local)])
+
+    def locais_adicionados(self, locais: Iterable[Local]):
+        """Versão em lote de local_adicionado (um só grupo)."""
+        self._registar([_linha_local(local) for local in locais])
+
+    def local_removido(self, designacao: str):
+        self._registar([_codificar(["remover_local", designacao]) + '\n'])
+
+    def troco_adicionado(self, desig1: str, desig2: str, distancia: float, media_veiculos: int):
+        self._registar([_codificar(["adicionar_troco", desig1, desig2, distancia, media_veiculos]) + '\n'])
+
+    def trocos_adicionados(self, trocos: Iterable[Tuple[str, str, float, int]]):
+        """Versão em lote de troco_adicionado (um só grupo)."""
+        self._registar([_codificar(["adicionar_troco", *troco]) + '\n' for troco in trocos])
+
+    def troco_removido(self, desig1: str, desig2: str):
+        self._registar([_codificar(["remover_troco", desig1, desig2]) + '\n'])
+
+    def palavra_chave_alterada(self, designacao: str, palavra: str, adicionada: bool):
+        self._registar([_codificar(["palavra_chave", designacao, palavra, adicionada]) + '\n'])
+
+    def _registar(self, linhas: List[str]):
+        with self._lock:
+            if self._em_transacao is not None:
+                self._em_transacao.extend(linhas)
+                return
+            self._pendentes.extend(linhas)
+            cheio = len(self._pendentes) >= self.max_pendentes
+        if cheio:
+            self.sincronizar()
+            self._instantaneo_se_necessario()
+
+    # --- Transações (RedeConcorrente) ---
+
+    def iniciar_transacao(self):
+        """As alterações seguintes só são escritas em confirmar_transacao."""
+        with self._lock:
+            self._em_transacao = []
+
+    def confirmar_transacao(self):
+        """Escreve e sincroniza as alterações da transação (um só fsync)."""
+        with self._lock:
+            linhas, self._em_transacao = self._em_transacao or [], None
+            self._pendentes.extend(linhas)
+        self.sincronizar()
+        self._instantaneo_se_necessario()
+
+    def anular_transacao(self):
+        """Descarta as alterações da transação, que nunca chegam ao disco."""
+        with self._lock:
+            self._em_transacao = None
+
+    # --- Escrita ---
+
+    def sincronizar(self):
+        """Escreve as alterações pendentes e espera que cheguem ao disco."""
+        with self._lock_escrita:
+            with self._lock:
+                linhas, self._pendentes = self._pendentes, []
+            if not linhas or self._ficheiro is None:
+                return
+            self._ficheiro.write(''.join(linhas).encode('utf-8'))
+            self._ficheiro.flush()
+            os.fsync(self._ficheiro.fileno())
+            self.alteracoes += len(linhas)
+            self.escritas += 1
+
+    def _sincronizar_periodicamente(self):
+        while not self._parar.wait(self.intervalo_s):
+            if self._pendentes:
+                self.sincronizar()
+
+    def _instantaneo_se_necessario(self):
+        if (self.alteracoes_por_instantaneo and self.rede is not None
+                and self.alteracoes - self._ultimo_instantaneo >= self.alteracoes_por_instantaneo):
+            self.guardar_instantaneo()
+
+    def guardar_instantaneo(self) -> str:
+        """Guarda um instantâneo da rede associada e começa um segmento novo.
+           Apaga os instantâneos e segmentos anteriores, que deixam de ser
+           precisos para a recuperação. Não pode ser chamado com alterações
+           à rede a decorrer noutra thread. Retorna o caminho do instantâneo.
+        """
+        if self.rede is None:
+            raise ValueError("Nenhuma rede associada ao registo.")
+        with self._lock_escrita:
+            with self._lock:
+                linhas, self._pendentes = self._pendentes, []
+            if linhas:
+                self._ficheiro.write(''.join(linhas).encode('utf-8'))
+                self.alteracoes += len(linhas)
+            self._ficheiro.flush()
+            os.fsync(self._ficheiro.fileno())
+
+            numero = self.alteracoes
+            caminho = os.path.join(self.diretorio, _nome('instantaneo', numero, EXTENSAO_INSTANTANEO))
+            temporario = caminho + '.tmp'
+            guardar_rede(self.rede, temporario)
+            with open(temporario, 'rb') as ficheiro:
+                os.fsync(ficheiro.fileno())
+            os.replace(temporario, caminho) # Atómico: nunca fica um instantâneo a meio
+
+            self._ficheiro.close()
+            self._ficheiro = open(os.path.join(self.diretorio, _nome(
+                'registo', numero, EXTENSAO_REGISTO)), 'ab')
+            _sincronizar_diretorio(self.diretorio)
+            self._ultimo_instantaneo = numero
+
+            for antigo, caminho_antigo in _ficheiros(self.diretorio, 'instantaneo', EXTENSAO_INSTANTANEO):
+                if antigo < numero:
+                    os.remove(caminho_antigo)
+            for base, caminho_antigo in _ficheiros(self.diretorio, 'registo', EXTENSAO_REGISTO):
+                if base < numero:
+                    os.remove(caminho_antigo)
+        return caminho
+
+    def fechar(self):
+        """Sincroniza o que estiver pendente e fecha o registo."""
+        if self._fechado:
+            return
+        self._fechado = True
+        self._parar.set()
+        if self._fundo is not None:
+            self._fundo.join()
+        self.sincronizar()
+        with self._lock_escrita:
+            self._ficheiro.close()
+            self._ficheiro = None
+        if self.rede is not None:
+            self.rede.registo = None
+
+    def __enter__(self) -> 'RegistoAlteracoes':
+        return self
+
+    def __exit__(self, *excecao):
+        self.fechar()
+
+
+def _linha_local(local: Local) -> str:
+    return _codificar(["adicionar_local", local.designacao, local.freguesia, *local.coords_gps,
+                       sorted(local.palavras_chave), local.url]) + '\n'
+
+
+# --- Recuperação ---
+
+def _linhas_completas(caminho: str) -> Tuple[List[bytes], int]:
+    """Linhas terminadas em '\\n' do segmento e o tamanho em bytes que ocupam."""
+    with open(caminho, 'rb') as ficheiro:
+        dados = ficheiro.read()
+    fim = dados.rfind(b'\n') + 1
+    return dados[:fim].splitlines(), fim
+
+
+def _repetir(rede: RedeViaria, alteracoes):
+    """Aplica as alterações à rede pela ordem dada. Sequências de adições
+       consecutivas vão de uma vez para a API em lote.
+    """
+    locais: List[Local] = []
+    trocos: List[Tuple[str, str, float, int]] = []
+
+    def aplicar_lotes():
+        if locais:
+            rede.adicionar_locais_em_lote(locais)
+            locais.clear()
+        if trocos:
+            rede.adicionar_trocos_em_lote(trocos)
+            trocos.clear()
+
+    for alteracao in alteracoes:
+        operacao = alteracao[0]
+        if operacao == "adicionar_local":
+            if trocos:
+                aplicar_lotes()
+            _, designacao, freguesia, latitude, longitude, palavras, url = alteracao
+            locais.append(Local(designacao, freguesia, (latitude, longitude), palavras, url))
+            continue
+        if operacao == "adicionar_troco":
+            if locais:
+                aplicar_lotes()
+            trocos.append(tuple(alteracao[1:]))
+            continue
+        aplicar_lotes()
+        if operacao == "remover_local":
+            rede.remover_local(alteracao[1])
+        elif operacao == "remover_troco":
+            rede.remover_troco(alteracao[1], alteracao[2])
+        elif operacao == "palavra_chave":
+            _, designacao, palavra, adicionada = alteracao
+            if adicionada:
+                rede.locais[designacao].adicionar_palavra_chave(palavra)
+            else:
+                rede.locais[designacao].remover_palavra_chave(palavra)
+        else:
+            raise ValueError(f"Alteração desconhecida no registo: {operacao!r}.")
+    aplicar_lotes()
+
+
+def recuperar_rede(diretorio: str, fabrica: Callable[[], RedeViaria] = RedeViaria) -> RedeViaria:
+    """Reconstrói a rede: último instantâneo + alterações registadas depois dele.
+       Um diretório vazio ou inexistente dá uma rede vazia.
+    """
+    if not os.path.isdir(diretorio):
+        return fabrica()
+    instantaneos = _ficheiros(diretorio, 'instantaneo', EXTENSAO_INSTANTANEO)
+    if instantaneos:
+        numero, caminho = instantaneos[-1]
+        rede = carregar_rede(caminho)
+    else:
+        numero, rede = 0, fabrica()
+
+    segmentos = _ficheiros(diretorio, 'registo', EXTENSAO_REGISTO)
+    with open(os.devnull, 'w') as nulo, contextlib.redirect_stdout(nulo):
+        for base, caminho in segmentos:
+            linhas, _ = _linhas_completas(caminho)
+            if base + len(linhas) <= numero:
+                continue # Já incluído no instantâneo
+            if base > numero:
+                raise ValueError(f"Registo de alterações incompleto: faltam as alterações "
+                                 f"{numero} a {base - 1}.")
+            _repetir(rede, (json.loads(linha) for linha in linhas[numero - base:]))
+            numero = base + len(linhas)
+    return rede
+
+
+def abrir_rede(diretorio: str, **opcoes) -> RedeViaria:
+    """Recupera a rede guardada no diretório e associa-lhe um RegistoAlteracoes
+       (acessível em rede.registo; fechar com rede.registo.fechar()).
+       As opções são as de RegistoAlteracoes.
+    """
+    inicio = time.perf_counter()
+    rede = recuperar_rede(diretorio)
+    registo = RegistoAlteracoes(diretorio, **opcoes)
+    registo.associar(rede)
+    print(f"Rede recuperada de '{diretorio}' em {time.perf_counter() - inicio:.2f} s "
+          f"({len(rede.locais)} locais, {registo.alteracoes} alterações registadas).")
+    return rede
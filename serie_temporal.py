@@ -0,0 +1,409 @@
+# serie_temporal.py
+import heapq
+from array import array
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from encaminhamento import VEICULOS_REFERENCIA, FuncaoCusto, ResultadoRota, _reconstruir_caminho
+from local import LIMIAR_NUMPY, calcular_distancia_geografica
+from ranking_trocos import par_canonico
+
+try:
+    import numpy as np
+except ImportError: # NumPy é opcional: os agregados usam ciclos Python
+    np = None
+
+SEGUNDOS_POR_DIA = 86400
+ESTATISTICAS = ('media', 'pico', 'total')
+# Velocidade sem trânsito usada para converter distância em tempo de viagem
+VELOCIDADE_LIVRE_KMH = 50.0
+
+Janela = Tuple[float, float]
+
+# Linhas por bloco de colunas: a unidade copiada na escrita depois de partilhar
+LINHAS_POR_BLOCO = 256
+# Número de intervalo/dia das células sem leituras (nenhum período real chega aqui)
+VAZIO = -2**31
+
+
+class _BlocoTrafego:
+    """Colunas de LINHAS_POR_BLOCO linhas seguidas de uma SerieTrafego."""
+    __slots__ = ('volumes', 'intervalos', 'somas_dia', 'picos_dia', 'contagens_dia', 'dias', 'ultimos')
+
+    def __init__(self):
+        # Por intervalo (posicao * retencao_intervalos + intervalo % retencao_intervalos)
+        self.volumes = array('f')
+        self.intervalos = array('i')
+        # Por dia (posicao * retencao_dias + dia % retencao_dias)
+        self.somas_dia = array('d')
+        self.picos_dia = array('f')
+        self.contagens_dia = array('i')
+        self.dias = array('i')
+        # Intervalo mais recente com leituras, por linha (VAZIO = nenhum)
+        self.ultimos = array('i')
+
+    def copiar(self) -> '_BlocoTrafego':
+        copia = _BlocoTrafego.__new__(_BlocoTrafego)
+        for nome in _BlocoTrafego.__slots__:
+            coluna = getattr(self, nome)
+            setattr(copia, nome, array(coluna.typecode, coluna))
+        return copia
+
+
+class SerieTrafego:
+    """Contagens de veículos por troço ao longo do tempo, em colunas contíguas.
+
+    As leituras são somadas em intervalos fixos (uma hora, por omissão). Cada
+    troço com leituras tem uma linha em dois buffers circulares:
+      - por intervalo: os últimos retencao_intervalos volumes (array('f'))
+        e o número do intervalo guardado em cada célula (array('i'));
+      - por dia: soma, pico (maior volume de um intervalo) e número de
+        intervalos com dados dos últimos retencao_dias dias.
+    Cada leitura atualiza as duas células em O(1), pelo que os agregados
+    diários estão sempre calculados e o custo das consultas não depende do
+    número de leituras recebidas. Os dias e intervalos contam-se desde a
+    época Unix (UTC).
+
+    As colunas estão divididas em blocos de LINHAS_POR_BLOCO linhas, para
+    que partilhar() não copie os buffers: cada bloco só é copiado quando
+    é alterado pela primeira vez depois disso.
+    """
+
+    def __init__(self, intervalo_s: int = 3600, retencao_intervalos: int = 48, retencao_dias: int = 30):
+        if SEGUNDOS_POR_DIA % intervalo_s:
+            raise ValueError("O intervalo tem de dividir um dia.")
+        self.intervalo_s = intervalo_s
+        self.intervalos_por_dia = SEGUNDOS_POR_DIA // intervalo_s
+        self.retencao_intervalos = retencao_intervalos
+        # A retenção diária tem de cobrir a horária (um intervalo aceite tem sempre o seu dia)
+        self.retencao_dias = max(retencao_dias, -(-retencao_intervalos // self.intervalos_por_dia) + 1)
+        # {par_canonico: linha}, o inverso (None = linha livre) e as linhas livres
+        self.linhas: Dict[Tuple[str, str], int] = {}
+        self.pares: List[Optional[Tuple[str, str]]] = []
+        self.livres: List[int] = []
+        # Linha l está no bloco l // LINHAS_POR_BLOCO, posição l % LINHAS_POR_BLOCO
+        self.blocos: List[_BlocoTrafego] = []
+        # Blocos não partilhados com instantâneos (None = todos)
+        self._proprios: Optional[Set[int]] = None
+        self.leituras = 0
+
+    def __len__(self):
+        return len(self.linhas)
+
+    def _copia_vazia(self) -> 'SerieTrafego':
+        copia = SerieTrafego(self.intervalo_s, self.retencao_intervalos, self.retencao_dias)
+        copia.linhas = dict(self.linhas)
+        copia.pares = list(self.pares)
+        copia.livres = list(self.livres)
+        copia.leituras = self.leituras
+        return copia
+
+    def copiar(self) -> 'SerieTrafego':
+        copia = self._copia_vazia()
+        copia.blocos = [bloco.copiar() for bloco in self.blocos]
+        return copia
+
+    def partilhar(self) -> 'SerieTrafego':
+        """Cópia só de leitura que partilha os blocos de colunas com esta
+           série. A partir daqui esta série copia cada bloco antes de o alterar.
+        """
+        copia = self._copia_vazia()
+        copia.blocos = list(self.blocos)
+        self._proprios = set()
+        return copia
+
+    def _bloco_proprio(self, indice: int) -> _BlocoTrafego:
+        bloco = self.blocos[indice]
+        if self._proprios is not None and indice not in self._proprios:
+            bloco = self.blocos[indice] = bloco.copiar()
+            self._proprios.add(indice)
+        return bloco
+
+    def _linha(self, par: Tuple[str, str]) -> int:
+        linha = self.linhas.get(par)
+        if linha is not None:
+            return linha
+        if self.livres:
+            linha = self.livres.pop()
+            self.pares[linha] = par
+            indice, posicao = divmod(linha, LINHAS_POR_BLOCO)
+            self._bloco_proprio(indice).ultimos[posicao] = VAZIO
+        else:
+            linha = len(self.pares)
+            self.pares.append(par)
+            indice = linha // LINHAS_POR_BLOCO
+            if indice == len(self.blocos):
+                self.blocos.append(_BlocoTrafego())
+                if self._proprios is not None:
+                    self._proprios.add(indice)
+            bloco = self._bloco_proprio(indice)
+            bloco.volumes.extend(array('f', [0.0]) * self.retencao_intervalos)
+            bloco.intervalos.extend(array('i', [VAZIO]) * self.retencao_intervalos)
+            bloco.somas_dia.extend(array('d', [0.0]) * self.retencao_dias)
+            bloco.picos_dia.extend(array('f', [0.0]) * self.retencao_dias)
+            bloco.contagens_dia.extend(array('i', [0]) * self.retencao_dias)
+            bloco.dias.extend(array('i', [VAZIO]) * self.retencao_dias)
+            bloco.ultimos.append(VAZIO)
+        self.linhas[par] = linha
+        return linha
+
+    def registar(self, desig1: str, desig2: str, instante_s: float, veiculos: float) -> bool:
+        """Soma uma leitura de um contador ao intervalo e ao dia do instante.
+           Retorna False (e ignora a leitura) se o instante já saiu da retenção,
+           contada a partir da leitura mais recente do troço; uma célula que
+           guarda um período mais recente nunca é reutilizada.
+           Complexidade: O(1).
+        """
+        intervalo = int(instante_s // self.intervalo_s)
+        dia = intervalo // self.intervalos_por_dia
+        par = par_canonico(desig1, desig2)
+        linha = self.linhas.get(par)
+        if linha is None:
+            linha = self._linha(par)
+        indice, posicao = divmod(linha, LINHAS_POR_BLOCO)
+        bloco = self.blocos[indice]
+        celula = posicao * self.retencao_intervalos + intervalo % self.retencao_intervalos
+        celula_dia = posicao * self.retencao_dias + dia % self.retencao_dias
+        ultimo = bloco.ultimos[posicao]
+        if ultimo != VAZIO and dia <= ultimo // self.intervalos_por_dia - self.retencao_dias:
+            return False # O dia já saiu da retenção diária
+        if bloco.intervalos[celula] > intervalo or bloco.dias[celula_dia] > dia:
+            return False # A célula já foi reutilizada por um período mais recente
+
+        bloco = self._bloco_proprio(indice)
+        if intervalo > ultimo:
+            bloco.ultimos[posicao] = intervalo
+        volumes, picos_dia = bloco.volumes, bloco.picos_dia
+        novo_intervalo = bloco.intervalos[celula] != intervalo
+        if novo_intervalo:
+            bloco.intervalos[celula] = intervalo
+            volumes[celula] = veiculos
+        else:
+            volumes[celula] += veiculos
+
+        if bloco.dias[celula_dia] != dia:
+            bloco.dias[celula_dia] = dia
+            bloco.somas_dia[celula_dia] = 0.0
+            picos_dia[celula_dia] = 0.0
+            bloco.contagens_dia[celula_dia] = 0
+        bloco.somas_dia[celula_dia] += veiculos
+        bloco.contagens_dia[celula_dia] += novo_intervalo
+        if volumes[celula] > picos_dia[celula_dia]:
+            picos_dia[celula_dia] = volumes[celula]
+        self.leituras += 1
+        return True
+
+    def remover(self, desig1: str, desig2: str) -> bool:
+        """Esquece a série de um troço. A linha é reutilizada por troços seguintes."""
+        linha = self.linhas.pop(par_canonico(desig1, desig2), None)
+        if linha is None:
+            return False
+        indice, posicao = divmod(linha, LINHAS_POR_BLOCO)
+        bloco = self._bloco_proprio(indice)
+        inicio = posicao * self.retencao_intervalos
+        bloco.intervalos[inicio:inicio + self.retencao_intervalos] = array('i', [VAZIO]) * self.retencao_intervalos
+        inicio = posicao * self.retencao_dias
+        bloco.dias[inicio:inicio + self.retencao_dias] = array('i', [VAZIO]) * self.retencao_dias
+        self.pares[linha] = None
+        self.livres.append(linha)
+        return True
+
+    def volume_no_instante(self, desig1: str, desig2: str, instante_s: float) -> Optional[float]:
+        """Volume registado no intervalo que contém o instante (None sem leituras)."""
+        linha = self.linhas.get(par_canonico(desig1, desig2))
+        if linha is None:
+            return None
+        intervalo = int(instante_s // self.intervalo_s)
+        indice, posicao = divmod(linha, LINHAS_POR_BLOCO)
+        bloco = self.blocos[indice]
+        celula = posicao * self.retencao_intervalos + intervalo % self.retencao_intervalos
+        return bloco.volumes[celula] if bloco.intervalos[celula] == intervalo else None
+
+    def _limites(self, janela: Janela) -> Tuple[bool, int, int]:
+        """(por_dia, primeiro, fim): os dias ou intervalos [primeiro, fim) da
+           janela. Janelas de dias inteiros usam os agregados diários (menos
+           colunas); o intervalo parcial no fim é incluído. primeiro nunca é
+           inferior a VAZIO + 1, para as células sem leituras ficarem de fora.
+        """
+        inicio, fim = janela
+        if inicio % SEGUNDOS_POR_DIA == 0 and fim % SEGUNDOS_POR_DIA == 0:
+            return True, max(int(inicio // SEGUNDOS_POR_DIA), VAZIO + 1), int(fim // SEGUNDOS_POR_DIA)
+        return False, max(int(inicio // self.intervalo_s), VAZIO + 1), -int(-fim // self.intervalo_s)
+
+    def agregar(self, desig1: str, desig2: str, janela: Janela, estatistica: str = 'media') -> Optional[float]:
+        """Estatística ('media', 'pico' ou 'total') dos volumes de um troço
+           na janela [inicio_s, fim_s). None se não houver leituras na janela.
+        """
+        linha = self.linhas.get(par_canonico(desig1, desig2))
+        if linha is None:
+            return None
+        soma, contagem, pico = self._agregar_linha(linha, janela)
+        return _estatistica(estatistica, soma, contagem, pico) if contagem else None
+
+    def _agregar_linha(self, linha: int, janela: Janela) -> Tuple[float, int, float]:
+        indice, posicao = divmod(linha, LINHAS_POR_BLOCO)
+        bloco = self.blocos[indice]
+        por_dia, primeiro, fim = self._limites(janela)
+        if por_dia:
+            d0, d1 = primeiro, fim
+            base, n = posicao * self.retencao_dias, self.retencao_dias
+            soma, contagem, pico = 0.0, 0, 0.0
+            for c in range(base, base + n):
+                if d0 <= bloco.dias[c] < d1:
+                    soma += bloco.somas_dia[c]
+                    contagem += bloco.contagens_dia[c]
+                    pico = max(pico, bloco.picos_dia[c])
+            return soma, contagem, pico
+
+        i0, i1 = primeiro, fim
+        base, n = posicao * self.retencao_intervalos, self.retencao_intervalos
+        soma, contagem, pico = 0.0, 0, 0.0
+        for c in range(base, base + n):
+            if i0 <= bloco.intervalos[c] < i1:
+                volume = bloco.volumes[c]
+                soma += volume
+                contagem += 1
+                pico = max(pico, volume)
+        return soma, contagem, pico
+
+    def ranking(self, janela: Janela, estatistica: str = 'media',
+                k: Optional[int] = None) -> List[Tuple[str, str, float]]:
+        """[(desig1, desig2, valor)] dos troços com leituras na janela, por
+           ordem decrescente da estatística. Com NumPy, os agregados de todos os
+           troços são calculados de uma vez sobre as colunas.
+           Complexidade: O(T * C), com T troços com leituras e C células por linha.
+        """
+        if estatistica not in ESTATISTICAS:
+            raise ValueError(f"Estatística '{estatistica}' desconhecida.")
+        num_linhas = len(self.pares)
+        if np is not None and num_linhas * self.retencao_intervalos >= LIMIAR_NUMPY:
+            valores = np.concatenate([self._valores_numpy(bloco, janela, estatistica)
+                                      for bloco in self.blocos])
+            if self.livres:
+                valores[self.livres] = np.nan # Linhas de troços removidos
+            linhas = np.flatnonzero(~np.isnan(valores))
+            if k is not None and k < len(linhas):
+                if k <= 0:
+                    linhas = linhas[:0]
+                else:
+                    # Todas as linhas empatadas com a k-ésima, para o desempate por nome abaixo
+                    corte = np.partition(valores[linhas], len(linhas) - k)[len(linhas) - k]
+                    linhas = linhas[valores[linhas] >= corte]
+            resultado = [(self.pares[l][0], self.pares[l][1], float(valores[l])) for l in linhas.tolist()]
+        else:
+            resultado = []
+            for linha, par in enumerate(self.pares):
+                if par is not None:
+                    soma, contagem, pico = self._agregar_linha(linha, janela)
+                    if contagem:
+                        resultado.append((par[0], par[1], _estatistica(estatistica, soma, contagem, pico)))
+        resultado.sort(key=lambda troco: (-troco[2], troco[0], troco[1]))
+        return resultado if k is None else resultado[:max(k, 0)]
+
+    def _valores_numpy(self, bloco: _BlocoTrafego, janela: Janela, estatistica: str):
+        """Estatística por linha do bloco (NaN para linhas sem leituras na janela)."""
+        por_dia, primeiro, fim = self._limites(janela)
+        if por_dia:
+            n = self.retencao_dias
+            d0, d1 = primeiro, fim
+            dias = np.frombuffer(bloco.dias, dtype=np.int32).reshape(-1, n)
+            mascara = (dias >= d0) & (dias < d1)
+            somas = np.where(mascara, np.frombuffer(bloco.somas_dia, dtype=np.float64).reshape(-1, n), 0.0)
+            contagens = np.where(mascara, np.frombuffer(bloco.contagens_dia, dtype=np.int32).reshape(-1, n), 0)
+            picos = np.where(mascara, np.frombuffer(bloco.picos_dia, dtype=np.float32).reshape(-1, n), 0.0)
+        else:
+            n = self.retencao_intervalos
+            i0, i1 = primeiro, fim
+            intervalos = np.frombuffer(bloco.intervalos, dtype=np.int32).reshape(-1, n)
+            mascara = (intervalos >= i0) & (intervalos < i1)
+            somas = picos = np.where(mascara, np.frombuffer(bloco.volumes, dtype=np.float32).reshape(-1, n), 0.0)
+            contagens = mascara
+        soma, contagem = somas.sum(axis=1, dtype=np.float64), contagens.sum(axis=1)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            if estatistica == 'media':
+                valores = soma / contagem
+            elif estatistica == 'pico':
+                valores = picos.max(axis=1).astype(np.float64)
+            else:
+                valores = soma
+        return np.where(contagem > 0, valores, np.nan)
+
+
+def _estatistica(estatistica: str, soma: float, contagem: int, pico: float) -> float:
+    if estatistica == 'media':
+        return soma / contagem
+    if estatistica == 'pico':
+        return pico
+    return soma
+
+
+def janela_intervalo(instante_s: float, intervalo_s: int = 3600) -> Janela:
+    """Janela do intervalo (hora, por omissão) que contém o instante."""
+    inicio = instante_s // intervalo_s * intervalo_s
+    return inicio, inicio + intervalo_s
+
+
+def janela_dia(instante_s: float, dias: int = 1) -> Janela:
+    """Janela dos `dias` dias (UTC) que terminam no dia que contém o instante."""
+    fim = (instante_s // SEGUNDOS_POR_DIA + 1) * SEGUNDOS_POR_DIA
+    return fim - dias * SEGUNDOS_POR_DIA, fim
+
+
+# --- Custos dependentes do tempo ---
+
+def custo_no_instante(serie: SerieTrafego, instante_s: float) -> FuncaoCusto:
+    """Como encaminhamento.custo_trafego, mas com o volume registado no
+       intervalo do instante (convertido para média diária) em vez de
+       media_veiculos. Troços sem leituras nesse intervalo usam media_veiculos.
+    """
+    def custo(origem: str, destino: str, dados: Dict) -> float:
+        volume = serie.volume_no_instante(origem, destino, instante_s)
+        veiculos = volume * serie.intervalos_por_dia if volume is not None else dados['media_veiculos']
+        return dados['distancia'] * (1.0 + veiculos / VEICULOS_REFERENCIA)
+    return custo
+
+
+def rota_dependente_tempo(adj: Dict[str, Dict[str, Dict]], locais: Dict, origem: str, destino: str,
+                          partida_s: float, serie: SerieTrafego,
+                          velocidade_kmh: float = VELOCIDADE_LIVRE_KMH) -> Optional[ResultadoRota]:
+    """Caminho mais rápido partindo em partida_s (A* sobre o instante de chegada).
+
+       Cada troço é percorrido a velocidade_kmh, atrasada pelo trânsito
+       registado no intervalo em que se entra no troço (ver custo_no_instante).
+       O custo devolvido é o tempo de viagem em minutos. A heurística
+       (distância Haversine à velocidade livre) nunca sobrestima o tempo.
+       Assume-se que partir mais tarde nunca faz chegar mais cedo (FIFO).
+    """
+    if origem not in adj or destino not in adj:
+        return None
+    coords_destino = locais[destino].coords_gps
+    horas_por_km = 1.0 / velocidade_kmh
+
+    def heuristica(no: str) -> float:
+        return calcular_distancia_geografica(locais[no].coords_gps, coords_destino) * horas_por_km * 3600
+
+    chegadas = {origem: float(partida_s)}
+    anteriores: Dict[str, Optional[str]] = {origem: None}
+    fechados = set()
+    fila = [(partida_s + heuristica(origem), float(partida_s), origem)]
+    nos_expandidos = 0
+
+    while fila:
+        _, chegada, no = heapq.heappop(fila)
+        if no in fechados or chegada > chegadas[no]:
+            continue
+        if no == destino:
+            return ResultadoRota(_reconstruir_caminho(anteriores, destino),
+                                 (chegada - partida_s) / 60, nos_expandidos)
+        fechados.add(no)
+        nos_expandidos += 1
+        custo = custo_no_instante(serie, chegada)
+
+        for vizinho, dados in adj[no].items():
+            if vizinho in fechados:
+                continue
+            nova_chegada = chegada + custo(no, vizinho, dados) * horas_por_km * 3600
+            if nova_chegada < chegadas.get(vizinho, float('inf')):
+                chegadas[vizinho] = nova_chegada
+                anteriores[vizinho] = no
+                heapq.heappush(fila, (nova_chegada + heuristica(vizinho), nova_chegada, vizinho))
+    return None
@@ -0,0 +1,306 @@
+# servidor.py
+import argparse
+import asyncio
+import json
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import encaminhamento
+import serie_temporal
+from concorrencia import RedeConcorrente
+from ordenacao import CHAVES_ORDENACAO
+from rede_viaria import RedeViaria
+
+# --- Protocolo ---
+#
+# JSON por linhas sobre TCP. Cada linha enviada pelo cliente é um pedido
+#     {"id": 1, "operacao": "pesquisar_locais", "parametros": {...}}
+# ou uma lista de pedidos (lote). A resposta é uma linha com
+#     {"id": 1, "resultado": ...}  ou  {"id": 1, "erro": "mensagem"}
+# (ou a lista das respostas, pela mesma ordem, para um lote).
+#
+# A ligação mantém-se aberta entre pedidos (keep-alive) até o cliente a
+# fechar ou ficar inativa TEMPO_INATIVIDADE_S segundos. O cliente pode
+# enviar vários pedidos seguidos sem esperar pelas respostas; estas chegam
+# pela ordem dos pedidos.
+
+TEMPO_INATIVIDADE_S = 300.0
+TAMANHO_MAXIMO_LINHA = 4 * 1024 * 1024
+PORTA_PREDEFINIDA = 8765
+
+
+class ErroPedido(Exception):
+    """Pedido inválido (operação desconhecida, parâmetros em falta, etc.)."""
+
+
+def _texto(valor: Any, nome: str) -> str:
+    if not isinstance(valor, str):
+        raise ErroPedido(f"O parâmetro '{nome}' tem de ser texto.")
+    return valor
+
+
+def _texto_opcional(valor: Any, nome: str) -> Optional[str]:
+    return None if valor is None else _texto(valor, nome)
+
+
+def _par_numeros(valor: Any, nome: str) -> Tuple[float, float]:
+    if not isinstance(valor, (list, tuple)) or len(valor) != 2:
+        raise ErroPedido(f"O parâmetro '{nome}' tem de ser uma lista com dois números.")
+    return float(valor[0]), float(valor[1])
+
+
+def _local_para_json(local, distancia: Optional[float]) -> Dict[str, Any]:
+    return {
+        'designacao': local.designacao,
+        'freguesia': local.freguesia,
+        'coords_gps': list(local.coords_gps),
+        'palavras_chave': sorted(local.palavras_chave),
+        'url': local.url,
+        'distancia_km': distancia,
+    }
+
+
+def _pesquisar_locais(rede: RedeViaria, designacao: Optional[str] = None,
+                      freguesia: Optional[str] = None, palavra_chave: Optional[str] = None,
+                      ponto_gps: Optional[List[float]] = None, raio_km: float = 5.0,
+                      ordenar_por: str = 'designacao', offset: int = 0,
+                      limite: Optional[int] = None) -> List[Dict[str, Any]]:
+    designacao = _texto_opcional(designacao, 'designacao')
+    freguesia = _texto_opcional(freguesia, 'freguesia')
+    palavra_chave = _texto_opcional(palavra_chave, 'palavra_chave')
+    if _texto(ordenar_por, 'ordenar_por') not in CHAVES_ORDENACAO:
+        raise ErroPedido(f"Chave de ordenação '{ordenar_por}' desconhecida.")
+    if ordenar_por == 'distancia' and not ponto_gps:
+        raise ErroPedido("Ordenação por distância requer um ponto GPS.")
+    if ponto_gps is not None:
+        ponto_gps = _par_numeros(ponto_gps, 'ponto_gps')
+    resultados = rede.pesquisar_locais_com_distancias(
+        designacao, freguesia, palavra_chave, ponto_gps, float(raio_km),
+        ordenar_por, int(offset), None if limite is None else int(limite), mensagens=False)
+    return [_local_para_json(local, distancia) for local, distancia in resultados]
+
+
+def _sugerir_designacoes(rede: RedeViaria, prefixo: str, limite: int = 10) -> List[str]:
+    return rede.sugerir_designacoes(_texto(prefixo, 'prefixo'), int(limite))
+
+
+def _pesquisar_designacao_aproximada(rede: RedeViaria, texto: str, distancia_maxima: int = 1,
+                                     limite: int = 10) -> List[Dict[str, Any]]:
+    distancia_maxima = int(distancia_maxima)
+    if not 0 <= distancia_maxima <= 3:
+        raise ErroPedido("A distância máxima tem de estar entre 0 e 3.")
+    resultados = rede.pesquisar_designacao_aproximada(_texto(texto, 'texto'), distancia_maxima, int(limite))
+    return [dict(_local_para_json(local, None), distancia_edicao=distancia)
+            for local, distancia in resultados]
+
+
+def _consultar_troco(rede: RedeViaria, local1: str, local2: str) -> Optional[Dict[str, Any]]:
+    # Consulta direta à adjacência: None (sem mensagem na consola) se não existir
+    local1, local2 = _texto(local1, 'local1'), _texto(local2, 'local2')
+    local1 = rede.resolver_designacao(local1) or local1
+    local2 = rede.resolver_designacao(local2) or local2
+    dados = rede.adj.get(local1, {}).get(local2)
+    return dict(dados) if dados is not None else None
+
+
+def _consultar_trocos_mais_circulacao(rede: RedeViaria, limite: Optional[int] = None,
+                                      janela: Optional[List[float]] = None,
+                                      estatistica: str = 'media') -> List[list]:
+    if _texto(estatistica, 'estatistica') not in serie_temporal.ESTATISTICAS:
+        raise ErroPedido(f"Estatística '{estatistica}' desconhecida.")
+    if janela is not None:
+        janela = _par_numeros(janela, 'janela')
+    trocos = rede.top_trocos(None if limite is None else int(limite), janela, estatistica)
+    return [list(troco) for troco in trocos]
+
+
+def _consultar_trocos_criticos(rede: RedeViaria, limite: Optional[int] = None,
+                               amostras: int = 64) -> List[list]:
+    # Um só processo: o servidor já reparte os pedidos pesados por threads
+    trocos = rede.consultar_trocos_criticos(None if limite is None else int(limite), int(amostras), 1)
+    return [list(troco) for troco in trocos]
+
+
+def _calcular_rota(rede: RedeViaria, origem: str, destino: str, algoritmo: str = 'a_estrela',
+                   custo: str = 'distancia', partida_s: Optional[float] = None) -> Optional[Dict[str, Any]]:
+    origem = rede.resolver_designacao(_texto(origem, 'origem')) or origem
+    destino = rede.resolver_designacao(_texto(destino, 'destino')) or destino
+    if origem not in rede.locais or destino not in rede.locais:
+        raise ErroPedido("Um ou ambos os locais não existem na rede.")
+    if _texto(algoritmo, 'algoritmo') not in encaminhamento.ALGORITMOS:
+        raise ErroPedido(f"Algoritmo '{algoritmo}' desconhecido.")
+    if _texto(custo, 'custo') not in encaminhamento.FUNCOES_CUSTO and custo != 'tempo':
+        raise ErroPedido(f"Custo '{custo}' desconhecido.")
+    resultado = rede.calcular_rota(origem, destino, algoritmo, custo,
+                                   None if partida_s is None else float(partida_s), mensagens=False)
+    if resultado is None:
+        return None
+    return {'caminho': resultado.caminho, 'custo': resultado.custo,
+            'nos_expandidos': resultado.nos_expandidos}
+
+
+def _estatisticas_cache(rede: RedeViaria) -> Dict[str, float]:
+    return rede.estatisticas_cache()
+
+
+# {operacao: (função, pesada)}. As operações pesadas (pesquisas e rotas)
+# correm no executor para não bloquear o ciclo de eventos.
+OPERACOES: Dict[str, Tuple[Callable, bool]] = {
+    'pesquisar_locais': (_pesquisar_locais, True),
+    'sugerir_designacoes': (_sugerir_designacoes, False),
+    'pesquisar_designacao_aproximada': (_pesquisar_designacao_aproximada, True),
+    'consultar_troco': (_consultar_troco, False),
+    'consultar_trocos_mais_circulacao': (_consultar_trocos_mais_circulacao, False),
+    'consultar_trocos_criticos': (_consultar_trocos_criticos, True),
+    'calcular_rota': (_calcular_rota, True),
+    'estatisticas_cache': (_estatisticas_cache, False),
+}
+
+
+def executar_pedido(rede: RedeViaria, pedido: Any) -> Dict[str, Any]:
+    """Executa um pedido sobre a rede e constrói a resposta (nunca lança exceções)."""
+    if not isinstance(pedido, dict):
+        return {'id': None, 'erro': "O pedido tem de ser um objeto JSON."}
+    resposta: Dict[str, Any] = {'id': pedido.get('id')}
+    try:
+        operacao = OPERACOES.get(pedido.get('operacao'))
+        if operacao is None:
+            raise ErroPedido(f"Operação '{pedido.get('operacao')}' desconhecida.")
+        parametros = pedido.get('parametros') or {}
+        if not isinstance(parametros, dict):
+            raise ErroPedido("Os parâmetros têm de ser um objeto JSON.")
+        resposta['resultado'] = operacao[0](rede, **parametros)
+    except ErroPedido as e:
+        resposta['erro'] = str(e)
+    except (TypeError, ValueError, IndexError) as e:
+        resposta['erro'] = f"Parâmetros inválidos: {e}"
+    except Exception as e: # Uma falha interna não pode derrubar a ligação
+        resposta['erro'] = f"Erro interno: {type(e).__name__}: {e}"
+    return resposta
+
+
+def executar_lote(rede: RedeViaria, pedidos: List[Any]) -> List[Dict[str, Any]]:
+    """Executa um lote de pedidos sobre o mesmo instantâneo da rede."""
+    return [executar_pedido(rede, pedido) for pedido in pedidos]
+
+
+def _pedido_pesado(pedido: Any) -> bool:
+    operacao = OPERACOES.get(pedido.get('operacao')) if isinstance(pedido, dict) else None
+    return operacao is not None and operacao[1]
+
+
+class ServidorRede:
+    """Servidor asyncio de consultas à rede (protocolo no cabeçalho do módulo).
+
+    Cada pedido ou lote é respondido sobre o instantâneo publicado mais
+    recente de uma RedeConcorrente, pelo que as consultas podem correr em
+    paralelo com transações de escrita. Os lotes com operações pesadas vão
+    num só salto para o executor, amortizando o custo da passagem de thread.
+    """
+
+    def __init__(self, rede: RedeConcorrente, hospedeiro: str = '127.0.0.1',
+                 porta: int = PORTA_PREDEFINIDA, trabalhadores: Optional[int] = None):
+        self.rede = rede
+        self.hospedeiro = hospedeiro
+        self.porta = porta
+        self.executor = ThreadPoolExecutor(max_workers=trabalhadores)
+        self.servidor: Optional[asyncio.base_events.Server] = None
+        self.ligacoes_ativas = 0
+        self.pedidos_atendidos = 0
+
+    async def iniciar(self):
+        """Começa a aceitar ligações. Com porta 0 é escolhida uma porta livre."""
+        self.servidor = await asyncio.start_server(
+            self._atender_ligacao, self.hospedeiro, self.porta, limit=TAMANHO_MAXIMO_LINHA)
+        self.porta = self.servidor.sockets[0].getsockname()[1]
+
+    async def servir(self):
+        """Inicia (se necessário) e serve até ser cancelado."""
+        if self.servidor is None:
+            await self.iniciar()
+        async with self.servidor:
+            await self.servidor.serve_forever()
+
+    async def fechar(self):
+        if self.servidor is not None:
+            self.servidor.close()
+            await self.servidor.wait_closed()
+        self.executor.shutdown(wait=False)
+
+    async def _responder(self, mensagem: Any) -> Any:
+        rede = self.rede.instantaneo()
+        lote = isinstance(mensagem, list)
+        pedidos = mensagem if lote else [mensagem]
+        self.pedidos_atendidos += len(pedidos)
+
+        if any(_pedido_pesado(pedido) for pedido in pedidos):
+            loop = asyncio.get_running_loop()
+            respostas = await loop.run_in_executor(self.executor, executar_lote, rede, pedidos)
+        else:
+            respostas = executar_lote(rede, pedidos)
+        return respostas if lote else respostas[0]
+
+    async def _atender_ligacao(self, leitor: asyncio.StreamReader, escritor: asyncio.StreamWriter):
+        self.ligacoes_ativas += 1
+        try:
+            while True:
+                try:
+                    linha = await asyncio.wait_for(leitor.readline(), TEMPO_INATIVIDADE_S)
+                except (asyncio.TimeoutError, ConnectionError):
+                    break
+                except ValueError: # Linha maior que TAMANHO_MAXIMO_LINHA
+                    escritor.write(b'{"id": null, "erro": "Pedido demasiado grande."}\n')
+                    break
+                if not linha:
+                    break # O cliente fechou a ligação
+                if not linha.strip():
+                    continue
+
+                try:
+                    resposta = await self._responder(json.loads(linha))
+                except (json.JSONDecodeError, UnicodeDecodeError) as e:
+                    resposta = {'id': None, 'erro': f"JSON inválido: {e}"}
+                except Exception as e: # Responde com erro e mantém a ligação aberta
+                    resposta = {'id': None, 'erro': f"Erro interno: {type(e).__name__}: {e}"}
+                try:
+                    texto = json.dumps(resposta, ensure_ascii=False)
+                except (TypeError, ValueError) as e: # Resultado sem representação JSON
+                    texto = json.dumps({'id': None, 'erro': f"Erro interno: {e}"}, ensure_ascii=False)
+                escritor.write(texto.encode('utf-8') + b'\n')
+                await escritor.drain()
+        except ConnectionError:
+            pass
+        finally:
+            self.ligacoes_ativas -= 1
+            escritor.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Servidor de consultas à rede viária (JSON por linhas).")
+    parser.add_argument('ficheiro', nargs='?', help="rede guardada com persistencia.guardar_rede")
+    parser.add_argument('--hospedeiro', default='127.0.0.1')
+    parser.add_argument('--porta', type=int, default=PORTA_PREDEFINIDA)
+    parser.add_argument('--trabalhadores', type=int, default=None)
+    args = parser.parse_args()
+
+    if args.ficheiro:
+        from persistencia import carregar_rede
+        try:
+            rede = carregar_rede(args.ficheiro)
+        except (OSError, ValueError) as e:
+            print(f"Erro ao carregar a rede: {e}")
+            return
+    else:
+        from main import criar_rede_exemplo
+        rede = criar_rede_exemplo()
+
+    servidor = ServidorRede(RedeConcorrente(rede), args.hospedeiro, args.porta, args.trabalhadores)
+    print(f"A servir {len(rede.locais)} locais em {args.hospedeiro}:{args.porta} (Ctrl+C para terminar).")
+    try:
+        asyncio.run(servidor.servir())
+    except KeyboardInterrupt:
+        print("\nServidor terminado.")
+
+
+if __name__ == "__main__":
+    main()
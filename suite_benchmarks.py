@@ -0,0 +1,260 @@
+# suite_benchmarks.py
+import argparse
+import contextlib
+import json
+import os
+import platform
+import random
+import statistics
+import sys
+import time
+from typing import Callable, Dict, List, Optional, Sequence
+
+import local as modulo_local
+from conectividade import pontes_e_articulacoes
+from gerador_rede import PALAVRAS_CHAVE, dimensoes_grelha, gerar_rede_municipal, nome_no
+from local import Local, calcular_distancia_geografica
+from rede_viaria import RedeViaria, insertion_sort_locais, merge_sort_trocos
+from serie_temporal import janela_dia
+
+# Suite de regressão: mede todas as operações públicas de RedeViaria em
+# redes municipais sintéticas (gerar_rede_municipal) de vários tamanhos e
+# guarda os tempos em JSON para comparar com execuções anteriores:
+#
+#     python suite_benchmarks.py --saida base.json
+#     python suite_benchmarks.py --comparar base.json
+#
+# Com 10^6 locais a rede ocupa cerca de 3.5 GB (e copiar o dobro).
+
+ESCALAS_PREDEFINIDAS = (1_000, 10_000, 100_000)
+# Cada operação repete-se até somar este tempo (mínimo 3, máximo REPETICOES_MAXIMAS vezes)
+TEMPO_MINIMO_S = 0.2
+REPETICOES_MAXIMAS = 200
+# O insertion sort é quadrático: mede-se sobre uma amostra deste tamanho
+AMOSTRA_QUADRATICA = 2_000
+# Razão entre tempos mínimos a partir da qual a comparação assinala uma
+# regressão, desde que a diferença absoluta ultrapasse DIFERENCA_MINIMA_MS
+# (abaixo disso domina o ruído da medição)
+LIMIAR_REGRESSAO = 1.25
+DIFERENCA_MINIMA_MS = 0.05
+
+
+def medir(funcao: Callable[[int], object], repeticoes_maximas: int = REPETICOES_MAXIMAS) -> Dict[str, float]:
+    """Chama funcao(i) para i = 0, 1, ... e resume os tempos (em ms)."""
+    tempos = []
+    inicio = time.perf_counter()
+    while len(tempos) < repeticoes_maximas and (len(tempos) < 3 or time.perf_counter() - inicio < TEMPO_MINIMO_S):
+        t = time.perf_counter()
+        funcao(len(tempos))
+        tempos.append(time.perf_counter() - t)
+    tempos.sort()
+    return {
+        'repeticoes': len(tempos),
+        'mediana_ms': statistics.median(tempos) * 1000,
+        'minimo_ms': tempos[0] * 1000,
+        'p95_ms': tempos[min(len(tempos) - 1, int(len(tempos) * 0.95))] * 1000,
+    }
+
+
+def medir_escala(num_locais: int, semente: int = 42,
+                 filtro: Optional[Sequence[str]] = None) -> List[Dict]:
+    """Mede todas as operações numa rede com cerca de num_locais locais.
+       filtro: só as operações cujo nome contém uma destas cadeias.
+    """
+    resultados = []
+
+    def registar(nome: str, funcao: Callable[[int], object], n: int,
+                 repeticoes_maximas: int = REPETICOES_MAXIMAS):
+        if repeticoes_maximas <= 0 or (filtro and not any(parte in nome for parte in filtro)):
+            return
+        with open(os.devnull, 'w') as nulo, contextlib.redirect_stdout(nulo):
+            medicao = medir(funcao, repeticoes_maximas)
+        resultados.append({'escala': num_locais, 'operacao': nome, 'n': n, **medicao})
+        print(f"{num_locais:>9} {nome:<42} {medicao['mediana_ms']:>12.3f} {medicao['repeticoes']:>6}",
+              file=sys.stderr)
+
+    # Construção: carregamento em lote de uma rede gerada
+    gerada = gerar_rede_municipal(num_locais, semente)
+    locais = [Local(l.designacao, l.freguesia, l.coords_gps, l.palavras_chave, l.url)
+              for l in gerada.locais.values()]
+    trocos = [(origem, destino, dados['distancia'], dados['media_veiculos'])
+              for origem, destino, dados in gerada.iterar_trocos()]
+    del gerada
+    rede = RedeViaria()
+    registar('adicionar_locais_em_lote', lambda i: rede.adicionar_locais_em_lote(locais), len(locais), 1)
+    if not rede.locais: # Operação excluída pelo filtro: construir na mesma
+        rede.adicionar_locais_em_lote(locais)
+    registar('adicionar_trocos_em_lote', lambda i: rede.adicionar_trocos_em_lote(trocos), len(trocos), 1)
+    if not any(rede.adj.values()):
+        rede.adicionar_trocos_em_lote(trocos)
+    rede.cache = None # Medir as consultas em si; a cache tem a sua própria entrada
+
+    aleatorio = random.Random(semente)
+    linhas, colunas = dimensoes_grelha(num_locais)
+    r = REPETICOES_MAXIMAS
+    V, E = len(rede.locais), len(trocos)
+
+    def no_aleatorio() -> str:
+        return nome_no(aleatorio.randrange(linhas), aleatorio.randrange(colunas))
+
+    nos = [no_aleatorio() for _ in range(r)]
+    pares = [(no_aleatorio(), no_aleatorio()) for _ in range(r)]
+    amostra_trocos = aleatorio.choices(trocos, k=r)
+    pontos = [rede.locais[no].coords_gps for no in nos]
+    freguesias = [rede.locais[no].freguesia for no in nos]
+    palavras = aleatorio.choices(PALAVRAS_CHAVE, k=r)
+    designacoes = [no[:no.index('_') + 1] for no in nos] # Todos os locais de uma linha da grelha
+
+    # Consultas
+    registar('consultar_local', lambda i: rede.consultar_local(nos[i]), V)
+    registar('listar_todos_locais', lambda i: rede.listar_todos_locais(), V)
+    registar('consultar_troco', lambda i: rede.consultar_troco(*amostra_trocos[i][:2]), E)
+    registar('listar_todos_trocos', lambda i: rede.listar_todos_trocos(), E)
+    registar('iterar_trocos', lambda i: sum(1 for _ in rede.iterar_trocos()), E)
+    registar('pesquisar_locais[designacao]',
+             lambda i: rede.pesquisar_locais(designacao=designacoes[i], limite=20), V)
+    registar('pesquisar_locais[freguesia]', lambda i: rede.pesquisar_locais(freguesia=freguesias[i]), V)
+    registar('pesquisar_locais[palavra_chave]',
+             lambda i: rede.pesquisar_locais(palavra_chave=palavras[i], limite=20), V)
+    registar('pesquisar_locais[ponto_gps]',
+             lambda i: rede.pesquisar_locais(ponto_gps=pontos[i], raio_km=1.0, ordenar_por='distancia'), V)
+    registar('pesquisar_locais[combinada]',
+             lambda i: rede.pesquisar_locais(freguesia=freguesias[i], palavra_chave=palavras[i],
+                                             ponto_gps=pontos[i], raio_km=2.0), V)
+    registar('pesquisar_locais_com_distancias',
+             lambda i: rede.pesquisar_locais_com_distancias(ponto_gps=pontos[i], raio_km=1.0), V)
+    registar('iterar_locais', lambda i: list(rede.iterar_locais(palavra_chave=palavras[i], limite=20)), V)
+    registar('pesquisar_locais_mais_proximos', lambda i: rede.pesquisar_locais_mais_proximos(pontos[i], 10), V)
+    registar('sugerir_designacoes', lambda i: rede.sugerir_designacoes(nos[i][:-1], 10), V)
+    # Duas letras trocadas: "L12_34" -> "L1_234"
+    erros = [no[:2] + no[3] + no[2] + no[4:] if len(no) > 4 else no for no in nos]
+    registar('pesquisar_designacao_aproximada',
+             lambda i: rede.pesquisar_designacao_aproximada(erros[i], 1, 10), V)
+    registar('consultar_trocos_mais_circulacao', lambda i: rede.consultar_trocos_mais_circulacao(), E)
+    registar('top_trocos', lambda i: rede.top_trocos(10), E)
+
+    rede.cache = RedeViaria().cache
+    rede.pesquisar_locais(freguesia=freguesias[0])
+    registar('pesquisar_locais[cache]', lambda i: rede.pesquisar_locais(freguesia=freguesias[0]), V)
+    rede.cache = None
+
+    # Rotas
+    for algoritmo in ('dijkstra', 'a_estrela', 'bidirecional'):
+        registar(f'calcular_rota[{algoritmo}]', lambda i: rede.calcular_rota(*pares[i], algoritmo), V)
+    registar('preparar_rotas', lambda i: rede.preparar_rotas(), V, 1)
+    if rede.indice_marcos is not None:
+        registar('calcular_rota[a_estrela+marcos]', lambda i: rede.calcular_rota(*pares[i], 'a_estrela'), V)
+        rede.descartar_preparacao_rotas()
+    registar('compactar', lambda i: rede.compactar(), V + E)
+    registar('copiar', lambda i: rede.copiar(), V + E, 3)
+
+    # Conectividade
+    registar('locais_ligados', lambda i: rede.locais_ligados(*pares[i]), V)
+    registar('pontes_e_articulacoes', lambda i: pontes_e_articulacoes(rede.adj), V + E, 3)
+    registar('consultar_trocos_criticos', lambda i: rede.consultar_trocos_criticos(10, 2, 1), V + E, 1)
+
+    # Séries temporais
+    inicio = 1_700_006_400
+    leituras = [(*amostra_trocos[i % r][:2], inicio + i, 100) for i in range(10_000)]
+    registar('registar_leitura', lambda i: rede.registar_leitura(*leituras[i]), E)
+    registar('registar_leituras', lambda i: rede.registar_leituras(leituras), len(leituras), 1)
+    registar('consultar_trocos_mais_circulacao[janela]',
+             lambda i: rede.consultar_trocos_mais_circulacao(janela_dia(inicio)), E)
+
+    # Algoritmos de ordenação
+    amostra_locais = aleatorio.sample(list(rede.locais.values()), min(V, AMOSTRA_QUADRATICA))
+    registar('insertion_sort_locais', lambda i: insertion_sort_locais(amostra_locais), len(amostra_locais))
+    por_veiculos = [(origem, destino, veiculos) for origem, destino, _, veiculos in trocos]
+    aleatorio.shuffle(por_veiculos)
+    registar('merge_sort_trocos', lambda i: merge_sort_trocos(por_veiculos), E, 3)
+
+    # Alterações (cada adição é desfeita pela remoção correspondente)
+    novos = [Local(f"Novo {i}", "Freguesia Nova", pontos[i], palavras[i:i + 1]) for i in range(r)]
+    adicionados = []
+    registar('adicionar_local', lambda i: adicionados.append(rede.adicionar_local(novos[i])), V)
+    registar('remover_local', lambda i: rede.remover_local(novos[i].designacao), V, len(adicionados))
+
+    # Troços novos entre locais que não são vizinhos na grelha
+    novos_trocos = []
+    for lin, col in ((aleatorio.randrange(max(linhas - 1, 1)), aleatorio.randrange(max(colunas - 2, 1)))
+                     for _ in range(r)):
+        origem, destino = nome_no(lin, col), nome_no(min(lin + 1, linhas - 1), min(col + 2, colunas - 1))
+        if origem != destino:
+            distancia = calcular_distancia_geografica(
+                rede.locais[origem].coords_gps, rede.locais[destino].coords_gps) * 1.3
+            novos_trocos.append((origem, destino, distancia, 1000))
+    if novos_trocos:
+        feitos = []
+        registar('adicionar_troco', lambda i: feitos.append(rede.adicionar_troco(*novos_trocos[i])),
+                 E, len(novos_trocos))
+        registar('remover_troco', lambda i: rede.remover_troco(*novos_trocos[i][:2]), E, len(feitos))
+    return resultados
+
+
+def executar(escalas: Sequence[int] = ESCALAS_PREDEFINIDAS, semente: int = 42,
+             filtro: Optional[Sequence[str]] = None) -> Dict:
+    """Corre a suite em todas as escalas. Retorna {'meta': ..., 'resultados': [...]}."""
+    print(f"{'locais':>9} {'operação':<42} {'mediana (ms)':>12} {'reps':>6}", file=sys.stderr)
+    resultados = []
+    for escala in escalas:
+        resultados.extend(medir_escala(escala, semente, filtro))
+    return {
+        'meta': {
+            'data': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'python': platform.python_version(),
+            'plataforma': platform.platform(),
+            'numpy': modulo_local.np.__version__ if modulo_local.np is not None else None,
+            'semente': semente,
+            'escalas': list(escalas),
+        },
+        'resultados': resultados,
+    }
+
+
+def comparar(atual: Dict, anterior: Dict, limiar: float = LIMIAR_REGRESSAO) -> int:
+    """Mostra a razão entre tempos mínimos (atual / anterior) por escala e
+       operação. O mínimo é a medida menos sensível a interferências.
+       Retorna o número de regressões (razão acima do limiar).
+    """
+    base = {(r['escala'], r['operacao']): r for r in anterior['resultados']}
+    regressoes = 0
+    print(f"{'locais':>9} {'operação':<42} {'antes (ms)':>11} {'agora (ms)':>11} {'razão':>7}")
+    for resultado in atual['resultados']:
+        antes = base.get((resultado['escala'], resultado['operacao']))
+        if antes is None:
+            continue
+        t_antes, t_agora = antes['minimo_ms'], resultado['minimo_ms']
+        razao = t_agora / t_antes if t_antes else float('inf')
+        marca = ''
+        if razao > limiar and t_agora - t_antes > DIFERENCA_MINIMA_MS:
+            marca = ' REGRESSÃO'
+            regressoes += 1
+        print(f"{resultado['escala']:>9} {resultado['operacao']:<42} {t_antes:>11.3f} "
+              f"{t_agora:>11.3f} {razao:>6.2f}x{marca}")
+    return regressoes
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Suite de benchmarks de regressão da RedeViaria.")
+    parser.add_argument('--escalas', type=int, nargs='+', default=list(ESCALAS_PREDEFINIDAS),
+                        help="número de locais de cada rede (10^3 a 10^6)")
+    parser.add_argument('--semente', type=int, default=42)
+    parser.add_argument('--operacoes', nargs='+', help="só as operações cujo nome contém estas cadeias")
+    parser.add_argument('--saida', help="ficheiro JSON onde guardar os resultados")
+    parser.add_argument('--comparar', help="resultados JSON anteriores para comparação")
+    parser.add_argument('--limiar', type=float, default=LIMIAR_REGRESSAO)
+    args = parser.parse_args()
+
+    resultados = executar(args.escalas, args.semente, args.operacoes)
+    if args.saida:
+        with open(args.saida, 'w', encoding='utf-8') as ficheiro:
+            json.dump(resultados, ficheiro, indent=2, ensure_ascii=False)
+    if args.comparar:
+        with open(args.comparar, encoding='utf-8') as ficheiro:
+            anterior = json.load(ficheiro)
+        if comparar(resultados, anterior, args.limiar):
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+# test_cache.py
+from cache import CacheResultados
+from gerador_rede import gerar_rede_grelha, nome_no
+from local import Local
+from serie_temporal import SEGUNDOS_POR_DIA, janela_dia
+
+HOJE = 1_700_000_000 // SEGUNDOS_POR_DIA * SEGUNDOS_POR_DIA
+
+
+def _nomes(locais):
+    return [local.designacao for local in locais]
+
+
+def test_pesquisa_invalidada_por_cada_alteracao():
+    rede = gerar_rede_grelha(4, 4)
+    assert rede.pesquisar_locais(palavra_chave='museu') == []
+    assert rede.pesquisar_locais(palavra_chave='museu') == []
+    assert rede.estatisticas_cache()['acertos'] == 1
+
+    rede.locais[nome_no(1, 1)].adicionar_palavra_chave('museu')
+    assert _nomes(rede.pesquisar_locais(palavra_chave='museu')) == [nome_no(1, 1)]
+    rede.adicionar_local(Local("Museu Novo", "Freguesia 0-0", (41.1, -8.7), ['museu']))
+    assert _nomes(rede.pesquisar_locais(palavra_chave='MUSEU')) == [nome_no(1, 1), "Museu Novo"]
+    rede.remover_local(nome_no(1, 1))
+    assert _nomes(rede.pesquisar_locais(palavra_chave='museu')) == ["Museu Novo"]
+    assert rede.estatisticas_cache()['invalidacoes'] >= 3
+
+
+def test_resultado_em_cache_nao_e_alterado_pelo_chamador():
+    rede = gerar_rede_grelha(3, 3)
+    rede.top_trocos(3).clear()
+    assert len(rede.top_trocos(3)) == 3
+    assert rede.estatisticas_cache()['acertos'] == 1
+
+
+def test_ranking_de_troco_e_pontes_invalidados_pela_geracao():
+    rede = gerar_rede_grelha(3, 3)
+    antes = rede.top_trocos(1)
+    pontes = rede.listar_pontes()
+    rede.adicionar_troco(nome_no(0, 0), nome_no(0, 1), rede.adj[nome_no(0, 0)][nome_no(0, 1)]['distancia'], 10**6)
+    assert rede.top_trocos(1) != antes and rede.top_trocos(1)[0][2] == 10**6
+    rede.remover_troco(nome_no(0, 0), nome_no(1, 0))
+    assert rede.listar_pontes() != pontes
+    assert (nome_no(0, 0), nome_no(0, 1)) in rede.listar_pontes()
+
+
+def test_ranking_por_janela_invalidado_por_novas_leituras():
+    rede = gerar_rede_grelha(3, 3)
+    janela = janela_dia(HOJE)
+    assert rede.top_trocos(2, janela, 'total') == []
+    geracao = rede.geracao
+    assert rede.registar_leitura(nome_no(0, 0), nome_no(0, 1), HOJE + 60, 5)
+    assert rede.geracao == geracao # As leituras não mudam a rede, só a chave
+    assert rede.top_trocos(2, janela, 'total') == [(nome_no(0, 0), nome_no(0, 1), 5.0)]
+    assert rede.registar_leituras([(nome_no(1, 1), nome_no(1, 2), HOJE + 60, 9)]) == []
+    assert [troco[2] for troco in rede.top_trocos(2, janela, 'total')] == [9.0, 5.0]
+
+
+def test_lru_validade_e_geracao():
+    agora = [0.0]
+    cache = CacheResultados(capacidade=2, ttl_s=10.0, relogio=lambda: agora[0])
+    cache.guardar('a', 1, 'A')
+    cache.guardar('b', 1, 'B')
+    assert cache.obter_ou_calcular('a', 1, lambda: 'novo') == 'A'
+    cache.guardar('c', 1, 'C') # Despeja 'b', o menos recente
+    assert cache.obter_ou_calcular('b', 1, lambda: None) is None
+    assert cache.obter_ou_calcular('a', 2, lambda: 'A2') == 'A2'
+    agora[0] = 11.0
+    assert cache.obter_ou_calcular('c', 1, lambda: 'C2') == 'C2'
+    estatisticas = cache.estatisticas()
+    assert (estatisticas['acertos'], estatisticas['despejos'], estatisticas['invalidacoes'],
+            estatisticas['expiracoes']) == (1, 1, 1, 1)
+    assert list(cache.entradas) == ['a', 'c']
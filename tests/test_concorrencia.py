@@ -0,0 +1,162 @@
+# test_concorrencia.py
+import contextlib
+import io
+import random
+
+import pytest
+
+from concorrencia import RedeConcorrente
+from gerador_rede import gerar_rede_grelha, nome_no
+from local import ErroSoLeitura, Local
+
+
+def _estado(rede):
+    """Conteúdo observável da rede e dos seus índices, em estruturas novas."""
+    return {
+        'adj': {o: {d: dict(dados) for d, dados in v.items()} for o, v in rede.adj.items()},
+        'locais': {d: (l.freguesia, l.coords_gps, l.palavras_chave) for d, l in rede.locais.items()},
+        'freguesias': {t: frozenset(c) for t, c in rede.indice_freguesias.entradas.items()},
+        'palavras': {t: frozenset(c) for t, c in rede.indice_palavras_chave.entradas.items()},
+        'trigramas': {t: frozenset(c) for t, c in rede.indice_designacoes.trigramas.entradas.items()},
+        'grelha': {c: dict(v) for c, v in rede.indice_espacial.celulas.items()},
+        'trie': rede.trie_designacoes.com_prefixo('', None),
+        'ordem': list(rede.ordem_designacoes.chaves),
+        'marcos': [dict(d) for d in rede.indice_marcos.distancias] if rede.indice_marcos else None,
+        'pai': list(rede.conectividade.pai),
+        'componentes': rede.num_componentes(),
+        'coordenadas': dict(rede.coordenadas.distancias_de((41.1, -8.7))),
+        'ranking': rede.ranking_trocos.top(None),
+        'veiculos': dict(rede.ranking_trocos.veiculos),
+        'trafego': rede.trafego.ranking((0, 2 * 10**9), 'total'),
+    }
+
+
+def _alterar(rede, aleatorio, passo):
+    locais = list(rede.locais)
+    operacao = aleatorio.randrange(6)
+    if operacao == 0:
+        lin, col = aleatorio.randrange(8), aleatorio.randrange(8)
+        rede.adicionar_local(Local(f"Novo {passo}", "Freguesia 0-0",
+                                   (41.10 + lin * 0.002 + 0.0005, -8.70 + col * 0.002), ['cafe']))
+    elif operacao == 1:
+        rede.remover_local(aleatorio.choice(locais))
+    elif operacao == 2:
+        origem = aleatorio.choice(locais)
+        if rede.adj[origem]:
+            rede.remover_troco(origem, aleatorio.choice(list(rede.adj[origem])))
+    elif operacao == 3:
+        local = rede.local_para_alterar(aleatorio.choice(locais))
+        if aleatorio.random() < 0.5:
+            local.adicionar_palavra_chave(f"p{passo % 3}")
+        else:
+            local.remover_palavra_chave(f"p{(passo + 1) % 3}")
+    elif operacao == 4:
+        desig1, desig2 = aleatorio.sample(locais, 2)
+        rede.adicionar_troco(desig1, desig2, 50.0, aleatorio.randrange(1000))
+    else:
+        leituras = [(origem, destino, 1_700_000_000 + aleatorio.randrange(48) * 3600, 10.0)
+                    for origem, destino, _ in aleatorio.sample(list(rede.iterar_trocos()), 20)]
+        rede.registar_leituras(leituras)
+
+
+@pytest.mark.parametrize('semente', range(4))
+def test_instantaneos_publicados_nao_mudam(semente):
+    aleatorio = random.Random(semente)
+    rede = gerar_rede_grelha(8, 8)
+    rede.preparar_rotas(num_marcos=3)
+    concorrente = RedeConcorrente(rede)
+    publicados = [(concorrente.instantaneo(), _estado(concorrente.instantaneo()))]
+    with contextlib.redirect_stdout(io.StringIO()):
+        for transacao in range(15):
+            with concorrente.transacao() as trabalho:
+                for passo in range(aleatorio.randint(1, 6)):
+                    _alterar(trabalho, aleatorio, transacao * 10 + passo)
+            instantaneo = concorrente.instantaneo()
+            assert _estado(instantaneo) == _estado(concorrente._trabalho)
+            publicados.append((instantaneo, _estado(instantaneo)))
+    for instantaneo, estado in publicados:
+        assert _estado(instantaneo) == estado
+
+
+def test_consultas_nao_alteram_o_instantaneo():
+    rede = gerar_rede_grelha(10, 10)
+    rede.preparar_rotas(num_marcos=3)
+    concorrente = RedeConcorrente(rede)
+    with contextlib.redirect_stdout(io.StringIO()):
+        with concorrente.transacao() as trabalho:
+            # Remoções suficientes para os marcos ficarem desatualizados
+            for col in range(9):
+                trabalho.remover_troco(nome_no(5, col), nome_no(6, col))
+            trabalho.remover_troco(nome_no(9, 9), nome_no(8, 9))
+    instantaneo = concorrente.instantaneo()
+    assert not instantaneo.indice_marcos.desatualizado()
+    estado, marcos = _estado(instantaneo), instantaneo.indice_marcos.distancias
+    pontes = instantaneo.listar_pontes()
+    assert instantaneo.listar_pontes() == pontes and (nome_no(9, 8), nome_no(9, 9)) in pontes
+    instantaneo.listar_pontos_articulacao()
+    instantaneo.listar_componentes()
+    assert instantaneo.calcular_rota(nome_no(0, 0), nome_no(9, 0)) is not None
+    assert instantaneo.conectividade._pontes is None
+    assert instantaneo.indice_marcos.distancias is marcos
+    assert _estado(instantaneo) == estado
+
+
+@pytest.mark.parametrize('alterar', [
+    lambda rede: rede.adicionar_local(Local("Novo", "Freguesia 0-0", (41.1, -8.7))),
+    lambda rede: rede.remover_local(nome_no(0, 0)),
+    lambda rede: rede.adicionar_troco(nome_no(0, 0), nome_no(2, 2), 50.0, 10),
+    lambda rede: rede.remover_troco(nome_no(0, 0), nome_no(0, 1)),
+    lambda rede: rede.adicionar_locais_em_lote([Local("Novo", "Freguesia 0-0", (41.1, -8.7))]),
+    lambda rede: rede.adicionar_trocos_em_lote([(nome_no(0, 0), nome_no(2, 2), 50.0, 10)]),
+    lambda rede: rede.registar_leitura(nome_no(0, 0), nome_no(0, 1), 1_700_000_000, 5.0),
+    lambda rede: rede.registar_leituras([(nome_no(0, 0), nome_no(0, 1), 1_700_000_000, 5.0)]),
+    lambda rede: rede.preparar_rotas(num_marcos=2),
+    lambda rede: rede.descartar_preparacao_rotas(),
+    lambda rede: rede.local_para_alterar(nome_no(1, 1)),
+    lambda rede: rede.locais[nome_no(1, 1)].adicionar_palavra_chave('museu'),
+    lambda rede: rede.locais[nome_no(1, 1)].remover_palavra_chave('cafe'),
+])
+def test_instantaneo_rejeita_alteracoes(alterar):
+    concorrente = RedeConcorrente(gerar_rede_grelha(3, 3))
+    instantaneo = concorrente.instantaneo()
+    estado = _estado(concorrente._trabalho)
+    with pytest.raises(ErroSoLeitura):
+        alterar(instantaneo)
+    assert _estado(instantaneo) == estado
+    assert _estado(concorrente._trabalho) == estado
+
+
+def test_local_publicado_na_rede_de_trabalho_tambem_e_so_de_leitura():
+    concorrente = RedeConcorrente(gerar_rede_grelha(3, 3))
+    with concorrente.transacao() as trabalho:
+        with pytest.raises(ErroSoLeitura):
+            trabalho.locais[nome_no(1, 1)].adicionar_palavra_chave('leak')
+    assert not concorrente._trabalho.pesquisar_locais(palavra_chave='leak')
+    assert not concorrente.instantaneo().pesquisar_locais(palavra_chave='leak')
+
+
+def test_palavra_chave_de_local_publicado_vai_para_a_copia_privada():
+    concorrente = RedeConcorrente(gerar_rede_grelha(3, 3))
+    instantaneo = concorrente.instantaneo()
+    with concorrente.transacao() as trabalho:
+        local = trabalho.local_para_alterar(nome_no(1, 1))
+        local.adicionar_palavra_chave('museu')
+        local.adicionar_palavra_chave('teatro')
+        assert trabalho.local_para_alterar(nome_no(1, 1)) is local
+    assert instantaneo.locais[nome_no(1, 1)].palavras_chave == frozenset()
+    assert not instantaneo.indice_palavras_chave.obter('museu')
+    novo = concorrente.instantaneo()
+    assert novo.locais[nome_no(1, 1)].palavras_chave == {'museu', 'teatro'}
+    assert novo.indice_palavras_chave.obter('teatro') == {nome_no(1, 1)}
+
+
+def test_transacao_anulada_repoe_o_ultimo_instantaneo():
+    concorrente = RedeConcorrente(gerar_rede_grelha(4, 4))
+    estado = _estado(concorrente.instantaneo())
+    with pytest.raises(RuntimeError), contextlib.redirect_stdout(io.StringIO()):
+        with concorrente.transacao() as trabalho:
+            trabalho.remover_local(nome_no(0, 0))
+            trabalho.local_para_alterar(nome_no(1, 1)).adicionar_palavra_chave('praia')
+            raise RuntimeError
+    assert _estado(concorrente.instantaneo()) == estado
+    assert _estado(concorrente._trabalho) == estado
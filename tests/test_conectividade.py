@@ -0,0 +1,58 @@
+# test_conectividade.py
+import random
+
+import pytest
+
+from gerador_rede import gerar_rede_grelha
+
+
+def _componentes(adj, sem_local=None, sem_troco=None):
+    """Componentes por BFS, opcionalmente sem um local ou sem um troço."""
+    vistos, componentes = set(), []
+    for inicio in adj:
+        if inicio in vistos or inicio == sem_local:
+            continue
+        vistos.add(inicio)
+        componente, fila = {inicio}, [inicio]
+        while fila:
+            atual = fila.pop()
+            for vizinho in adj[atual]:
+                if vizinho == sem_local or vizinho in vistos:
+                    continue
+                if sem_troco and {atual, vizinho} == set(sem_troco):
+                    continue
+                vistos.add(vizinho)
+                componente.add(vizinho)
+                fila.append(vizinho)
+        componentes.append(componente)
+    return componentes
+
+
+def _verificar(rede):
+    componentes = _componentes(rede.adj)
+    assert rede.num_componentes() == len(componentes)
+    assert sorted(map(frozenset, rede.listar_componentes()), key=sorted) == \
+           sorted(map(frozenset, componentes), key=sorted)
+    assert [len(c) for c in rede.listar_componentes()] == sorted(map(len, componentes), reverse=True)
+
+    pontes = {tuple(sorted((origem, destino))) for origem, destino, _ in rede.iterar_trocos()
+              if len(_componentes(rede.adj, sem_troco=(origem, destino))) > len(componentes)}
+    assert {tuple(sorted(ponte)) for ponte in rede.listar_pontes()} == pontes
+    articulacoes = {local for local in rede.adj
+                    if len(_componentes(rede.adj, sem_local=local)) > len(componentes)}
+    assert set(rede.listar_pontos_articulacao()) == articulacoes
+
+
+@pytest.mark.parametrize('semente', range(3))
+def test_analise_depois_de_remocoes_igual_a_bfs(semente):
+    aleatorio = random.Random(semente)
+    rede = gerar_rede_grelha(6, 6, semente=semente, prob_diagonal=0.3)
+    _verificar(rede)
+    for _ in range(25):
+        if aleatorio.random() < 0.8:
+            trocos = [(origem, destino) for origem, destino, _ in rede.iterar_trocos()]
+            if trocos:
+                rede.remover_troco(*aleatorio.choice(trocos))
+        else:
+            rede.remover_local(aleatorio.choice(list(rede.locais)))
+        _verificar(rede)
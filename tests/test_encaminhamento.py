@@ -0,0 +1,37 @@
+# test_encaminhamento.py
+import random
+
+import pytest
+
+from encaminhamento import FUNCOES_CUSTO
+from gerador_rede import gerar_rede_grelha, nome_no
+
+ALGORITMOS = ('dijkstra', 'a_estrela', 'bidirecional')
+
+
+def _custo_do_caminho(rede, caminho, custo):
+    funcao = FUNCOES_CUSTO[custo]
+    return sum(funcao(a, b, rede.adj[a][b]) for a, b in zip(caminho, caminho[1:]))
+
+
+@pytest.mark.parametrize('custo', ['distancia', 'trafego'])
+def test_algoritmos_dao_o_mesmo_custo(custo):
+    rede = gerar_rede_grelha(9, 9, desvio=0.3, prob_diagonal=0.4)
+    aleatorio = random.Random(5)
+    for _ in range(40):
+        origem, destino = aleatorio.sample(list(rede.locais), 2)
+        resultados = [rede.calcular_rota(origem, destino, algoritmo, custo) for algoritmo in ALGORITMOS]
+        referencia = resultados[0].custo
+        for resultado in resultados:
+            assert resultado.caminho[0] == origem and resultado.caminho[-1] == destino
+            assert resultado.custo == pytest.approx(referencia)
+            assert _custo_do_caminho(rede, resultado.caminho, custo) == pytest.approx(referencia)
+
+
+def test_sem_caminho_em_todos_os_algoritmos():
+    rede = gerar_rede_grelha(3, 3)
+    for linha in range(3):
+        rede.remover_troco(nome_no(linha, 1), nome_no(linha, 2))
+    for algoritmo in ALGORITMOS:
+        assert rede.calcular_rota(nome_no(0, 0), nome_no(2, 2), algoritmo) is None
+        assert rede.calcular_rota(nome_no(0, 0), nome_no(0, 0), algoritmo).custo == 0
@@ -0,0 +1,69 @@
+# test_indice_espacial.py
+import random
+
+import pytest
+
+from indice_espacial import GrelhaEspacial
+from local import calcular_distancia_geografica
+
+
+def _grelha_global(quantidade=2000, semente=7):
+    aleatorio = random.Random(semente)
+    grelha = GrelhaEspacial(tamanho_celula=1.0)
+    pontos = {}
+    for i in range(quantidade):
+        coords = (aleatorio.uniform(-90, 90), aleatorio.uniform(-180, 180))
+        pontos[f"P{i}"] = coords
+        grelha.inserir(f"P{i}", coords)
+    # Pontos exatamente nos limites
+    for nome, coords in (("Norte", (90.0, 0.0)), ("Sul", (-90.0, 45.0)),
+                         ("Este", (0.0, 180.0)), ("Oeste", (0.0, -180.0))):
+        pontos[nome] = coords
+        grelha.inserir(nome, coords)
+    return grelha, pontos
+
+
+def _por_forca_bruta(pontos, ponto, raio_km):
+    return {nome for nome, coords in pontos.items()
+            if calcular_distancia_geografica(ponto, coords) <= raio_km}
+
+
+@pytest.mark.parametrize("ponto, raio_km", [
+    ((10.0, 179.99), 5.0),
+    ((10.0, 179.99), 800.0),
+    ((-10.0, -179.99), 800.0),
+    ((0.0, 180.0), 300.0),
+    ((0.0, -180.0), 300.0),
+    ((89.9, 30.0), 500.0),
+    ((-89.9, -120.0), 500.0),
+    ((90.0, 0.0), 100.0),
+    ((-90.0, 0.0), 100.0),
+    ((38.7, -9.1), 20000.0),
+    ((38.7, -9.1), 1500.0),
+])
+def test_pesquisar_raio_igual_a_forca_bruta(ponto, raio_km):
+    grelha, pontos = _grelha_global()
+    encontrados = grelha.pesquisar_raio(ponto, raio_km)
+    assert {nome for nome, _ in encontrados} == _por_forca_bruta(pontos, ponto, raio_km)
+    assert {nome for nome, _ in grelha.iterar_raio(ponto, raio_km)} == {nome for nome, _ in encontrados}
+
+
+def test_raio_global_devolve_todos():
+    grelha, pontos = _grelha_global()
+    assert len(grelha.pesquisar_raio((38.7, -9.1), 20040.0)) == len(pontos)
+
+
+def test_mais_proximos_ate_aos_antipodas():
+    # Lisboa -> Sydney: o raio duplica até ultrapassar os pólos
+    grelha = GrelhaEspacial()
+    grelha.inserir("Lisboa", (38.72, -9.14))
+    grelha.inserir("Sydney", (-33.87, 151.21))
+    proximos = grelha.mais_proximos((38.72, -9.14), 2)
+    assert [nome for nome, _ in proximos] == ["Lisboa", "Sydney"]
+
+
+def test_pesquisar_locais_com_raio_global():
+    from gerador_rede import gerar_rede_grelha
+    rede = gerar_rede_grelha(5, 5)
+    assert len(rede.pesquisar_locais(ponto_gps=(38.7, -9.1), raio_km=20000)) == 25
+    assert len(list(rede.iterar_locais(ponto_gps=(38.7, -9.1), raio_km=20000))) == 25
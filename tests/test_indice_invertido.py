@@ -0,0 +1,70 @@
+# test_indice_invertido.py
+import random
+
+import pytest
+
+from indice_invertido import IndiceTrigramas
+from local import Local
+from rede_viaria import RedeViaria
+
+FREGUESIAS = ('Cedofeita', 'Bonfim', 'Ramalde')
+PALAVRAS = ('cafe', 'museu', 'jardim', 'praia')
+NOMES = ('Praça', 'Jardim', 'Rua Nova', 'Largo', 'Avenida')
+
+
+def _pesquisa_direta(rede, designacao=None, freguesia=None, palavra_chave=None):
+    return {desig for desig, local in rede.locais.items()
+            if (designacao is None or designacao.lower() in desig.lower())
+            and (freguesia is None or local.freguesia.lower() == freguesia.lower())
+            and (palavra_chave is None or palavra_chave.lower() in local.palavras_chave)}
+
+
+def _verificar(rede, aleatorio):
+    for _ in range(10):
+        criterios = {
+            'designacao': aleatorio.choice([None, 'ra', 'praça', 'NOVA 1', 'go ', 'avenida 2']),
+            'freguesia': aleatorio.choice((None,) + FREGUESIAS + ('RAMALDE',)),
+            'palavra_chave': aleatorio.choice((None, 'Museu') + PALAVRAS),
+        }
+        if not any(criterios.values()):
+            continue
+        encontrados = {local.designacao for local in rede.pesquisar_locais(**criterios)}
+        assert encontrados == _pesquisa_direta(rede, **criterios)
+
+
+@pytest.mark.parametrize('semente', range(3))
+def test_indices_acompanham_adicoes_remocoes_e_palavras_chave(semente):
+    aleatorio = random.Random(semente)
+    rede = RedeViaria()
+    for passo in range(300):
+        locais = list(rede.locais)
+        operacao = aleatorio.random()
+        if operacao < 0.5 or len(locais) < 5:
+            rede.adicionar_local(Local(f"{aleatorio.choice(NOMES)} {passo}", aleatorio.choice(FREGUESIAS),
+                                       (41.15 + aleatorio.random() / 100, -8.61),
+                                       aleatorio.sample(PALAVRAS, aleatorio.randint(0, 2))))
+        elif operacao < 0.7:
+            rede.remover_local(aleatorio.choice(locais))
+        elif operacao < 0.85:
+            rede.locais[aleatorio.choice(locais)].adicionar_palavra_chave(aleatorio.choice(PALAVRAS).upper())
+        else:
+            rede.locais[aleatorio.choice(locais)].remover_palavra_chave(aleatorio.choice(PALAVRAS))
+        if passo % 20 == 0:
+            _verificar(rede, aleatorio)
+    _verificar(rede, aleatorio)
+    # Nenhuma entrada vazia nem designações removidas nos índices
+    for indice in (rede.indice_freguesias, rede.indice_palavras_chave, rede.indice_designacoes.trigramas):
+        assert all(indice.entradas.values())
+        assert set().union(*indice.entradas.values()) <= set(rede.locais)
+
+
+def test_trigramas_confirmam_a_subcadeia():
+    indice = IndiceTrigramas()
+    for designacao in ('Abcde', 'Xbcdy', 'Cdab'):
+        indice.adicionar(designacao)
+    assert indice.pesquisar('bcd') == {'Abcde', 'Xbcdy'}
+    assert indice.pesquisar('abcd') == {'Abcde'}
+    assert indice.pesquisar('da') == {'Cdab'}
+    indice.remover('Abcde')
+    assert indice.pesquisar('bcd') == {'Xbcdy'}
+    assert not indice.trigramas.obter('abc')
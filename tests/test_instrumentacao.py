@@ -0,0 +1,52 @@
+# test_instrumentacao.py
+import coordenadas
+import rede_viaria
+from gerador_rede import gerar_rede_grelha, nome_no
+from instrumentacao import Instrumentacao, _atual, _contar_haversine, ativar, desativar, instrumentada
+from local import distancias_geograficas_pares
+
+
+def test_haversine_em_lote_contado_pelo_resultado():
+    contada = _contar_haversine(distancias_geograficas_pares, True)
+    instrumentacao = Instrumentacao()
+    _atual.instrumentacao = instrumentacao
+    try:
+        # Só argumentos nomeados: não há um último argumento posicional para medir
+        contada(coords1=[(41.1, -8.7)] * 3, coords2=[(41.2, -8.6)] * 3)
+    finally:
+        _atual.instrumentacao = None
+    assert instrumentacao.haversine == 3
+
+
+def test_haversine_contado_nas_consultas_da_rede():
+    rede = gerar_rede_grelha(10, 10)
+    with instrumentada(rede) as instrumentacao:
+        rede.coordenadas.distancias_de((41.1, -8.7)) # Fora de um método da rede: não conta
+        assert instrumentacao.haversine == 0
+        assert rede.pesquisar_locais(ponto_gps=(41.1, -8.7), raio_km=100.0, designacao='L0_')
+        depois_da_pesquisa = instrumentacao.haversine
+        assert depois_da_pesquisa >= 10
+        rede.calcular_rota(nome_no(0, 0), nome_no(0, 3), 'a_estrela')
+        assert instrumentacao.haversine > depois_da_pesquisa
+
+
+def test_ordenacoes_medidas_e_so_para_a_rede_instrumentada():
+    rede, outra = gerar_rede_grelha(4, 4), gerar_rede_grelha(4, 4)
+    instrumentacao = ativar(rede)
+    outra.listar_componentes()
+    outra.top_trocos(3)
+    outra.coordenadas.distancias_de((41.1, -8.7))
+    assert instrumentacao.estatisticas()['ordenacoes'] == {} and instrumentacao.haversine == 0
+
+    rede.listar_componentes()
+    rede.top_trocos(3)
+    ordenacoes = instrumentacao.estatisticas()['ordenacoes']
+    assert ordenacoes['ordenar_designacoes']['chamadas'] == 1
+    assert ordenacoes['RankingTrocos.top']['chamadas'] == 1
+    assert instrumentacao.estatisticas()['operacoes']['top_trocos']['chamadas'] == 1
+
+    assert desativar(rede) is instrumentacao
+    assert 'top' not in rede.ranking_trocos.__dict__ and 'listar_componentes' not in rede.__dict__
+    assert rede_viaria.ordenar_designacoes.__module__ == 'ordenacao'
+    assert coordenadas.distancias_geograficas_de_ponto.__module__ == 'local'
+    assert not hasattr(rede_viaria.ordenar_designacoes, '__wrapped__')
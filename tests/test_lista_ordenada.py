@@ -0,0 +1,40 @@
+# test_lista_ordenada.py
+import random
+
+import lista_ordenada
+from lista_ordenada import ListaOrdenada
+
+
+def test_igual_a_lista_ordenada(monkeypatch):
+    monkeypatch.setattr(lista_ordenada, 'TAMANHO_BLOCO', 8)
+    rng = random.Random(3)
+    lista = ListaOrdenada(rng.randrange(50) for _ in range(30))
+    referencia = sorted(lista)
+    for _ in range(3000):
+        valor = rng.randrange(50)
+        if rng.random() < 0.55:
+            lista.adicionar(valor)
+            referencia.append(valor)
+            referencia.sort()
+        else:
+            assert lista.remover(valor) == (valor in referencia)
+            if valor in referencia:
+                referencia.remove(valor)
+        assert len(lista) == len(referencia)
+    assert list(lista) == referencia
+    assert lista.primeiros(5) == referencia[:5]
+    assert all(len(bloco) <= 8 for bloco in lista.blocos)
+
+
+def test_partilhar_nao_altera_a_copia(monkeypatch):
+    monkeypatch.setattr(lista_ordenada, 'TAMANHO_BLOCO', 4)
+    lista = ListaOrdenada(range(0, 40, 2))
+    instantaneos = []
+    for valor in range(1, 40, 4):
+        copia = lista.partilhar()
+        instantaneos.append((copia, list(copia)))
+        lista.adicionar(valor)
+        lista.remover(valor - 1)
+    for copia, esperado in instantaneos:
+        assert list(copia) == esperado
+    assert list(lista) == sorted(set(range(0, 40, 2)) - set(range(0, 40, 4)) | set(range(1, 40, 4)))
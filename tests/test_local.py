@@ -0,0 +1,78 @@
+# test_local.py
+import random
+from array import array
+
+import pytest
+
+import local as modulo_local
+from local import (LIMIAR_NUMPY, Local, calcular_distancia_geografica,
+                   distancias_geograficas_de_ponto, distancias_geograficas_pares)
+
+
+def test_igualdade_e_hash_pela_designacao_normalizada():
+    praca = Local("Praça da Ribeira", "São Nicolau", (41.14, -8.61), ['cafe'])
+    mesma = Local("PRAÇA DA RIBEIRA", "Outra", (0.0, 0.0))
+    outra = Local("Praça de Lisboa", "Vitória", (41.14, -8.61), ['cafe'])
+    assert praca == mesma and hash(praca) == hash(mesma)
+    assert praca != outra
+    assert len({praca, mesma, outra}) == 2
+    assert {praca: 1}[mesma] == 1
+    assert (praca == "Praça da Ribeira") is False
+
+
+def test_designacao_alterada_atualiza_a_chave_normalizada():
+    local = Local("Jardim", "Bonfim", (41.15, -8.60))
+    local.designacao = "Jardim do MORRO"
+    assert local.designacao_normalizada == "jardim do morro"
+    assert local == Local("jardim do morro", "Bonfim", (41.15, -8.60))
+    assert hash(local) == hash("jardim do morro")
+
+
+def test_ordem_ignora_maiusculas():
+    nomes = ["beta", "Alfa", "gama", "ALFAMA"]
+    ordenados = sorted(Local(nome, "Bonfim", (41.15, -8.60)) for nome in nomes)
+    assert [local.designacao for local in ordenados] == ["Alfa", "ALFAMA", "beta", "gama"]
+
+
+def test_copia_mantem_chave_e_partilha_palavras_chave():
+    original = Local("Museu", "Cedofeita", (41.15, -8.61), ['Arte', 'cafe'])
+    copia = original.copiar()
+    assert copia == original and hash(copia) == hash(original)
+    assert copia.palavras_chave is original.palavras_chave == {'arte', 'cafe'}
+    igual = Local("Outro", "Cedofeita", (41.15, -8.61), ['cafe', 'ARTE'])
+    assert igual.palavras_chave is original.palavras_chave
+    assert not hasattr(original, '__dict__')
+
+
+@pytest.mark.parametrize('argumentos', [
+    ("", "Bonfim", (41.1, -8.6)),
+    ("Praça", "", (41.1, -8.6)),
+    ("Praça", "Bonfim", [41.1, -8.6]),
+])
+def test_local_invalido(argumentos):
+    with pytest.raises(ValueError):
+        Local(*argumentos)
+
+
+@pytest.mark.parametrize('numpy', [True, False])
+@pytest.mark.parametrize('quantidade', [0, 1, LIMIAR_NUMPY - 1, LIMIAR_NUMPY, 500])
+def test_haversine_em_lote_igual_ao_escalar(monkeypatch, numpy, quantidade):
+    if not numpy:
+        monkeypatch.setattr(modulo_local, 'np', None)
+    aleatorio = random.Random(quantidade)
+    # Inclui pontos iguais, antípodas e longitudes dos dois lados de 180º
+    pontos = [(aleatorio.uniform(-90, 90), aleatorio.uniform(-180, 180)) for _ in range(quantidade)]
+    outros = [(aleatorio.uniform(-90, 90), aleatorio.uniform(-180, 180)) for _ in range(quantidade)]
+    if quantidade > 3:
+        outros[0], outros[1], outros[2] = pontos[0], (-pontos[1][0], pontos[1][1] - 180), (10.0, 179.9)
+        pontos[2] = (10.0, -179.9)
+    esperado = [calcular_distancia_geografica(a, b) for a, b in zip(pontos, outros)]
+    assert distancias_geograficas_pares(pontos, outros) == pytest.approx(esperado, abs=1e-9)
+
+    ponto = (41.15, -8.61)
+    latitudes = [lat for lat, _ in pontos]
+    longitudes = [lon for _, lon in pontos]
+    esperado = [calcular_distancia_geografica(ponto, p) for p in pontos]
+    assert distancias_geograficas_de_ponto(ponto, latitudes, longitudes) == pytest.approx(esperado, abs=1e-9)
+    assert distancias_geograficas_de_ponto(ponto, array('d', latitudes), array('d', longitudes)) == \
+           pytest.approx(esperado, abs=1e-9)
@@ -0,0 +1,41 @@
+# test_marcos.py
+import random
+
+import pytest
+
+from gerador_rede import gerar_rede_grelha
+from local import calcular_distancia_geografica
+
+
+def _alterar(rede, aleatorio):
+    locais = list(rede.locais)
+    operacao = aleatorio.randrange(3)
+    if operacao == 0:
+        desig1, desig2 = aleatorio.sample(locais, 2)
+        distancia = calcular_distancia_geografica(rede.locais[desig1].coords_gps,
+                                                  rede.locais[desig2].coords_gps) * aleatorio.uniform(1.0, 1.5)
+        rede.adicionar_troco(desig1, desig2, distancia, aleatorio.randrange(30000))
+    elif operacao == 1:
+        trocos = [(origem, destino) for origem, destino, _ in rede.iterar_trocos()]
+        rede.remover_troco(*aleatorio.choice(trocos))
+    else:
+        rede.remover_local(aleatorio.choice(locais))
+
+
+@pytest.mark.parametrize('custo', ['distancia', 'trafego'])
+def test_alt_com_alteracoes_igual_a_dijkstra(custo):
+    rede = gerar_rede_grelha(10, 10, desvio=0.3, prob_diagonal=0.3)
+    assert rede.preparar_rotas(num_marcos=4, custo=custo)
+    aleatorio = random.Random(7)
+    for _ in range(30):
+        for _ in range(aleatorio.randint(1, 4)):
+            _alterar(rede, aleatorio)
+        for _ in range(5):
+            origem, destino = aleatorio.sample(list(rede.locais), 2)
+            alt = rede.calcular_rota(origem, destino, 'a_estrela', custo)
+            referencia = rede.calcular_rota(origem, destino, 'dijkstra', custo)
+            if referencia is None:
+                assert alt is None
+            else:
+                assert alt.custo == pytest.approx(referencia.custo)
+    assert rede.indice_marcos is not None
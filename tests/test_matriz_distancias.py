@@ -0,0 +1,44 @@
+# test_matriz_distancias.py
+import math
+import random
+
+import pytest
+
+import matriz_distancias
+from gerador_rede import gerar_rede_grelha, nome_no
+from matriz_distancias import calcular_matriz_distancias
+
+
+@pytest.fixture(scope='module')
+def rede():
+    rede = gerar_rede_grelha(7, 7, desvio=0.3, prob_diagonal=0.3)
+    # Isola o canto (6, 6): sem caminho para os outros locais
+    for vizinho in list(rede.adj[nome_no(6, 6)]):
+        rede.remover_troco(nome_no(6, 6), vizinho)
+    return rede
+
+
+def _esperado(rede, origem, destino):
+    rota = rede.calcular_rota(origem, destino, 'dijkstra')
+    return math.inf if rota is None else rota.custo
+
+
+@pytest.mark.parametrize('processos', [1, 2])
+@pytest.mark.parametrize('numpy', [True, False])
+def test_matriz_igual_a_dijkstra(rede, monkeypatch, processos, numpy):
+    if not numpy:
+        monkeypatch.setattr(matriz_distancias, 'np', None)
+    aleatorio = random.Random(processos)
+    origens = aleatorio.sample(list(rede.locais), 6) + [nome_no(6, 6), nome_no(0, 0)]
+    destinos = aleatorio.sample(list(rede.locais), 5) + [nome_no(6, 6), nome_no(0, 0)]
+    matriz = calcular_matriz_distancias(rede, origens, destinos, processos=processos)
+    assert len(matriz) == len(origens)
+    for i, origem in enumerate(origens):
+        assert len(matriz[i]) == len(destinos)
+        for j, destino in enumerate(destinos):
+            assert matriz[i][j] == pytest.approx(_esperado(rede, origem, destino))
+
+
+def test_local_inexistente(rede):
+    with pytest.raises(ValueError):
+        calcular_matriz_distancias(rede, [nome_no(0, 0)], ['Inexistente'], processos=1)
@@ -0,0 +1,90 @@
+# test_persistencia.py
+import struct
+
+import pytest
+
+from gerador_rede import gerar_rede_grelha
+from persistencia import (SECCOES, ErroFormato, _CABECALHO, _ENTRADA, carregar_grafo_compacto,
+                          carregar_rede, guardar_rede, importar_trocos_csv)
+
+
+@pytest.fixture
+def ficheiro(tmp_path):
+    caminho = tmp_path / 'rede.bin'
+    rede = gerar_rede_grelha(4, 5, palavras_chave=True)
+    guardar_rede(rede, str(caminho))
+    return caminho, rede
+
+
+def test_guardar_e_carregar(ficheiro):
+    caminho, rede = ficheiro
+    carregada = carregar_rede(str(caminho))
+    assert sorted(carregada.iterar_trocos()) == sorted(rede.iterar_trocos())
+    assert {d: l.palavras_chave for d, l in carregada.locais.items()} == \
+           {d: l.palavras_chave for d, l in rede.locais.items()}
+    assert carregada.num_componentes() == 1
+
+
+@pytest.mark.parametrize('tamanho', [0, 4, _CABECALHO.size, _CABECALHO.size + _ENTRADA.size * 3, 200])
+def test_ficheiro_truncado(ficheiro, tamanho):
+    caminho, _ = ficheiro
+    caminho.write_bytes(caminho.read_bytes()[:tamanho])
+    with pytest.raises(ErroFormato):
+        carregar_rede(str(caminho))
+
+
+def _alterar_seccao(caminho, nome, alterar):
+    dados = bytearray(caminho.read_bytes())
+    i = [n for n, _ in SECCOES].index(nome)
+    deslocamento, comprimento = _ENTRADA.unpack_from(dados, _CABECALHO.size + i * _ENTRADA.size)
+    alterar(dados, deslocamento, comprimento)
+    caminho.write_bytes(bytes(dados))
+
+
+def test_seccao_fora_do_ficheiro(ficheiro):
+    caminho, _ = ficheiro
+    _alterar_seccao(caminho, 'destinos', lambda dados, d, c: _ENTRADA.pack_into(
+        dados, _CABECALHO.size + 3 * _ENTRADA.size, d, 10 ** 9))
+    with pytest.raises(ErroFormato):
+        carregar_rede(str(caminho))
+
+
+def test_indice_de_destino_invalido(ficheiro):
+    caminho, _ = ficheiro
+    _alterar_seccao(caminho, 'destinos', lambda dados, d, c: struct.pack_into('<q', dados, d, 999))
+    with pytest.raises(ErroFormato):
+        carregar_rede(str(caminho))
+
+
+def test_troco_invalido_nao_e_ignorado(ficheiro):
+    caminho, _ = ficheiro
+    _alterar_seccao(caminho, 'veiculos', lambda dados, d, c: struct.pack_into('<q', dados, d, -5))
+    with pytest.raises(ErroFormato, match='troço'):
+        carregar_rede(str(caminho))
+
+
+def test_indices_so_validados_a_pedido_no_grafo_compacto(ficheiro):
+    caminho, rede = ficheiro
+    _alterar_seccao(caminho, 'destinos', lambda dados, d, c: struct.pack_into('<q', dados, d, 999))
+    with pytest.raises(ErroFormato, match='destino'):
+        carregar_grafo_compacto(str(caminho), validar=True)
+    grafo = carregar_grafo_compacto(str(caminho))
+    assert len(grafo.nomes) == len(rede.locais)
+
+
+@pytest.mark.parametrize('destino, mensagem', [(0, 'ele mesmo'), (19, 'só num sentido')])
+def test_arco_sem_inverso_ou_para_si_mesmo(ficheiro, destino, mensagem):
+    # O primeiro arco sai do local 0 (um vizinho); 19 é o canto oposto da grelha
+    caminho, _ = ficheiro
+    _alterar_seccao(caminho, 'destinos', lambda dados, d, c: struct.pack_into('<q', dados, d, destino))
+    with pytest.raises(ErroFormato, match=mensagem):
+        carregar_rede(str(caminho))
+
+
+def test_media_de_veiculos_importada_tem_de_ser_inteira(tmp_path):
+    caminho = tmp_path / 'trocos.csv'
+    caminho.write_text("local1,local2,distancia,media_veiculos\nA,B,10,120.0\nA,C,10,7\n", encoding='utf-8')
+    assert [troco[3] for troco in importar_trocos_csv(str(caminho))] == [120, 7]
+    caminho.write_text("local1,local2,distancia,media_veiculos\nA,B,10,120.7\n", encoding='utf-8')
+    with pytest.raises(ValueError, match='inteiro'):
+        list(importar_trocos_csv(str(caminho)))
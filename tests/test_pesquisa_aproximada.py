@@ -0,0 +1,28 @@
+# test_pesquisa_aproximada.py
+import random
+
+from pesquisa_aproximada import TrieDesignacoes, distancia_edicao
+
+
+def test_aproximadas_igual_a_forca_bruta():
+    rng = random.Random(7)
+    nomes = sorted({''.join(rng.choice('abcá ') for _ in range(rng.randint(1, 7))) for _ in range(400)})
+    trie = TrieDesignacoes()
+    for nome in nomes:
+        trie.adicionar(nome)
+    for _ in range(100):
+        consulta = ''.join(rng.choice('abcd') for _ in range(rng.randint(0, 7)))
+        for k in (0, 1, 2):
+            esperado = sorted((distancia_edicao(consulta, nome), nome) for nome in nomes
+                              if distancia_edicao(consulta, nome) <= k)
+            obtido = trie.aproximadas(consulta, k, None)
+            assert sorted((d, nome) for nome, d in obtido) == esperado
+
+
+def test_distancia_predefinida_e_um():
+    trie = TrieDesignacoes()
+    for nome in ('Estádio do Dragão', 'Estádio do Bessa'):
+        trie.adicionar(nome)
+    assert trie.aproximadas('estaido do dragao') == [('Estádio do Dragão', 1)]
+    assert trie.aproximadas('estaido do dragoa') == []
+    assert trie.aproximadas('estaido do dragoa', 2) == [('Estádio do Dragão', 2)]
@@ -0,0 +1,47 @@
+# test_ranking_trocos.py
+import random
+
+import pytest
+
+from gerador_rede import gerar_rede_grelha
+from ranking_trocos import RankingTrocos, par_canonico
+
+
+def _ranking_direto(rede):
+    trocos = {par_canonico(origem, destino): dados['media_veiculos']
+              for origem, vizinhos in rede.adj.items() for destino, dados in vizinhos.items()}
+    ordenados = sorted(trocos.items(), key=lambda item: (-item[1], item[0]))
+    return [(desig1, desig2, veiculos) for (desig1, desig2), veiculos in ordenados]
+
+
+@pytest.mark.parametrize('semente', range(3))
+def test_top_trocos_depois_de_atualizar_e_remover(semente):
+    aleatorio = random.Random(semente)
+    rede = gerar_rede_grelha(8, 8, semente=semente)
+    for _ in range(120):
+        trocos = [(origem, destino, dados) for origem, destino, dados in rede.iterar_trocos()]
+        operacao = aleatorio.random()
+        if operacao < 0.5:
+            # Atualização de um troço existente, muitas vezes para um valor empatado
+            origem, destino, dados = aleatorio.choice(trocos)
+            rede.adicionar_troco(destino, origem, dados['distancia'], aleatorio.choice([0, 500, 1000, 7777]))
+        elif operacao < 0.9:
+            origem, destino, _ = aleatorio.choice(trocos)
+            rede.remover_troco(origem, destino)
+        else:
+            rede.remover_local(aleatorio.choice(list(rede.locais)))
+        esperado = _ranking_direto(rede)
+        k = aleatorio.choice([0, 1, 5, len(esperado), len(esperado) + 3])
+        assert rede.top_trocos(k) == esperado[:k]
+        assert rede.consultar_trocos_mais_circulacao() == esperado
+
+
+def test_remover_troco_inexistente_nao_altera_o_ranking():
+    ranking = RankingTrocos()
+    ranking.atualizar('B', 'A', 10)
+    ranking.atualizar('A', 'C', 10)
+    ranking.atualizar('A', 'B', 30)
+    assert not ranking.remover('B', 'C')
+    assert ranking.top() == [('A', 'B', 30), ('A', 'C', 10)]
+    assert ranking.remover('C', 'A')
+    assert ranking.top(5) == [('A', 'B', 30)] and len(ranking) == 1
@@ -0,0 +1,96 @@
+# test_rede_viaria.py
+import random
+
+import pytest
+
+from gerador_rede import gerar_rede_grelha, nome_no
+from local import Local
+from persistencia import importar_locais_csv
+from rede_viaria import RedeViaria
+
+
+def _local(designacao: str, lat: float = 41.15, lon: float = -8.61) -> Local:
+    return Local(designacao, "Cedofeita", (lat, lon), ['cafe'])
+
+
+def test_lote_de_locais_interrompido_nao_altera_a_rede(tmp_path):
+    caminho = tmp_path / 'locais.csv'
+    caminho.write_text("designacao,freguesia,latitude,longitude,palavras_chave,url\n"
+                       "Praca,Cedofeita,41.15,-8.61,cafe,\n"
+                       "Jardim,Cedofeita,nao-e-numero,-8.62,,\n", encoding='utf-8')
+    rede = RedeViaria()
+    with pytest.raises(ValueError):
+        rede.adicionar_locais_em_lote(importar_locais_csv(str(caminho)))
+    assert rede.locais == {} and rede.adj == {}
+    assert rede.num_componentes() == 0
+    assert rede.geracao == 0
+
+
+def test_lote_de_locais_indexa_cada_local_aceite():
+    rede = RedeViaria()
+    erros = rede.adicionar_locais_em_lote([_local('Praca'), 'Jardim', _local('Praca'), _local('Ribeira')])
+    assert [posicao for posicao, _ in erros] == [1, 2]
+    assert set(rede.locais) == {'Praca', 'Ribeira'}
+    assert rede.num_componentes() == 2
+    assert sorted(l.designacao for l in rede.pesquisar_locais(palavra_chave='cafe')) == ['Praca', 'Ribeira']
+
+
+def test_media_de_veiculos_tem_de_ser_inteira():
+    rede = RedeViaria()
+    rede.adicionar_locais_em_lote([_local('Praca'), _local('Ribeira', 41.14, -8.61), _local('Foz', 41.15, -8.67)])
+    assert not rede.adicionar_troco('Praca', 'Ribeira', 2.0, 120.5)
+    assert rede.adicionar_troco('Praca', 'Ribeira', 2.0, 120.0)
+    assert type(rede.adj['Praca']['Ribeira']['media_veiculos']) is int
+    erros = rede.adicionar_trocos_em_lote([('Praca', 'Foz', 6.0, 9.5), ('Ribeira', 'Foz', 6.0, 40.0)])
+    assert [posicao for posicao, _ in erros] == [0]
+    grafo = rede.compactar()
+    assert sorted(grafo.veiculos) == [40, 40, 120, 120]
+
+
+def test_rota_e_troco_aceitam_designacoes_sem_acentos():
+    rede = RedeViaria()
+    rede.adicionar_locais_em_lote([_local('Câmara Municipal'), _local('Estádio', 41.16, -8.58)])
+    assert rede.adicionar_troco('camara municipal', 'ESTADIO', 3.0, 50)
+    assert rede.consultar_troco('Camara Municipal', 'estadio')['media_veiculos'] == 50
+    rota = rede.calcular_rota('camara  municipal', 'estadio')
+    assert rota is not None and rota.caminho == ['Câmara Municipal', 'Estádio']
+
+
+def test_iterar_trocos_gera_cada_troco_uma_vez():
+    rede = gerar_rede_grelha(6, 6, prob_diagonal=0.5)
+    aleatorio = random.Random(1)
+    for _ in range(20):
+        trocos = list(rede.iterar_trocos())
+        pares = [frozenset((origem, destino)) for origem, destino, _ in trocos]
+        assert len(set(pares)) == len(pares) == sum(map(len, rede.adj.values())) // 2
+        assert all(dados is rede.adj[origem][destino] for origem, destino, dados in trocos)
+        assert rede.listar_todos_trocos() == trocos
+        origem, destino, _ = aleatorio.choice(trocos)
+        rede.remover_troco(origem, destino)
+        if aleatorio.random() < 0.3:
+            rede.remover_local(aleatorio.choice(list(rede.locais)))
+
+
+@pytest.mark.parametrize('criterios', [
+    {},
+    {'designacao': 'L3'},
+    {'designacao': '_1'},
+    {'freguesia': 'freguesia 1-2'},
+    {'palavra_chave': 'Cafe'},
+    {'palavra_chave': 'restaurante', 'designacao': 'L'},
+    {'ponto_gps': (41.105, -8.695), 'raio_km': 0.6},
+    {'ponto_gps': (41.105, -8.695), 'raio_km': 0.8, 'palavra_chave': 'cafe'},
+    {'ponto_gps': (41.11, -8.69), 'raio_km': 1.0, 'freguesia': 'Freguesia 2-2', 'designacao': '_'},
+    {'palavra_chave': 'inexistente'},
+])
+def test_iterar_locais_igual_a_pesquisar_locais(criterios):
+    rede = gerar_rede_grelha(8, 8, palavras_chave=True)
+    rede.remover_local(nome_no(3, 3))
+    rede.locais[nome_no(1, 1)].adicionar_palavra_chave('restaurante')
+    esperado = rede.pesquisar_locais(**criterios)
+    obtido = list(rede.iterar_locais(**criterios))
+    assert set(obtido) == set(esperado) and len(obtido) == len(esperado)
+    if not criterios:
+        assert obtido == esperado # Sem critérios seletivos: por ordem alfabética
+    primeiros = list(rede.iterar_locais(**criterios, limite=3))
+    assert len(primeiros) == min(3, len(esperado)) and set(primeiros) <= set(esperado)
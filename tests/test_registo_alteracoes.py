@@ -0,0 +1,131 @@
+# test_registo_alteracoes.py
+import os
+import random
+
+import pytest
+
+from concorrencia import RedeConcorrente
+from gerador_rede import gerar_rede_grelha
+from local import Local, calcular_distancia_geografica
+from registo_alteracoes import abrir_rede, recuperar_rede
+
+
+def _estado(rede):
+    return ({d: (l.freguesia, l.coords_gps, l.palavras_chave, l.url) for d, l in rede.locais.items()},
+            {(o, d): (dados['distancia'], dados['media_veiculos'])
+             for o, v in rede.adj.items() for d, dados in v.items()})
+
+
+def _carregar(rede, linhas=5, colunas=6):
+    """Copia uma grelha para a rede pelas APIs em lote."""
+    base = gerar_rede_grelha(linhas, colunas, palavras_chave=True)
+    rede.adicionar_locais_em_lote(local.copiar() for local in base.locais.values())
+    rede.adicionar_trocos_em_lote((o, d, dados['distancia'], dados['media_veiculos'])
+                                  for o, v in base.adj.items() for d, dados in v.items() if o < d)
+
+
+def _alterar(rede, aleatorio, passos):
+    """Adições, remoções e alterações de palavras-chave, ao acaso."""
+    for passo in range(passos):
+        locais = list(rede.locais)
+        operacao = aleatorio.randrange(6)
+        if operacao == 0:
+            desig1, desig2 = aleatorio.sample(locais, 2)
+            distancia = calcular_distancia_geografica(rede.locais[desig1].coords_gps,
+                                                      rede.locais[desig2].coords_gps) * 1.2
+            rede.adicionar_troco(desig1, desig2, distancia, aleatorio.randrange(1000))
+        elif operacao == 1:
+            trocos = [(o, d) for o, d, _ in rede.iterar_trocos()]
+            if trocos:
+                rede.remover_troco(*aleatorio.choice(trocos))
+        elif operacao == 2:
+            rede.remover_local(aleatorio.choice(locais))
+        elif operacao == 3:
+            rede.adicionar_local(Local(f"Novo {aleatorio.random()}", "Freguesia Ç",
+                                       (41.10 + aleatorio.random() / 100, -8.70), ['café'], "http://x"))
+        elif operacao == 4:
+            rede.local_para_alterar(aleatorio.choice(locais)).adicionar_palavra_chave(f"p{passo % 3}")
+        else:
+            local = rede.local_para_alterar(aleatorio.choice(locais))
+            if local.palavras_chave:
+                local.remover_palavra_chave(min(local.palavras_chave))
+
+
+def _segmentos(diretorio):
+    return sorted(f for f in os.listdir(diretorio) if f.startswith('registo'))
+
+
+@pytest.mark.parametrize('semente', range(3))
+def test_recuperar_rede_igual_a_rede_viva(tmp_path, semente):
+    rede = abrir_rede(str(tmp_path), intervalo_s=0, max_pendentes=7)
+    _carregar(rede)
+    _alterar(rede, random.Random(semente), 200)
+    rede.registo.fechar()
+    recuperada = recuperar_rede(str(tmp_path))
+    assert _estado(recuperada) == _estado(rede)
+    assert recuperada.num_componentes() == rede.num_componentes()
+
+
+def test_ultima_linha_incompleta_e_descartada(tmp_path):
+    aleatorio = random.Random(1)
+    rede = abrir_rede(str(tmp_path), intervalo_s=0)
+    _carregar(rede)
+    _alterar(rede, aleatorio, 50)
+    rede.registo.fechar()
+    caminho = tmp_path / _segmentos(tmp_path)[-1]
+    tamanho = caminho.stat().st_size
+    with open(caminho, 'ab') as ficheiro:
+        ficheiro.write(b'["remover_lo')
+    assert _estado(recuperar_rede(str(tmp_path))) == _estado(rede)
+
+    reaberta = abrir_rede(str(tmp_path), intervalo_s=0)
+    assert caminho.stat().st_size == tamanho
+    _alterar(reaberta, aleatorio, 30)
+    reaberta.registo.fechar()
+    assert _estado(recuperar_rede(str(tmp_path))) == _estado(reaberta)
+
+
+def test_recuperar_depois_de_instantaneo(tmp_path):
+    aleatorio = random.Random(2)
+    rede = abrir_rede(str(tmp_path), intervalo_s=0)
+    _carregar(rede)
+    _alterar(rede, aleatorio, 40)
+    rede.registo.guardar_instantaneo()
+    numero = rede.registo.alteracoes
+    _alterar(rede, aleatorio, 40)
+    rede.registo.fechar()
+    assert sorted(os.listdir(tmp_path)) == [f"instantaneo.{numero:012d}.rvia", f"registo.{numero:012d}.jsonl"]
+    assert _estado(recuperar_rede(str(tmp_path))) == _estado(rede)
+
+
+def test_instantaneos_automaticos_apagam_os_anteriores(tmp_path):
+    rede = abrir_rede(str(tmp_path), intervalo_s=0, max_pendentes=10, alteracoes_por_instantaneo=50)
+    _carregar(rede)
+    _alterar(rede, random.Random(3), 150)
+    rede.registo.fechar()
+    ficheiros = os.listdir(tmp_path)
+    assert sum(f.startswith('instantaneo') for f in ficheiros) == 1
+    assert len(_segmentos(tmp_path)) == 1
+    assert _estado(recuperar_rede(str(tmp_path))) == _estado(rede)
+
+
+def test_transacao_anulada_nunca_chega_ao_disco(tmp_path):
+    aleatorio = random.Random(4)
+    rede = abrir_rede(str(tmp_path), intervalo_s=0, max_pendentes=1)
+    _carregar(rede)
+    concorrente = RedeConcorrente(rede)
+    with concorrente.transacao() as trabalho:
+        _alterar(trabalho, aleatorio, 20)
+    with pytest.raises(RuntimeError):
+        with concorrente.transacao() as trabalho:
+            desig1, desig2 = sorted(trabalho.locais)[:2]
+            trabalho.remover_local(desig1)
+            trabalho.local_para_alterar(desig2).adicionar_palavra_chave('anulada')
+            trabalho.adicionar_local(Local("Anulado", "Freguesia 0-0", (41.1, -8.7)))
+            raise RuntimeError
+    with concorrente.transacao() as trabalho:
+        _alterar(trabalho, aleatorio, 20)
+    concorrente._trabalho.registo.fechar()
+    conteudo = ''.join((tmp_path / nome).read_text(encoding='utf-8') for nome in _segmentos(tmp_path))
+    assert 'Anulado' not in conteudo and 'anulada' not in conteudo
+    assert _estado(recuperar_rede(str(tmp_path))) == _estado(concorrente.instantaneo())
@@ -0,0 +1,76 @@
+# test_serie_temporal.py
+from serie_temporal import SEGUNDOS_POR_DIA, SerieTrafego, janela_dia
+
+HOJE = 1_700_000_000 // SEGUNDOS_POR_DIA * SEGUNDOS_POR_DIA
+
+
+def test_leitura_fora_da_retencao_nao_apaga_o_dia_atual():
+    serie = SerieTrafego()
+    assert serie.registar('A', 'B', HOJE + 3600, 100)
+    antiga = HOJE + 3600 - serie.retencao_dias * SEGUNDOS_POR_DIA - 3600
+    assert not serie.registar('A', 'B', antiga, 7)
+    assert serie.agregar('A', 'B', janela_dia(HOJE), 'total') == 100
+    assert serie.volume_no_instante('A', 'B', HOJE + 3600) == 100
+    assert serie.leituras == 1
+
+
+def test_celula_diaria_mais_recente_nao_e_reutilizada():
+    serie = SerieTrafego(retencao_intervalos=24, retencao_dias=2)
+    assert serie.registar('A', 'B', HOJE + 10, 5)
+    # Mesma célula diária (dia % 2), mas dois dias antes
+    assert not serie.registar('A', 'B', HOJE - 2 * SEGUNDOS_POR_DIA + 10, 3)
+    assert serie.agregar('A', 'B', janela_dia(HOJE), 'total') == 5
+
+
+def test_leituras_atrasadas_dentro_da_retencao_sao_aceites():
+    serie = SerieTrafego()
+    assert serie.registar('B', 'A', HOJE + 5 * 3600, 10)
+    assert serie.registar('A', 'B', HOJE - SEGUNDOS_POR_DIA + 3600, 4)
+    assert serie.registar('A', 'B', HOJE + 5 * 3600, 2)
+    assert serie.agregar('A', 'B', janela_dia(HOJE), 'total') == 12
+    assert serie.agregar('A', 'B', janela_dia(HOJE - SEGUNDOS_POR_DIA), 'total') == 4
+
+
+def test_linha_reutilizada_esquece_o_troco_anterior():
+    serie = SerieTrafego()
+    assert serie.registar('A', 'B', HOJE + 40 * SEGUNDOS_POR_DIA, 1)
+    assert serie.remover('A', 'B')
+    assert serie.registar('C', 'D', HOJE, 9)
+    assert serie.agregar('C', 'D', janela_dia(HOJE), 'total') == 9
+
+
+def _ranking_sem_numpy(serie, janela, estatistica, k, monkeypatch):
+    import serie_temporal
+    with monkeypatch.context() as m:
+        m.setattr(serie_temporal, 'np', None)
+        return serie.ranking(janela, estatistica, k)
+
+
+def test_janela_negativa_ignora_linhas_livres(monkeypatch):
+    serie = SerieTrafego()
+    assert serie.registar('A', 'B', HOJE, 1)
+    assert serie.registar('C', 'D', HOJE, 2)
+    assert serie.remover('A', 'B')
+    for janela in [(-10**12, 10**12), (-SEGUNDOS_POR_DIA, 0), (-(2**31) * 3600.0, 0)]:
+        esperado = _ranking_sem_numpy(serie, janela, 'total', None, monkeypatch)
+        assert serie.ranking(janela, 'total') == esperado
+    assert serie.ranking((-10**12, 10**12), 'total') == [('C', 'D', 2.0)]
+    assert serie.ranking((-SEGUNDOS_POR_DIA, 0), 'total') == []
+
+
+def test_ranking_top_k_com_empates_igual_ao_python_puro(monkeypatch):
+    serie = SerieTrafego()
+    # Valores repetidos para forçar empates na k-ésima posição
+    for i in range(40):
+        assert serie.registar(f"L{39 - i:02d}", f"M{i:02d}", HOJE + 60, (i % 4) * 10)
+    for k in [0, 1, 3, 10, 11, 25, 40, 50, None]:
+        esperado = _ranking_sem_numpy(serie, janela_dia(HOJE), 'total', k, monkeypatch)
+        assert serie.ranking(janela_dia(HOJE), 'total', k) == esperado
+
+
+def test_leitura_nan_e_rejeitada():
+    from gerador_rede import gerar_rede_grelha, nome_no
+    rede = gerar_rede_grelha(2, 2)
+    erros = rede.registar_leituras([(nome_no(0, 0), nome_no(0, 1), HOJE, float('nan'))])
+    assert [posicao for posicao, _ in erros] == [0]
+    assert rede.trafego.leituras == 0
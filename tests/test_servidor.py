@@ -0,0 +1,88 @@
+# test_servidor.py
+import asyncio
+import json
+
+import pytest
+
+from concorrencia import RedeConcorrente
+from gerador_rede import gerar_rede_grelha
+from servidor import ServidorRede, executar_pedido
+
+
+@pytest.fixture(scope='module')
+def rede():
+    return gerar_rede_grelha(4, 4)
+
+
+@pytest.mark.parametrize('operacao, parametros', [
+    ('pesquisar_locais', {'designacao': 5}),
+    ('pesquisar_locais', {'ponto_gps': 5}),
+    ('pesquisar_locais', {'ordenar_por': {}}),
+    ('sugerir_designacoes', {'prefixo': ['L']}),
+    ('pesquisar_designacao_aproximada', {'texto': None}),
+    ('consultar_troco', {'local1': ['L0_0'], 'local2': 'L0_1'}),
+    ('consultar_trocos_mais_circulacao', {'janela': 'hoje'}),
+    ('calcular_rota', {'origem': 1, 'destino': 'L0_0'}),
+    ('calcular_rota', {'origem': 'L0_0', 'destino': 'L3_3', 'custo': 7}),
+])
+def test_parametros_de_tipo_errado_dao_erro(rede, operacao, parametros):
+    resposta = executar_pedido(rede, {'id': 1, 'operacao': operacao, 'parametros': parametros})
+    assert resposta['id'] == 1 and 'erro' in resposta and 'resultado' not in resposta
+
+
+def test_falha_interna_da_resposta_de_erro(rede, monkeypatch):
+    def falhar(*args, **kwargs):
+        raise RuntimeError("avaria")
+    monkeypatch.setattr(rede, 'sugerir_designacoes', falhar)
+    resposta = executar_pedido(rede, {'id': 7, 'operacao': 'sugerir_designacoes', 'parametros': {'prefixo': 'L'}})
+    assert resposta == {'id': 7, 'erro': "Erro interno: RuntimeError: avaria"}
+
+
+def test_pedido_invalido_nao_fecha_a_ligacao(rede):
+    async def cenario():
+        servidor = ServidorRede(RedeConcorrente(rede), porta=0, trabalhadores=2)
+        await servidor.iniciar()
+        try:
+            leitor, escritor = await asyncio.open_connection('127.0.0.1', servidor.porta)
+            pedidos = [
+                {'id': 1, 'operacao': 'pesquisar_locais', 'parametros': {'designacao': 5}},
+                {'id': 2, 'operacao': 'sugerir_designacoes', 'parametros': {'prefixo': 'L0_'}},
+            ]
+            escritor.write(b''.join(json.dumps(p).encode() + b'\n' for p in pedidos))
+            await escritor.drain()
+            respostas = [json.loads(await leitor.readline()) for _ in pedidos]
+            escritor.close()
+            return respostas
+        finally:
+            await servidor.fechar()
+
+    primeira, segunda = asyncio.run(cenario())
+    assert primeira['id'] == 1 and 'erro' in primeira
+    assert segunda['id'] == 2 and segunda['resultado'][:2] == ['L0_0', 'L0_1']
+
+
+def test_rota_e_troco_resolvem_designacoes_normalizadas(rede):
+    resposta = executar_pedido(rede, {'id': 2, 'operacao': 'calcular_rota',
+                                      'parametros': {'origem': 'l0_0', 'destino': 'l0_1'}})
+    assert resposta['resultado']['caminho'] == ['L0_0', 'L0_1']
+    resposta = executar_pedido(rede, {'id': 3, 'operacao': 'consultar_troco',
+                                      'parametros': {'local1': 'l0_0', 'local2': 'L0_1'}})
+    assert resposta['resultado'] is not None
+
+
+def test_pedidos_nao_escrevem_na_consola(capsys):
+    rede = gerar_rede_grelha(3, 3)
+    rede.remover_troco('L0_2', 'L0_1')
+    rede.remover_troco('L0_2', 'L1_2')
+    capsys.readouterr()
+    pedidos = [
+        {'id': 1, 'operacao': 'calcular_rota', 'parametros': {'origem': 'L0_0', 'destino': 'L0_2'}},
+        {'id': 2, 'operacao': 'calcular_rota', 'parametros': {'origem': 'L0_0', 'destino': 'L0_2',
+                                                              'custo': 'tempo', 'partida_s': 0}},
+        {'id': 3, 'operacao': 'pesquisar_locais', 'parametros': {'ponto_gps': [41.1, -8.7], 'raio_km': -1}},
+    ]
+    respostas = [executar_pedido(rede, pedido) for pedido in pedidos]
+    assert [resposta.get('resultado', 'erro') for resposta in respostas] == [None, None, []]
+    assert capsys.readouterr().out == ''
+    assert rede.calcular_rota('L0_0', 'L0_2') is None
+    assert "Não existe caminho" in capsys.readouterr().out